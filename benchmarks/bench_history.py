@@ -0,0 +1,65 @@
+"""
+Per-turn latency over a long conversation, with and without history compaction, using the fake model.
+
+    python -m benchmarks.bench_history --turns 300
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from google.adk.agents import Agent
+from google.adk.runners import Runner
+from google.genai import types
+
+from src.history import HistoryCompactor
+from src.session_store import BoundedSessionService
+
+from .fake_model import FakeLlm
+
+
+def weather(city: str) -> str:
+    """Get the weather in a given city"""
+    return f"The weather in {city} is sunny. " + "Forecast details. " * 100
+
+
+async def run(turns: int, compactor):
+    model = FakeLlm()
+    agent = Agent(
+        model=model, name="bench", instruction="Be helpful.", tools=[weather], before_model_callback=compactor
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        sessions = BoundedSessionService(os.path.join(tmp, "sessions.sqlite3"))
+        runner = Runner(agent=agent, app_name="bench", session_service=sessions)
+        await sessions.create_session(app_name="bench", user_id="U1", session_id="s1")
+        latencies = []
+        for i in range(turns):
+            text = f"what's the weather in City{i}" if i % 3 == 0 else f"tell me something about topic {i}"
+            message = types.Content(role="user", parts=[types.Part(text=text)])
+            start = time.perf_counter()
+            async for _ in runner.run_async(user_id="U1", session_id="s1", new_message=message):
+                pass
+            latencies.append(time.perf_counter() - start)
+        await sessions.close()
+    return latencies, model
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=300)
+    parser.add_argument("--max-tokens", type=int, default=4000)
+    args = parser.parse_args()
+
+    print(f"{'mode':<10} {'first 20 ms':>12} {'last 20 ms':>11} {'avg prompt tokens':>18}")
+    for name, compactor in (("full", None), ("compacted", HistoryCompactor(max_tokens=args.max_tokens))):
+        latencies, model = await run(args.turns, compactor)
+        first = statistics.mean(latencies[:20]) * 1000
+        last = statistics.mean(latencies[-20:]) * 1000
+        print(f"{name:<10} {first:>12.1f} {last:>11.1f} {model.prompt_tokens // model.calls:>18}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,94 @@
+"""
+Replay signed Slack payloads through the ingress checks: the previous str-based verification and json parsing,
+and the bytes-only path with incremental HMAC and the optional fast JSON parser.
+
+Payloads are read one JSON object per line, or generated when no file is given.
+
+    python -m benchmarks.bench_ingress --payloads events.jsonl --requests 50000
+"""
+
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import time
+
+SECRET = "bench-signing-secret"
+
+
+def legacy_verify(secret: str, body: bytes, timestamp: str, signature: str) -> bool:
+    """SlackSecurity.verify_slack_request as it was before the bytes-only rewrite"""
+    if abs(int(time.time()) - int(timestamp)) > 300:
+        return False
+    sig_basestring = f"v0:{timestamp}:{body.decode('utf-8')}"
+    expected = "v0=" + hmac.new(secret.encode(), sig_basestring.encode(), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+def legacy_ingress(body: bytes, timestamp: str, signature: str):
+    assert legacy_verify(SECRET, body, timestamp, signature)
+    return json.loads(body.decode("utf-8"))
+
+
+def generate(count: int):
+    for i in range(count):
+        text = f"<@U0BOT> can you look up the weather in city {i} " + "and some context " * (i % 20)
+        yield {
+            "token": "x",
+            "team_id": "T1",
+            "type": "event_callback",
+            "event_id": f"Ev{i}",
+            "event_time": 1700000000 + i,
+            "event": {
+                "type": "app_mention",
+                "user": f"U{i % 50}",
+                "channel": f"C{i % 10}",
+                "ts": f"{i}.0",
+                "text": text,
+            },
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--payloads", help="JSONL file of payloads to replay")
+    parser.add_argument("--requests", type=int, default=50000)
+    args = parser.parse_args()
+
+    if args.payloads:
+        with open(args.payloads, "rb") as f:
+            payloads = [json.dumps(json.loads(line)).encode() for line in f if line.strip()]
+    else:
+        payloads = [json.dumps(p).encode() for p in generate(200)]
+    timestamp = str(int(time.time()))
+    signed = [
+        (body, timestamp, "v0=" + hmac.new(SECRET.encode(), f"v0:{timestamp}:".encode() + body, "sha256").hexdigest())
+        for body in payloads
+    ]
+
+    # Configure the ingress path before importing it, as the server would from its environment
+    os.environ["SLACK_SIGNING_SECRET"] = SECRET
+    os.environ["SLACK_PREVIOUS_SIGNING_SECRETS"] = "bench-previous-secret"
+    from src.fast_json import loads
+    from src.slack_security import SlackSecurity
+
+    security = SlackSecurity()
+
+    def ingress(body: bytes, timestamp: str, signature: str):
+        assert security.check_timestamp(timestamp) and security.verify_slack_request(body, timestamp, signature)
+        return loads(body)
+
+    size = sum(len(body) for body in payloads) / len(payloads)
+    print(f"{len(payloads)} payloads, {size:.0f} bytes on average, {args.requests} requests")
+    print(f"{'path':<8} {'req/s':>9} {'us/req':>8}")
+    for name, fn in (("legacy", legacy_ingress), ("bytes", ingress)):
+        start = time.perf_counter()
+        for i in range(args.requests):
+            fn(*signed[i % len(signed)])
+        elapsed = time.perf_counter() - start
+        print(f"{name:<8} {args.requests / elapsed:>9.0f} {elapsed / args.requests * 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
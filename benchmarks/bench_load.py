@@ -0,0 +1,339 @@
+"""
+Offline load test of the full app (`src.main:app`, through `benchmarks.offline_app`) against the fake Slack API and
+fake model. Signed Slack events are replayed in scenarios:
+
+    burst         every event at once, one per user, in channel threads
+    retries       every event delivered again by Slack's retries (X-Slack-Retry-Num 1 and 2)
+    mixed         DMs and channel threads interleaved at a steady rate
+    conversation  one long DM conversation, each message sent once the previous one is answered
+    commands      every question at once as a slash command, answered through its response_url
+
+Reports ack latency, end-to-end turn latency percentiles (from sending the event to its answer reaching Slack),
+Slack API calls per turn and the server's memory growth. Thresholds make the run exit with status 1, to gate CI.
+
+    python -m benchmarks.bench_load --events 200 --json results.json --max-turn-p99 5 --max-ack-p99 50
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import re
+import socket
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+from .bench_workers import launch, signed, wait_ready
+from .fake_slack import FakeSlack
+
+# Each message carries a marker that the fake model repeats in its answer, also when it answers through a tool call
+MARKER = re.compile(r"\bq[a-z]+\d+\b")
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def rss_mb(pid: int) -> Optional[float]:
+    """Resident memory of a process, on Linux"""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError):
+        return None
+
+
+class Driver:
+    """Sends signed events to the app and times when the answer to each one reaches the fake Slack API"""
+
+    def __init__(self, session: aiohttp.ClientSession, url: str, fake: FakeSlack, tool_ratio: float):
+        self.session = session
+        self.url = url
+        self.fake = fake
+        self.tool_ratio = tool_ratio
+        self._seq = itertools.count(1)
+        self._random = random.Random(0)
+        self.reset()
+        fake.on_call = self._on_call
+
+    def reset(self):
+        self.acks: List[float] = []
+        self.failed_acks = 0
+        self.sent: Dict[str, float] = {}
+        self.latencies: Dict[str, float] = {}
+        self._answered: Dict[str, asyncio.Event] = {}
+
+    def _text(self, marker: str) -> str:
+        # Some messages ask for the weather, so that their turn calls the tool
+        return f"weather in {marker}?" if self._random.random() < self.tool_ratio else f"{marker} hello"
+
+    def command(self, tag: str, channel: str, user: str) -> Dict[str, str]:
+        marker = f"q{tag}{next(self._seq)}"
+        return {
+            "command": "/ask",
+            "text": self._text(marker),
+            "user_id": user,
+            "channel_id": channel,
+            "response_url": self.fake.response_url(marker),
+        }
+
+    def message(self, tag: str, channel: str, user: str, dm: bool = False) -> Dict[str, Any]:
+        n = next(self._seq)
+        marker = f"q{tag}{n}"
+        text = self._text(marker)
+        return {
+            "type": "event_callback",
+            "event_id": f"Ev{tag}{n}",
+            "event": {
+                "type": "message",
+                "channel_type": "im" if dm else "channel",
+                "channel": channel,
+                "user": user,
+                "text": text,
+                "ts": f"{1700000000 + n}.{n:06d}",
+            },
+        }
+
+    def track(self, payload: Dict[str, Any]):
+        """Start timing the turn of an event or command, unless it is a retry of one already sent"""
+        marker = MARKER.search(payload["text"] if "command" in payload else payload["event"]["text"]).group()
+        if marker not in self.sent:
+            self.sent[marker] = time.perf_counter()
+            self._answered[marker] = asyncio.Event()
+
+    async def send(self, payload: Dict[str, Any], retry_num: Optional[int] = None):
+        """Send an event, or a slash command when the payload is one built by `command`"""
+        form = "command" in payload
+        body, headers = signed(payload, form=form)
+        if retry_num:
+            headers["X-Slack-Retry-Num"] = str(retry_num)
+            headers["X-Slack-Retry-Reason"] = "http_timeout"
+        self.track(payload)
+        start = time.perf_counter()
+        try:
+            path = "/slack/commands" if form else "/slack/events"
+            async with self.session.post(f"{self.url}{path}", data=body, headers=headers) as response:
+                await response.read()
+                self.acks.append(time.perf_counter() - start)
+                if response.status != 200:
+                    self.failed_acks += 1
+        except aiohttp.ClientError:
+            self.failed_acks += 1
+
+    async def answered(self, payload: Dict[str, Any]):
+        await self._answered[MARKER.search(payload["event"]["text"]).group()].wait()
+
+    async def wait_all(self, timeout: float) -> int:
+        """Wait for every message sent to be answered, returning how many were not"""
+        try:
+            await asyncio.wait_for(asyncio.gather(*(e.wait() for e in self._answered.values())), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return len(self.sent) - len(self.latencies)
+
+    def _on_call(self, method: str, args: Dict[str, Any]):
+        if method not in ("chat.postMessage", "chat.update", "response_url"):
+            return
+        now = time.perf_counter()
+        for marker in MARKER.findall(args.get("text") or ""):
+            if marker in self.sent and marker not in self.latencies:
+                self.latencies[marker] = now - self.sent[marker]
+                self._answered[marker].set()
+
+
+async def burst(driver: Driver, events: int):
+    payloads = [driver.message("burst", f"C{i % 10}", f"U{i}") for i in range(events)]
+    await asyncio.gather(*(driver.send(p) for p in payloads))
+
+
+async def retries(driver: Driver, events: int):
+    async def deliver(payload):
+        await driver.send(payload)
+        # Slack retries after 1s, 1 min and 5 min; compressed here, with the first retry racing the turn
+        await asyncio.sleep(0.05)
+        await driver.send(payload, retry_num=1)
+        await asyncio.sleep(0.2)
+        await driver.send(payload, retry_num=2)
+
+    payloads = [driver.message("retry", f"C{i % 10}", f"U{i}") for i in range(events)]
+    await asyncio.gather(*(deliver(p) for p in payloads))
+
+
+async def mixed(driver: Driver, events: int, rate: float = 50):
+    tasks = []
+    for i in range(events):
+        dm = i % 2 == 0
+        payload = driver.message("mixed", f"D{i}" if dm else f"C{i % 10}", f"U{i}", dm=dm)
+        tasks.append(asyncio.create_task(driver.send(payload)))
+        await asyncio.sleep(1 / rate)
+    await asyncio.gather(*tasks)
+
+
+async def conversation(driver: Driver, events: int):
+    for _ in range(events):
+        payload = driver.message("conv", "DLONG", "ULONG", dm=True)
+        await driver.send(payload)
+        await driver.answered(payload)
+
+
+async def commands(driver: Driver, events: int):
+    payloads = [driver.command("cmd", f"C{i % 10}", f"U{i}") for i in range(events)]
+    await asyncio.gather(*(driver.send(p) for p in payloads))
+
+
+SCENARIOS = {"burst": burst, "retries": retries, "mixed": mixed, "conversation": conversation, "commands": commands}
+
+
+async def run_scenario(name: str, driver: Driver, events: int, timeout: float) -> Dict[str, Any]:
+    driver.fake.reset()
+    driver.reset()
+    start = time.perf_counter()
+    await asyncio.wait_for(SCENARIOS[name](driver, events), timeout)
+    unanswered = await driver.wait_all(timeout)
+    elapsed = time.perf_counter() - start
+    # Late calls, e.g. final edits, are counted before reading the totals
+    await asyncio.sleep(0.2)
+    latencies = list(driver.latencies.values())
+    turns = len(driver.sent)
+    result = {
+        "turns": turns,
+        "unanswered": unanswered,
+        "failed_acks": driver.failed_acks,
+        "turns_per_second": len(latencies) / elapsed,
+        "ack_ms": {f"p{p}": (percentile(driver.acks, p) or 0) * 1000 for p in (50, 95, 99)},
+        "turn_seconds": {f"p{p}": percentile(latencies, p) for p in (50, 95, 99)},
+        "slack_calls_per_turn": {method: count / turns for method, count in sorted(driver.fake.calls.items())},
+        "slack_rate_limited": driver.fake.rate_limited,
+    }
+    if name == "conversation" and len(latencies) >= 4:
+        # Latency should stay flat as the history grows
+        quarter = len(latencies) // 4
+        result["first_quarter_turn_seconds"] = sum(latencies[:quarter]) / quarter
+        result["last_quarter_turn_seconds"] = sum(latencies[-quarter:]) / quarter
+    return result
+
+
+def print_result(name: str, result: Dict[str, Any]):
+    ack, turn = result["ack_ms"], result["turn_seconds"]
+    calls = ", ".join(f"{method} {count:.2f}" for method, count in result["slack_calls_per_turn"].items())
+    print(
+        f"{name:<13} {result['turns']:>6} {result['unanswered']:>6} {result['turns_per_second']:>8.1f} "
+        f"{ack['p50']:>8.2f} {ack['p99']:>8.2f} {turn['p50'] or 0:>8.3f} {turn['p95'] or 0:>8.3f} "
+        f"{turn['p99'] or 0:>8.3f}  {calls}"
+    )
+
+
+def check_thresholds(results: Dict[str, Any], args: argparse.Namespace) -> List[str]:
+    failures = []
+    for name, result in results["scenarios"].items():
+        if result["unanswered"] > args.max_unanswered:
+            failures.append(f"{name}: {result['unanswered']} turns unanswered")
+        if result["failed_acks"]:
+            failures.append(f"{name}: {result['failed_acks']} events not acked with 200")
+        if args.max_ack_p99 is not None and result["ack_ms"]["p99"] > args.max_ack_p99:
+            failures.append(f"{name}: ack p99 {result['ack_ms']['p99']:.1f}ms > {args.max_ack_p99}ms")
+        turn_p99 = result["turn_seconds"]["p99"]
+        if args.max_turn_p99 is not None and turn_p99 is not None and turn_p99 > args.max_turn_p99:
+            failures.append(f"{name}: turn p99 {turn_p99:.2f}s > {args.max_turn_p99}s")
+    growth = results.get("memory_growth_mb")
+    if args.max_memory_growth_mb is not None and growth is not None and growth > args.max_memory_growth_mb:
+        failures.append(f"memory grew by {growth:.1f}MB > {args.max_memory_growth_mb}MB")
+    return failures
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--events", type=int, default=100, help="Events per scenario")
+    parser.add_argument("--conversation-turns", type=int, default=30)
+    parser.add_argument("--workers", type=int, default=0, help="Serve with the multi-worker router")
+    parser.add_argument("--slack-latency", type=float, default=0.02, help="Seconds per Slack API call")
+    parser.add_argument("--model-latency", type=float, default=0.2, help="Base seconds per model call")
+    parser.add_argument("--tool-latency", type=float, default=0.1, help="Seconds per weather tool call")
+    parser.add_argument("--tool-ratio", type=float, default=0.5, help="Share of messages that call the tool")
+    parser.add_argument("--channel-interval", type=float, default=0, help="Slack's per-channel post interval")
+    parser.add_argument("--streaming", action="store_true", help="Edit the placeholder instead of posting twice")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--max-ack-p99", type=float, help="Fail above this ack latency p99, in ms")
+    parser.add_argument("--max-turn-p99", type=float, help="Fail above this turn latency p99, in seconds")
+    parser.add_argument("--max-memory-growth-mb", type=float, help="Fail above this server memory growth")
+    parser.add_argument("--max-unanswered", type=int, default=0, help="Fail above this many unanswered turns")
+    args = parser.parse_args()
+
+    fake = await FakeSlack(latency=args.slack_latency, channel_interval=args.channel_interval).start()
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    url = f"http://127.0.0.1:{port}"
+    results: Dict[str, Any] = {"config": {k: v for k, v in vars(args).items() if not k.startswith("max_")}}
+    results["scenarios"] = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            FAKE_SLACK_URL=fake.base_url,
+            FAKE_MODEL_LATENCY=str(args.model_latency),
+            FAKE_TOOL_LATENCY=str(args.tool_latency),
+            SLACK_SIGNING_SECRET="offline-signing-secret",
+            SLACK_STREAMING=str(args.streaming).lower(),
+            SLACK_CHANNEL_INTERVAL=str(args.channel_interval),
+            SLACK_QUEUE_SIZE=str(max(100, 3 * args.events)),
+            SLACK_MAX_PENDING_MESSAGES=str(max(200, 3 * args.events)),
+            SERVER_WORKER_LOG_LEVEL="error",
+            AGENT_SESSION_DB=os.path.join(tmp, "sessions.sqlite3"),
+        )
+        process = launch(args.workers, port, env)
+        try:
+            async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0)) as session:
+                await wait_ready(session, url, args.timeout)
+                driver = Driver(session, url, fake, args.tool_ratio)
+                # Warm up imports, sessions and connection pools before measuring memory
+                await run_scenario("burst", driver, 10, args.timeout)
+                rss_start = rss_mb(process.pid)
+
+                mode = f"{args.workers} workers" if args.workers else "single process"
+                print(
+                    f"{mode}, Slack API {args.slack_latency}s, model {args.model_latency}s, tool {args.tool_latency}s"
+                )
+                print(
+                    f"{'scenario':<13} {'turns':>6} {'lost':>6} {'turns/s':>8} {'ack p50':>8} {'ack p99':>8} "
+                    f"{'turn p50':>8} {'turn p95':>8} {'turn p99':>8}  Slack calls per turn"
+                )
+                for name in args.scenario:
+                    events = args.conversation_turns if name == "conversation" else args.events
+                    result = await run_scenario(name, driver, events, args.timeout)
+                    results["scenarios"][name] = result
+                    print_result(name, result)
+
+                rss_end = rss_mb(process.pid)
+                if rss_start is not None and rss_end is not None:
+                    results["memory_growth_mb"] = rss_end - rss_start
+                    print(f"server memory: {rss_start:.1f}MB -> {rss_end:.1f}MB")
+                if args.workers:
+                    print("memory is that of the router only, with --workers")
+        finally:
+            process.terminate()
+            await asyncio.to_thread(process.wait)
+            await fake.stop()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    failures = check_thresholds(results, args)
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,138 @@
+"""
+Requests/sec and p99 latency of POST /slack/events through the previous @app.middleware("http") layers and through
+the pure ASGI middleware. Requests are driven in-process through the ASGI interface, so only the framework and
+middleware overhead is measured.
+
+    python -m benchmarks.bench_middleware --requests 5000
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import time
+
+from asgi_correlation_id import CorrelationIdMiddleware
+from fastapi import FastAPI, Request, Response
+
+from src.server.middleware import init_middleware
+
+BODY = json.dumps({"type": "event_callback", "event_id": "Ev1", "event": {"type": "message", "text": "hi"}}).encode()
+
+
+def init_legacy_middleware(app: FastAPI):
+    """The decorator-based middleware as it was before the pure ASGI rewrite"""
+    logger = logging.getLogger("src.server.middleware")
+    app.add_middleware(CorrelationIdMiddleware)
+
+    @app.middleware("http")
+    async def log_requests(request: Request, call_next):
+        start_time = time.time()
+        response: Response = await call_next(request)
+        process_time = "{0:.2f}".format((time.time() - start_time) * 1000)
+        request_id = response.headers.get("X-Request-Id") or response.headers.get("X-Blaxel-Request-Id")
+        message = f"{request.method} {request.url.path} {response.status_code} {process_time}ms rid={request_id}"
+        if response.status_code >= 400:
+            logger.error(message)
+        else:
+            logger.info(message)
+        return response
+
+    @app.middleware("http")
+    async def add_cors_headers(request: Request, call_next):
+        app_url = "https://app.blaxel.ai" if os.getenv("BL_ENV") == "prod" else "https://app.blaxel.dev"
+        response = await call_next(request)
+        response.headers["Access-Control-Allow-Origin"] = app_url
+        response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, PATCH, OPTIONS, HEAD"
+        response.headers["Access-Control-Allow-Headers"] = (
+            "Content-Type, Authorization, X-Requested-With, Accept, Origin, X-Request-Id, X-Blaxel-Request-Id"
+        )
+        response.headers["Access-Control-Allow-Credentials"] = "true"
+        response.headers["Access-Control-Max-Age"] = "86400"
+        response.headers["Access-Control-Expose-Headers"] = "X-Request-Id, X-Blaxel-Request-Id"
+        return response
+
+
+def build_app(init) -> FastAPI:
+    app = FastAPI()
+    init(app)
+
+    @app.post("/slack/events")
+    async def slack_events(request: Request):
+        body = json.loads(await request.body())
+        return {"ok": True, "event_id": body["event_id"]}
+
+    return app
+
+
+async def request(app) -> int:
+    status = 0
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if sent:
+            # Like a server with the connection still open: nothing more arrives until the response is sent
+            await asyncio.Event().wait()
+        sent = True
+        return {"type": "http.request", "body": BODY, "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/slack/events",
+        "raw_path": b"/slack/events",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(BODY)).encode())],
+        "client": ("127.0.0.1", 1234),
+        "server": ("127.0.0.1", 80),
+    }
+    await app(scope, receive, send)
+    return status
+
+
+async def run(app, requests: int, concurrency: int):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            assert await request(app) == 200
+            latencies.append(time.perf_counter() - start)
+
+    # Warm up routing and middleware stack construction
+    await asyncio.gather(*(one() for _ in range(100)))
+    latencies.clear()
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return requests / (time.perf_counter() - start), statistics.quantiles(latencies, n=100)[98]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    # Access logs are on in production; send them nowhere so the terminal does not dominate the measurement
+    logging.basicConfig(level=logging.INFO, handlers=[logging.NullHandler()])
+
+    print(f"{'middleware':<10} {'req/s':>8} {'p99 ms':>8}")
+    for name, init in (("decorator", init_legacy_middleware), ("asgi", init_middleware)):
+        rate, p99 = await run(build_app(init), args.requests, args.concurrency)
+        print(f"{name:<10} {rate:>8.0f} {p99 * 1000:>8.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,80 @@
+"""
+Compare the old outbound path (sync WebClient in the default thread pool) with the async client and SlackOutbound
+scheduler, against the local fake Slack API.
+
+    python -m benchmarks.bench_outbound --messages 200 --channels 20
+"""
+
+import argparse
+import asyncio
+import time
+
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackApiError
+from slack_sdk.web.async_client import AsyncWebClient
+
+from src.slack_outbound import SlackOutbound
+
+from .fake_slack import FakeSlack
+
+
+async def run_executor(fake: FakeSlack, messages: int, channels: int) -> int:
+    client = WebClient(token="xoxb-bench", base_url=fake.base_url)
+    loop = asyncio.get_running_loop()
+    failures = 0
+
+    async def post(i):
+        nonlocal failures
+        try:
+            await loop.run_in_executor(
+                None, lambda: client.chat_postMessage(channel=f"C{i % channels}", text=f"message {i}")
+            )
+        except SlackApiError:
+            failures += 1
+
+    await asyncio.gather(*(post(i) for i in range(messages)))
+    return failures
+
+
+async def run_scheduler(fake: FakeSlack, messages: int, channels: int) -> int:
+    outbound = SlackOutbound(AsyncWebClient(token="xoxb-bench", base_url=fake.base_url))
+    outbound.channel_interval = fake.channel_interval
+    await outbound.start()
+    failures = 0
+
+    async def post(i):
+        nonlocal failures
+        try:
+            await outbound.call("chat.postMessage", channel=f"C{i % channels}", text=f"message {i}")
+        except SlackApiError:
+            failures += 1
+
+    await asyncio.gather(*(post(i) for i in range(messages)))
+    await outbound.stop()
+    return failures
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--channels", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.02, help="Fake Slack API latency per call, in seconds")
+    parser.add_argument("--channel-interval", type=float, default=0.1, help="Fake per-channel post interval")
+    args = parser.parse_args()
+
+    fake = await FakeSlack(latency=args.latency, channel_interval=args.channel_interval).start()
+    print(f"{'mode':<10} {'seconds':>8} {'msg/s':>8} {'calls':>6} {'429s':>5} {'failed':>6} {'conns':>6}")
+    for name, run in (("executor", run_executor), ("scheduler", run_scheduler)):
+        fake.reset()
+        start = time.perf_counter()
+        failures = await run(fake, args.messages, args.channels)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{name:<10} {elapsed:>8.2f} {args.messages / elapsed:>8.1f} {sum(fake.calls.values()):>6} "
+            f"{fake.rate_limited:>5} {failures:>6} {len(fake.connections):>6}"
+        )
+    await fake.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,115 @@
+"""
+Ingress latency of the HTTP trigger against Socket Mode, with the real app (`benchmarks.offline_app`) served against
+the fake Slack API, whose Socket Mode WebSocket stands in for Slack's.
+
+Over HTTP, every event is a new signed request on a new TCP connection, as Slack's deliveries are (without the TLS
+handshake, which is not simulated here); `--keepalive` reuses connections instead. In Socket Mode, envelopes are
+sent over the one WebSocket the app opened. Ack latency is measured from sending an event to its ack, turn latency
+until its answer reaches the fake Slack API.
+
+    python -m benchmarks.bench_socket_mode --events 200 --scenario burst mixed
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+import time
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+from .bench_load import SCENARIOS, Driver, print_result, run_scenario
+from .bench_workers import launch, wait_ready
+from .fake_slack import FakeSlack
+
+
+class SocketDriver(Driver):
+    """Driver delivering events as Socket Mode envelopes instead of HTTP requests"""
+
+    async def send(self, payload: Dict[str, Any], retry_num: Optional[int] = None):
+        self.track(payload)
+        start = time.perf_counter()
+        try:
+            if "command" in payload:
+                await self.fake.send_envelope("slash_commands", payload)
+            else:
+                await self.fake.send_envelope("events_api", payload, retry_attempt=retry_num or 0)
+            self.acks.append(time.perf_counter() - start)
+        except (ConnectionError, IndexError):
+            self.failed_acks += 1
+
+
+async def run(transport: str, fake: FakeSlack, args: argparse.Namespace, tmp: str) -> Dict[str, Any]:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    env = dict(
+        os.environ,
+        FAKE_SLACK_URL=fake.base_url,
+        FAKE_MODEL_LATENCY=str(args.model_latency),
+        FAKE_TOOL_LATENCY="0",
+        SLACK_SIGNING_SECRET="offline-signing-secret",
+        SLACK_TRANSPORT=transport,
+        SLACK_APP_TOKEN="xapp-offline",
+        SLACK_STREAMING="false",
+        SLACK_CHANNEL_INTERVAL="0",
+        SLACK_QUEUE_SIZE=str(max(100, 3 * args.events)),
+        SLACK_MAX_PENDING_MESSAGES=str(max(200, 3 * args.events)),
+        AGENT_SESSION_DB=os.path.join(tmp, f"sessions-{transport}.sqlite3"),
+    )
+    process = launch(0, port, env)
+    url = f"http://127.0.0.1:{port}"
+    results = {}
+    try:
+        connector = aiohttp.TCPConnector(limit=0, force_close=not args.keepalive)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            await wait_ready(session, url, args.timeout)
+            if transport == "socket":
+                await fake.wait_socket(args.timeout)
+                driver = SocketDriver(session, url, fake, tool_ratio=0)
+            else:
+                driver = Driver(session, url, fake, tool_ratio=0)
+            # Warm up imports, sessions and connection pools
+            await run_scenario("burst", driver, 10, args.timeout)
+            for name in args.scenario:
+                result = await run_scenario(name, driver, args.events, args.timeout)
+                results[name] = result
+                print_result(f"{transport} {name}", result)
+    finally:
+        process.terminate()
+        await asyncio.to_thread(process.wait)
+    return results
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", nargs="+", choices=list(SCENARIOS), default=["burst", "mixed", "commands"])
+    parser.add_argument("--events", type=int, default=100, help="Events per scenario")
+    parser.add_argument("--slack-latency", type=float, default=0.02, help="Seconds per Slack API call")
+    parser.add_argument("--model-latency", type=float, default=0.05, help="Base seconds per model call")
+    parser.add_argument("--keepalive", action="store_true", help="Reuse HTTP connections between events")
+    parser.add_argument("--timeout", type=float, default=120)
+    args = parser.parse_args()
+
+    fake = await FakeSlack(latency=args.slack_latency, channel_interval=0).start()
+    print(f"Slack API {args.slack_latency}s, model {args.model_latency}s, HTTP keep-alive {args.keepalive}")
+    print(
+        f"{'scenario':<13} {'turns':>6} {'lost':>6} {'turns/s':>8} {'ack p50':>8} {'ack p99':>8} "
+        f"{'turn p50':>8} {'turn p95':>8} {'turn p99':>8}  Slack calls per turn"
+    )
+    failed = False
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for transport in ("http", "socket"):
+                results = await run(transport, fake, args, tmp)
+                failed |= any(r["unanswered"] or r["failed_acks"] for r in results.values())
+    finally:
+        await fake.stop()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
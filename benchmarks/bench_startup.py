@@ -0,0 +1,83 @@
+"""
+Import time of the app, with the agent deferred and imported eagerly as it used to be, and how long a uvicorn
+process takes to answer liveness and to finish its startup phase.
+
+Without Slack and Blaxel credentials the startup steps fail, but the timings still show how long each one
+took and that the server answered /health well before they finished.
+
+    python -m benchmarks.bench_startup
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+
+def import_seconds(modules: str, runs: int) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        code = f"import time; t = time.perf_counter(); import {modules}; print(time.perf_counter() - t)"
+        out = subprocess.run([sys.executable, "-W", "ignore", "-c", code], capture_output=True, text=True, check=True)
+        best = min(best, float(out.stdout.strip().splitlines()[-1]))
+    return best
+
+
+def get(url: str):
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def serve(timeout: float):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    env = dict(os.environ, STARTUP_TIMEOUT=str(timeout))
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-W", "ignore", "-m", "uvicorn", "src.main:app", "--port", str(port), "--log-level", "error"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    live = None
+    try:
+        while time.perf_counter() - start < timeout + 60:
+            try:
+                if live is None and get(f"http://127.0.0.1:{port}/health")[0] == 200:
+                    live = time.perf_counter() - start
+                status = get(f"http://127.0.0.1:{port}/ready")[1]
+                if "pending" not in status["steps"].values() and status["steps"]:
+                    return live, time.perf_counter() - start, status
+            except (urllib.error.URLError, ConnectionError):
+                pass
+            time.sleep(0.05)
+        raise TimeoutError("startup did not finish")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    print(f"import src.main, agent deferred: {import_seconds('src.main', args.runs):.2f}s")
+    print(f"import src.main and src.agent:   {import_seconds('src.main, src.agent', args.runs):.2f}s")
+    live, done, status = serve(args.timeout)
+    print(f"uvicorn live after {live:.2f}s, startup finished after {done:.2f}s")
+    print(f"steps: {status['steps']}, timings: {', '.join(f'{k} {v:.2f}s' for k, v in status['timings'].items())}")
+
+
+if __name__ == "__main__":
+    main()
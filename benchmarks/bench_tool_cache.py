@@ -0,0 +1,53 @@
+"""
+Tool cache hit ratio and time saved over a skewed stream of tool calls, with a simulated search latency.
+
+    python -m benchmarks.bench_tool_cache --calls 2000 --concurrency 20
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from src.tool_cache import ToolCache
+
+QUERIES = ["weather in Paris", "Slack API rate limits", "python asyncio", "blaxel docs", "latest news"]
+
+
+async def run(calls: int, concurrency: int, latency: float, cache: ToolCache) -> float:
+    rng = random.Random(1)
+    # Zipf-like popularity: a few questions are asked over and over, with some long-tail variations
+    queries = [rng.choice(QUERIES[: rng.randint(1, len(QUERIES))]) for _ in range(calls)]
+    queries = [q.upper() if i % 7 == 0 else q if rng.random() < 0.8 else f"{q} {i}" for i, q in enumerate(queries)]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def search():
+        await asyncio.sleep(latency)
+        return {"results": ["..."]}
+
+    async def one(query: str):
+        async with semaphore:
+            await cache.call("search", {"query": query}, search)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(q) for q in queries))
+    return time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    print(f"{'mode':<8} {'seconds':>8} {'hit ratio':>10} {'tool seconds saved':>19}")
+    for name, ttl in (("uncached", 0), ("cached", 300)):
+        cache = ToolCache(max_size=500, default_ttl=ttl, ttls={})
+        elapsed = await run(args.calls, args.concurrency, args.latency, cache)
+        stats = cache.stats()
+        print(f"{name:<8} {elapsed:>8.2f} {stats['hit_ratio']:>10.2f} {stats['saved_seconds']:>19.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
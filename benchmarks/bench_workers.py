@@ -0,0 +1,143 @@
+"""
+Turn throughput of the real app against the fake Slack API and fake model, served by one process and by the
+multi-worker router with an increasing number of workers. Model calls do CPU-bound work, so a single process is
+limited to one core.
+
+    python -m benchmarks.bench_workers --workers 2 4 --turns 200 --cpu 0.02
+"""
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlencode
+
+import aiohttp
+
+from .fake_slack import FakeSlack
+
+SECRET = "offline-signing-secret"
+
+
+def signed(payload: dict, form: bool = False):
+    """Body and headers of a signed Slack request, JSON like events or form encoded like slash commands"""
+    body = urlencode(payload).encode() if form else json.dumps(payload).encode()
+    timestamp = str(int(time.time()))
+    signature = "v0=" + hmac.new(SECRET.encode(), f"v0:{timestamp}:".encode() + body, hashlib.sha256).hexdigest()
+    headers = {
+        "Content-Type": "application/x-www-form-urlencoded" if form else "application/json",
+        "X-Slack-Request-Timestamp": timestamp,
+        "X-Slack-Signature": signature,
+    }
+    return body, headers
+
+
+def message_event(i: int) -> dict:
+    # One message per conversation, so that no two are merged into one turn
+    return {
+        "type": "event_callback",
+        "event_id": f"Ev{i}",
+        "event": {
+            "type": "message",
+            "channel_type": "channel",
+            "channel": f"C{i}",
+            "user": f"U{i}",
+            "text": f"question {i}",
+            "ts": f"{1700000000 + i}.000100",
+        },
+    }
+
+
+def launch(workers: int, port: int, env: dict) -> subprocess.Popen:
+    if workers == 0:
+        target = "benchmarks.offline_app:app"
+        command = [sys.executable, "-W", "ignore", "-m", "uvicorn", target, "--port", str(port), "--log-level", "error"]
+    else:
+        code = (
+            "import uvicorn; from src.multiworker import create_router; "
+            f"uvicorn.run(create_router('benchmarks.offline_app:app', {workers}), port={port}, log_level='error')"
+        )
+        command = [sys.executable, "-W", "ignore", "-c", code]
+    return subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+async def wait_ready(session: aiohttp.ClientSession, url: str, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with session.get(f"{url}/ready") as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.5)
+    raise TimeoutError(f"{url} not ready after {timeout}s")
+
+
+async def run(fake: FakeSlack, workers: int, turns: int, cpu: float, timeout: float, tmp: str) -> float:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    env = dict(
+        os.environ,
+        FAKE_SLACK_URL=fake.base_url,
+        FAKE_MODEL_CPU_SECONDS=str(cpu),
+        SLACK_SIGNING_SECRET=SECRET,
+        SLACK_STREAMING="false",
+        SLACK_CHANNEL_INTERVAL="0",
+        SLACK_QUEUE_SIZE=str(turns),
+        SLACK_MAX_PENDING_MESSAGES=str(turns),
+        SERVER_WORKER_LOG_LEVEL="error",
+        AGENT_SESSION_DB=os.path.join(tmp, f"sessions-{workers}.sqlite3"),
+    )
+    process = launch(workers, port, env)
+    url = f"http://127.0.0.1:{port}"
+    try:
+        async with aiohttp.ClientSession() as session:
+            await wait_ready(session, url, timeout)
+            fake.reset()
+            start = time.perf_counter()
+            for i in range(turns):
+                body, headers = signed(message_event(i))
+                async with session.post(f"{url}/slack/events", data=body, headers=headers) as response:
+                    assert response.status == 200, await response.text()
+            # Each turn posts a placeholder and then the answer
+            while fake.calls["chat.postMessage"] < 2 * turns:
+                if time.perf_counter() - start > timeout:
+                    raise TimeoutError(f"only {fake.calls['chat.postMessage']} of {2 * turns} messages posted")
+                await asyncio.sleep(0.01)
+            return turns / (time.perf_counter() - start)
+    finally:
+        process.terminate()
+        await asyncio.to_thread(process.wait)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4])
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--cpu", type=float, default=0.02, help="CPU seconds per model call")
+    parser.add_argument("--timeout", type=float, default=300)
+    args = parser.parse_args()
+
+    fake = await FakeSlack(latency=0.01, channel_interval=0).start()
+    print(f"{os.cpu_count()} CPUs, {args.turns} turns, {args.cpu}s CPU per model call")
+    print(f"{'mode':<18} {'turns/s':>8}")
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for workers in [0] + args.workers:
+                rate = await run(fake, workers, args.turns, args.cpu, args.timeout, tmp)
+                print(f"{'single process' if workers == 0 else f'{workers} workers':<18} {rate:>8.1f}")
+    finally:
+        await fake.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
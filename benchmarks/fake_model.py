@@ -0,0 +1,49 @@
+"""
+Fake ADK model for benchmarks: no network, latency proportional to prompt size like a real model.
+
+Messages mentioning the weather trigger a call to the `weather` tool, whose output is then summarised. `cpu_seconds`
+adds CPU-bound work to each call, like parsing a large response, which blocks the event loop it runs on.
+"""
+
+import asyncio
+import re
+import time
+from typing import AsyncGenerator
+
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.genai import types
+
+from src.history import CHARS_PER_TOKEN, content_chars
+
+
+class FakeLlm(BaseLlm):
+    model: str = "fake"
+    base_latency: float = 0.005
+    latency_per_1k_tokens: float = 0.01
+    answer_chars: int = 400
+    cpu_seconds: float = 0.0
+    calls: int = 0
+    prompt_tokens: int = 0
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        tokens = sum(content_chars(c) for c in llm_request.contents) // CHARS_PER_TOKEN
+        self.calls += 1
+        self.prompt_tokens += tokens
+        await asyncio.sleep(self.base_latency + self.latency_per_1k_tokens * tokens / 1000)
+        busy_until = time.perf_counter() + self.cpu_seconds
+        while time.perf_counter() < busy_until:
+            pass
+
+        last = llm_request.contents[-1]
+        response = next((p.function_response for p in last.parts if p.function_response), None)
+        text = next((p.text for p in last.parts if p.text), "")
+        city = re.search(r"weather in (\w+)", text)
+        if response:
+            part = types.Part(text=f"Here is what I found: {response.response}. " + "." * self.answer_chars)
+        elif city and "weather" in llm_request.tools_dict:
+            part = types.Part(function_call=types.FunctionCall(name="weather", args={"city": city.group(1)}))
+        else:
+            part = types.Part(text=f"You said: {text[:100]}. " + "." * self.answer_chars)
+        yield LlmResponse(content=types.Content(role="model", parts=[part]))
@@ -0,0 +1,177 @@
+"""
+Local stand-in for the Slack Web API, used by the benchmarks.
+
+It implements the handful of methods the bot calls, injects a fixed latency per call, enforces Slack's ~1 message
+per second per channel limit with 429 + Retry-After responses, and counts calls and TCP connections. It also serves
+response_url endpoints for slash commands, counted as "response_url" calls, and a Socket Mode WebSocket that
+`send_envelope` delivers envelopes over.
+"""
+
+import asyncio
+import itertools
+import json
+import time
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+from aiohttp import web
+
+BOT_USER_ID = "UBOT"
+
+
+class FakeSlack:
+    def __init__(self, latency: float = 0.02, channel_interval: float = 1.0, port: int = 0):
+        self.latency = latency
+        self.channel_interval = channel_interval
+        self.port = port
+        self.calls: Counter = Counter()
+        self.rate_limited = 0
+        self.connections = set()
+        self.messages: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._last_post: Dict[str, float] = {}
+        self._ts = itertools.count(1)
+        self._runner: Optional[web.AppRunner] = None
+        self._sockets: List[web.WebSocketResponse] = []
+        self._socket_ready = asyncio.Event()
+        self._acks: Dict[str, asyncio.Future] = {}
+        self._envelope_ids = itertools.count(1)
+        # Called with the method and arguments of every successful call, e.g. to time when an answer is posted
+        self.on_call: Optional[Callable[[str, Dict[str, Any]], None]] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/api/"
+
+    async def start(self) -> "FakeSlack":
+        app = web.Application()
+        app.router.add_route("*", "/api/{method}", self._handle)
+        app.router.add_post("/response/{key}", self._handle_response_url)
+        app.router.add_get("/socket", self._handle_socket)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        for ws in list(self._sockets):
+            await ws.close()
+        if self._runner:
+            await self._runner.cleanup()
+
+    def response_url(self, key: str) -> str:
+        return f"http://127.0.0.1:{self.port}/response/{key}"
+
+    def reset(self):
+        self.calls.clear()
+        self.rate_limited = 0
+        self.connections.clear()
+        self._last_post.clear()
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.calls[method] += 1
+        self.connections.add(id(request.transport))
+        args: Dict[str, Any] = dict(request.query)
+        if request.can_read_body:
+            if request.content_type == "application/json":
+                args.update(await request.json())
+            else:
+                args.update(await request.post())
+        channel = args.get("channel")
+        if method in ("chat.postMessage", "chat.update") and channel:
+            now = time.monotonic()
+            last = self._last_post.get(channel)
+            # Slack tolerates some jitter around the per-channel limit, only clearly early posts are rejected
+            if last is not None and now - last < self.channel_interval * 0.8:
+                self.rate_limited += 1
+                retry_after = max(1, round(self.channel_interval - (now - last)))
+                return web.json_response(
+                    {"ok": False, "error": "ratelimited"}, status=429, headers={"Retry-After": str(retry_after)}
+                )
+            self._last_post[channel] = now
+
+        await asyncio.sleep(self.latency)
+        handler = getattr(self, "_" + method.replace(".", "_"), None)
+        if handler is None:
+            return web.json_response({"ok": False, "error": "unknown_method"})
+        result = handler(args)
+        if self.on_call:
+            self.on_call(method, args)
+        return web.json_response({"ok": True, **result})
+
+    async def _handle_response_url(self, request: web.Request) -> web.Response:
+        self.calls["response_url"] += 1
+        self.connections.add(id(request.transport))
+        args = await request.json()
+        await asyncio.sleep(self.latency)
+        if self.on_call:
+            self.on_call("response_url", args)
+        return web.Response(text="ok")
+
+    async def wait_socket(self, timeout: float):
+        await asyncio.wait_for(self._socket_ready.wait(), timeout)
+
+    async def send_envelope(self, kind: str, payload: Dict[str, Any], retry_attempt: int = 0) -> Dict[str, Any]:
+        """Deliver an envelope over the most recent Socket Mode connection and wait for the app to ack it"""
+        envelope_id = f"env{next(self._envelope_ids)}"
+        ack = self._acks[envelope_id] = asyncio.get_running_loop().create_future()
+        envelope = {"envelope_id": envelope_id, "type": kind, "payload": payload, "retry_attempt": retry_attempt}
+        await self._sockets[-1].send_str(json.dumps(envelope))
+        return await ack
+
+    async def _handle_socket(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        await ws.send_str(json.dumps({"type": "hello"}))
+        self._sockets.append(ws)
+        self._socket_ready.set()
+        try:
+            async for message in ws:
+                ack = json.loads(message.data)
+                future = self._acks.pop(ack.get("envelope_id"), None)
+                if future and not future.done():
+                    future.set_result(ack)
+        finally:
+            self._sockets.remove(ws)
+            if not self._sockets:
+                self._socket_ready.clear()
+        return ws
+
+    def _apps_connections_open(self, args):
+        return {"url": f"ws://127.0.0.1:{self.port}/socket"}
+
+    def _auth_test(self, args):
+        return {"user_id": BOT_USER_ID}
+
+    def _chat_postMessage(self, args):
+        ts = f"{int(time.time())}.{next(self._ts):06d}"
+        message = {"ts": ts, "text": args.get("text"), "user": BOT_USER_ID}
+        if args.get("thread_ts"):
+            message["thread_ts"] = args["thread_ts"]
+        self.messages[args["channel"]].append(message)
+        return {"channel": args["channel"], "ts": ts, "message": message}
+
+    def _chat_update(self, args):
+        for message in self.messages[args["channel"]]:
+            if message["ts"] == args["ts"]:
+                message["text"] = args.get("text")
+        return {"channel": args["channel"], "ts": args["ts"], "text": args.get("text")}
+
+    def _conversations_info(self, args):
+        channel = args["channel"]
+        return {"channel": {"id": channel, "is_im": channel.startswith("D")}}
+
+    def _conversations_open(self, args):
+        return {"channel": {"id": f"D{args['users']}"}}
+
+    def _conversations_replies(self, args):
+        thread_ts = args["ts"]
+        oldest = float(args.get("oldest", 0))
+        messages = [
+            m
+            for m in self.messages[args["channel"]]
+            if (m["ts"] == thread_ts or m.get("thread_ts") == thread_ts) and float(m["ts"]) > oldest
+        ]
+        return {"messages": messages, "has_more": False}
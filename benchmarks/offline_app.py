@@ -0,0 +1,55 @@
+"""
+The real app, wired to the local fake Slack API and the fake model instead of Slack and Blaxel, for load tests.
+
+    FAKE_SLACK_URL=http://127.0.0.1:8001/api/ uvicorn benchmarks.offline_app:app
+
+FAKE_MODEL_LATENCY sets the base latency of each model call, FAKE_MODEL_CPU_SECONDS adds CPU-bound work to it and
+FAKE_TOOL_LATENCY is the latency of the `weather` tool.
+"""
+
+import asyncio
+import os
+
+os.environ.setdefault("SLACK_BOT_TOKEN", "xoxb-offline")
+os.environ.setdefault("SLACK_SIGNING_SECRET", "offline-signing-secret")
+
+from src import agent  # noqa: E402
+from src.main import app  # noqa: E402
+from src.slack_integration import slack_integration  # noqa: E402
+from src.socket_mode import socket_mode  # noqa: E402
+from src.tool_connections import ToolConnections  # noqa: E402
+
+from .fake_model import FakeLlm  # noqa: E402
+
+
+async def fake_model(name: str) -> FakeLlm:
+    return FakeLlm(
+        base_latency=float(os.getenv("FAKE_MODEL_LATENCY", "0.005")),
+        cpu_seconds=float(os.getenv("FAKE_MODEL_CPU_SECONDS", "0")),
+    )
+
+
+async def weather(city: str) -> str:
+    """Get the weather in a given city
+
+    Args:
+        city (str): The name of the city (e.g., "New York", "London", "Tokyo").
+
+    Returns:
+        str: A string containing the weather information.
+    """
+    await asyncio.sleep(float(os.getenv("FAKE_TOOL_LATENCY", "0")))
+    return f"The weather in {city} is sunny"
+
+
+async def no_tools(names, timeout=None):
+    return ToolConnections([])
+
+
+agent.bl_model = fake_model
+agent.connect_tools = no_tools
+agent.weather = weather
+slack_integration.client.base_url = os.environ["FAKE_SLACK_URL"]
+socket_mode.client.base_url = os.environ["FAKE_SLACK_URL"]
+
+__all__ = ["app"]
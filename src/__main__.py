@@ -1,8 +1,28 @@
+import os
+from logging import getLogger
+
 import uvicorn
 from blaxel import env
 
+logger = getLogger(__name__)
+
 port = env["PORT"]
 host = env["HOST"]
+workers = int(os.getenv("SERVER_WORKERS", "1"))
+# "http": Slack posts to the public trigger; "socket": the app dials out to Slack over a Socket Mode WebSocket
+transport = os.getenv("SLACK_TRANSPORT", "http").lower()
 
 if __name__ == "__main__":
-    uvicorn.run("src.main:app", host=host, port=int(port), reload=False)
+    if transport not in ("http", "socket"):
+        raise SystemExit(f"Unknown SLACK_TRANSPORT '{transport}', expected 'http' or 'socket'")
+    if transport == "socket" and workers > 1:
+        # Slack spreads envelopes over connections at random, so workers could not each own their conversations
+        logger.warning("SERVER_WORKERS is ignored in Socket Mode, serving from a single process")
+        workers = 1
+    if workers > 1:
+        from .multiworker import create_router
+
+        # One router process in front of worker processes, each owning a share of the conversations
+        uvicorn.run(create_router("src.main:app", workers), host=host, port=int(port), reload=False)
+    else:
+        uvicorn.run("src.main:app", host=host, port=int(port), reload=False)
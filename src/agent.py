@@ -1,14 +1,33 @@
+import asyncio
+import os
+import time
+import uuid
+from contextlib import AsyncExitStack, asynccontextmanager
+from dataclasses import dataclass
 from logging import getLogger
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator, AsyncIterator, Dict, Optional
 
-from blaxel.googleadk import bl_model, bl_tools
+from blaxel.googleadk import bl_model
+from blaxel.googleadk.tools import GoogleADKTool
 from google.adk.agents import Agent
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.events import Event
 from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
 from google.genai import types
 
+from .agent_metrics import InstrumentedLlm, InstrumentedTool
+from .history import HistoryCompactor
+from .metrics import stage_seconds, timed
+from .response_cache import ResponseCache, config_fingerprint
+from .session_store import BoundedSessionService
+from .tool_cache import ToolCache, bypass_tool_cache
+from .tool_connections import ToolConnections, connect_tools
+
 logger = getLogger(__name__)
-session_service = InMemorySessionService()
+session_service = BoundedSessionService()
+history_compactor = HistoryCompactor()
+tool_cache = ToolCache()
+response_cache = ResponseCache()
 
 
 # @title Define the get_weather Tool
@@ -25,38 +44,217 @@ def weather(city: str) -> str:
 
 
 APP_NAME = "research_assistant"
-
-
-async def agent(input: str, user_id: str, session_id: str) -> AsyncGenerator[str, None]:
-    description = "You are a helpful assistant that can answer questions and help with tasks."
-    prompt = """
+MODEL_NAME = "sandbox-openai"
+TOOL_NAMES = ["blaxel-search"]
+DESCRIPTION = "You are a helpful assistant that can answer questions and help with tasks."
+PROMPT = """
 You are a helpful assistant that can answer questions about weather,
 places and more generic questions about real time information.
 """
-    tools = await bl_tools(["blaxel-search"], timeout_enabled=False) + [weather]
-    model = await bl_model("sandbox-openai")
+# Answers in the response cache are only valid for the configuration that produced them
+CONFIG_FINGERPRINT = config_fingerprint(APP_NAME, MODEL_NAME, DESCRIPTION, PROMPT, *TOOL_NAMES, weather.__name__)
+
+
+@dataclass
+class AgentUpdate:
+    """One step of an agent turn: a tool being called, partial text, or the final response"""
+
+    kind: str  # "tool", "partial" or "final"
+    text: str
+
+
+class AgentRuntime:
+    """Long-lived model, tools and Runner shared by every Slack turn"""
+
+    def __init__(self):
+        # Keep MCP tool sessions open between calls instead of reconnecting on every tool call. On Blaxel cloud the
+        # client closes its session after every call and ignores this.
+        self.tools_idle_timeout = int(os.getenv("AGENT_TOOLS_IDLE_TIMEOUT", "300"))
+        self.tools_refresh_interval = float(os.getenv("AGENT_TOOLS_REFRESH_INTERVAL", "900"))
+        self.health_check_interval = float(os.getenv("AGENT_HEALTH_CHECK_INTERVAL", "60"))
+        # LiteLlm's SSE mode reads the model stream synchronously inside the event loop, so token streaming stalls
+        # every other conversation while a reply streams. It is opt-in; tool and step updates stream either way.
+        streaming = os.getenv("AGENT_STREAMING_MODE", "none").lower() == "sse"
+        self.run_config = RunConfig(streaming_mode=StreamingMode.SSE if streaming else StreamingMode.NONE)
+        self.runner: Optional[Runner] = None
+        self.tools_loaded_at: Optional[float] = None
+        self._tools: Optional[ToolConnections] = None
+        self._model = None
+        self._lock = asyncio.Lock()
+        self._maintenance_task: Optional[asyncio.Task] = None
+        self._health_task: Optional[asyncio.Task] = None
+
+    async def start(self) -> bool:
+        """Start health checks and build the runtime ahead of the first message, returning whether it was built"""
+        if not self._maintenance_task:
+            self._maintenance_task = asyncio.create_task(self._maintenance_loop())
+        try:
+            await self.get_runner()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to warm agent runtime, will retry on first message: {e}")
+            return False
+
+    async def stop(self):
+        if self._maintenance_task:
+            self._maintenance_task.cancel()
+            await asyncio.gather(self._maintenance_task, return_exceptions=True)
+            self._maintenance_task = None
+        if self._tools:
+            await self._tools.retire()
+            self._tools = None
+        self.runner = None
+
+    async def get_runner(self) -> Runner:
+        """Return the shared Runner, building it on first use"""
+        if self.runner is None:
+            async with self._lock:
+                if self.runner is None:
+                    await self._build()
+        return self.runner
+
+    @asynccontextmanager
+    async def turn(self) -> AsyncIterator[Runner]:
+        """Hold the current Runner and its tool connections for one turn, so reconnecting does not close them"""
+        runner = await self.get_runner()
+        tools = self._tools
+        tools.acquire()
+        try:
+            yield runner
+        finally:
+            await tools.release()
+
+    async def reconnect(self):
+        """Rebuild the agent with new tool sessions, closing the previous ones once the turns using them end"""
+        async with self._lock:
+            await self._build()
 
-    agent = Agent(model=model, name=APP_NAME, description=description, instruction=prompt, tools=tools)
+    async def health(self) -> Dict[str, Any]:
+        """Ping every open tool session, reconnecting when one of them is dead"""
+        healthy = self.runner is not None
+        if self._tools and await self._tools.ping():
+            healthy = False
+        if self.runner is not None and not healthy:
+            try:
+                await self.reconnect()
+                healthy = True
+            except Exception as e:
+                logger.error(f"Failed to reconnect agent runtime: {e}")
+        return {
+            "ready": healthy,
+            "tools_age_seconds": time.monotonic() - self.tools_loaded_at if self.tools_loaded_at else None,
+            "tool_cache": tool_cache.stats(),
+            "response_cache": response_cache.stats(),
+        }
 
-    # Create the specific session where the conversation will happen
+    def check_health_soon(self):
+        """Schedule a health check without waiting for it, at most one at a time"""
+        if not self._health_task or self._health_task.done():
+            self._health_task = asyncio.create_task(self.health())
+
+    async def _build(self):
+        connecting = connect_tools(TOOL_NAMES, timeout=self.tools_idle_timeout)
+        if self._model is None:
+            # The model is resolved once, concurrently with the first tool listing
+            model, connections = await asyncio.gather(bl_model(MODEL_NAME), connecting)
+            self._model = InstrumentedLlm(model)
+        else:
+            connections = await connecting
+        tools = [GoogleADKTool(tool) for tool in connections.tools()]
+        # MCP failures come back as error results rather than exceptions, so they trigger the health check here
+        tools = [InstrumentedTool(tool, on_error=self.check_health_soon) for tool in tool_cache.wrap(tools + [weather])]
+        agent = Agent(
+            model=self._model,
+            name=APP_NAME,
+            description=DESCRIPTION,
+            instruction=PROMPT,
+            tools=tools,
+            before_model_callback=history_compactor,
+        )
+        previous, self._tools = self._tools, connections
+        self.runner = Runner(agent=agent, app_name=APP_NAME, session_service=session_service)
+        self.tools_loaded_at = time.monotonic()
+        logger.info(f"Agent runtime ready with {len(tools)} tools")
+        if previous:
+            await previous.retire()
+
+    async def _maintenance_loop(self):
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            try:
+                if self.tools_loaded_at and time.monotonic() - self.tools_loaded_at > self.tools_refresh_interval:
+                    await self.reconnect()
+                else:
+                    await self.health()
+            except Exception as e:
+                logger.error(f"Agent runtime maintenance failed: {e}")
+
+
+# Global instance
+agent_runtime = AgentRuntime()
+
+
+async def agent_events(
+    input: str, user_id: str, session_id: str, use_tool_cache: bool = True
+) -> AsyncGenerator[AgentUpdate, None]:
+    async with AsyncExitStack() as stack:
+        with timed(stage_seconds, "agent.setup", stage="agent_setup"):
+            runner = await stack.enter_async_context(agent_runtime.turn())
+
+            # Create the specific session where the conversation will happen
+            session = await session_service.get_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+            if not session:
+                session = await session_service.create_session(
+                    app_name=APP_NAME, user_id=user_id, session_id=session_id
+                )
+                logger.info(f"Session created: App='{APP_NAME}', User='{user_id}', Session='{session_id}'")
+
+        async for update in _run_turn(runner, input, user_id, session_id, use_tool_cache):
+            yield update
+
+
+async def _run_turn(
+    runner: Runner, input: str, user_id: str, session_id: str, use_tool_cache: bool
+) -> AsyncGenerator[AgentUpdate, None]:
+    content = types.Content(role="user", parts=[types.Part(text=input)])
+    # Tools run in this task's context, so the switch applies to this turn only
+    bypass = bypass_tool_cache.set(not use_tool_cache)
+    try:
+        async for event in runner.run_async(
+            user_id=user_id, session_id=session_id, new_message=content, run_config=agent_runtime.run_config
+        ):
+            # Key Concept: is_final_response() marks the concluding message for the turn.
+            if event.is_final_response():
+                if event.content and event.content.parts:
+                    # Assuming text response in the first part
+                    yield AgentUpdate("final", event.content.parts[0].text)
+                elif event.actions and event.actions.escalate:  # Handle potential errors/escalations
+                    yield AgentUpdate("final", f"Agent escalated: {event.error_message or 'No specific message.'}")
+            elif event.get_function_calls():
+                for call in event.get_function_calls():
+                    yield AgentUpdate("tool", call.name)
+            elif event.partial and event.content and event.content.parts and event.content.parts[0].text:
+                yield AgentUpdate("partial", event.content.parts[0].text)
+    except (ConnectionError, OSError):
+        # Most likely a dead tool session: rebuild in the background so the next turn gets a fresh one
+        agent_runtime.check_health_soon()
+        raise
+    finally:
+        bypass_tool_cache.reset(bypass)
+
+
+async def record_turn(input: str, answer: str, user_id: str, session_id: str):
+    """Add a turn answered without running the agent to its session, so that later turns have it in their history"""
     session = await session_service.get_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
     if not session:
         session = await session_service.create_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+    invocation_id = f"e-{uuid.uuid4()}"
+    for author, role, text in (("user", "user", input), (APP_NAME, "model", answer)):
+        content = types.Content(role=role, parts=[types.Part(text=text)])
+        await session_service.append_event(session, Event(invocation_id=invocation_id, author=author, content=content))
 
-    logger.info(f"Session created: App='{APP_NAME}', User='{user_id}', Session='{session_id}'")
 
-    runner = Runner(
-        agent=agent,
-        app_name=APP_NAME,
-        session_service=session_service,
-    )
-    logger.info(f"Runner created for agent '{runner.agent.name}'.")
-    content = types.Content(role="user", parts=[types.Part(text=input)])
-    async for event in runner.run_async(user_id=user_id, session_id=session_id, new_message=content):
-        # Key Concept: is_final_response() marks the concluding message for the turn.
-        if event.is_final_response():
-            if event.content and event.content.parts:
-                # Assuming text response in the first part
-                yield event.content.parts[0].text
-            elif event.actions and event.actions.escalate:  # Handle potential errors/escalations
-                yield f"Agent escalated: {event.error_message or 'No specific message.'}"
+async def agent(input: str, user_id: str, session_id: str, use_tool_cache: bool = True) -> AsyncGenerator[str, None]:
+    async for update in agent_events(input, user_id, session_id, use_tool_cache):
+        if update.kind == "final":
+            yield update.text
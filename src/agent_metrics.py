@@ -0,0 +1,70 @@
+import asyncio
+from typing import Any, AsyncGenerator, Callable, Dict, Optional
+
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.adk.tools import BaseTool
+from google.adk.tools.tool_context import ToolContext
+from google.genai import types
+
+from .metrics import Timer, model_call_seconds, timed, tool_call_seconds
+from .tool_cache import is_error
+
+
+class InstrumentedLlm(BaseLlm):
+    """Model wrapper timing each call into the metrics and a span"""
+
+    llm: BaseLlm
+
+    def __init__(self, llm: BaseLlm):
+        super().__init__(model=llm.model, llm=llm)
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        # The span is not made current: the generator is suspended at every yield, in the middle of the caller's code
+        timer = Timer(model_call_seconds, "model.call")
+        timer.span.set_attribute("model", self.model)
+        try:
+            async for response in self.llm.generate_content_async(llm_request, stream=stream):
+                if response.error_code:
+                    timer.outcome = "error"
+                yield response
+        except (asyncio.CancelledError, GeneratorExit):
+            timer.finish("cancelled")
+            raise
+        except Exception as e:
+            timer.finish("error", e)
+            raise
+        timer.finish()
+
+
+class InstrumentedTool(BaseTool):
+    """
+    ADK tool timing each call of the wrapped tool, including calls answered from the tool cache.
+
+    `on_error` is called when the tool fails or returns an error result.
+    """
+
+    def __init__(self, tool: BaseTool, on_error: Optional[Callable[[], None]] = None):
+        super().__init__(name=tool.name, description=tool.description, is_long_running=tool.is_long_running)
+        self.tool = tool
+        self.on_error = on_error
+
+    def _get_declaration(self) -> Optional[types.FunctionDeclaration]:
+        return self.tool._get_declaration()
+
+    async def run_async(self, *, args: Dict[str, Any], tool_context: ToolContext) -> Any:
+        with timed(tool_call_seconds, f"tool.{self.name}", tool=self.name) as timer:
+            try:
+                result = await self.tool.run_async(args=args, tool_context=tool_context)
+            except Exception:
+                self._failed()
+                raise
+            if is_error(result):
+                timer.outcome = "error"
+                self._failed()
+            return result
+
+    def _failed(self):
+        if self.on_error:
+            self.on_error()
@@ -0,0 +1,32 @@
+import asyncio
+from typing import Any, Coroutine, Set
+
+
+class BackgroundTasks:
+    """
+    Fire-and-forget tasks, such as replies to messages that could not be answered.
+
+    References are kept until the tasks finish so they are not garbage collected, and `drain` gives the ones still
+    running a bounded time to finish on shutdown.
+    """
+
+    def __init__(self):
+        self._tasks: Set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def run(self, coro: Coroutine[Any, Any, Any]) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def drain(self, timeout: float):
+        """Wait for the running tasks, cancelling those that take longer than the timeout"""
+        if not self._tasks:
+            return
+        _, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
@@ -0,0 +1,64 @@
+import os
+import time
+from collections import OrderedDict
+from logging import getLogger
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from .metrics import channel_cache_total
+from .single_flight import SingleFlight
+
+logger = getLogger(__name__)
+
+
+class ChannelCache:
+    """TTL/LRU cache of channel metadata where concurrent lookups of the same channel share one fetch"""
+
+    def __init__(
+        self,
+        fetch: Callable[[str], Awaitable[Dict[str, Any]]],
+        max_size: Optional[int] = None,
+        ttl: Optional[float] = None,
+    ):
+        if max_size is None:
+            max_size = int(os.getenv("SLACK_CHANNEL_CACHE_SIZE", "1000"))
+        if ttl is None:
+            ttl = float(os.getenv("SLACK_CHANNEL_CACHE_TTL", "3600"))
+        self.fetch = fetch
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._fetches = SingleFlight()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "coalesced": self.coalesced, "size": len(self._entries)}
+
+    async def get(self, channel_id: str) -> Dict[str, Any]:
+        """Return the channel info, fetching it only on a miss or after it expired"""
+        entry = self._entries.get(channel_id)
+        if entry and entry[0] > time.monotonic():
+            self._entries.move_to_end(channel_id)
+            self.hits += 1
+            channel_cache_total.inc(outcome="hit")
+            return entry[1]
+
+        if channel_id in self._fetches:
+            self.coalesced += 1
+            channel_cache_total.inc(outcome="coalesced")
+        else:
+            self.misses += 1
+            channel_cache_total.inc(outcome="miss")
+        return await self._fetches.run(channel_id, lambda: self._load(channel_id))
+
+    async def _load(self, channel_id: str) -> Dict[str, Any]:
+        info = await self.fetch(channel_id)
+        self.put(channel_id, info)
+        return info
+
+    def put(self, channel_id: str, info: Dict[str, Any]):
+        self._entries[channel_id] = (time.monotonic() + self.ttl, info)
+        self._entries.move_to_end(channel_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
@@ -0,0 +1,139 @@
+import os
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from logging import getLogger
+from typing import Optional
+
+from .sqlite_connection import SQLiteConnection
+
+logger = getLogger(__name__)
+
+
+class DedupStore(ABC):
+    """Remembers recently seen Slack event keys for a fixed TTL"""
+
+    def __init__(self, ttl: Optional[float] = None):
+        if ttl is None:
+            # Slack retries for about 5 minutes after the original delivery
+            ttl = float(os.getenv("SLACK_DEDUP_TTL", "900"))
+        self.ttl = ttl
+
+    @abstractmethod
+    async def check_and_add(self, *keys: str) -> bool:
+        """Record the keys, returning True without recording anything if one of them was already seen"""
+
+    @abstractmethod
+    async def contains(self, key: str) -> bool:
+        pass
+
+    @abstractmethod
+    async def discard(self, *keys: str):
+        """Forget keys, e.g. for an event that was shed and should be processed when Slack retries it"""
+
+    async def close(self):
+        pass
+
+
+class MemoryDedupStore(DedupStore):
+    """
+    Per-process store. Every key gets the same TTL, so insertion order is expiry order and the oldest entries are
+    evicted from the front of an OrderedDict in O(1).
+    """
+
+    def __init__(self, ttl: Optional[float] = None, max_size: Optional[int] = None):
+        super().__init__(ttl)
+        if max_size is None:
+            max_size = int(os.getenv("SLACK_DEDUP_MAX_SIZE", "10000"))
+        self.max_size = max_size
+        self._expiries: "OrderedDict[str, float]" = OrderedDict()
+
+    async def check_and_add(self, *keys: str) -> bool:
+        now = time.monotonic()
+        self._evict(now)
+        if any(key in self._expiries for key in keys):
+            return True
+        for key in keys:
+            self._expiries[key] = now + self.ttl
+        while len(self._expiries) > self.max_size:
+            self._expiries.popitem(last=False)
+        return False
+
+    async def contains(self, key: str) -> bool:
+        self._evict(time.monotonic())
+        return key in self._expiries
+
+    async def discard(self, *keys: str):
+        for key in keys:
+            self._expiries.pop(key, None)
+
+    def _evict(self, now: float):
+        while self._expiries:
+            key, expiry = next(iter(self._expiries.items()))
+            if expiry > now:
+                break
+            del self._expiries[key]
+
+
+class SQLiteDedupStore(DedupStore):
+    """Store in a local SQLite file so several worker processes on one host share one dedup view"""
+
+    def __init__(self, path: Optional[str] = None, ttl: Optional[float] = None):
+        super().__init__(ttl)
+        self.path = path or os.getenv("SLACK_DEDUP_PATH") or os.path.join(tempfile.gettempdir(), "slack-dedup.sqlite3")
+        self._inserts = 0
+        self._db = SQLiteConnection(self.path)
+        self._conn = self._db.conn
+        self._conn.execute("CREATE TABLE IF NOT EXISTS seen (key TEXT PRIMARY KEY, expires REAL NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS seen_expires ON seen (expires)")
+
+    async def check_and_add(self, *keys: str) -> bool:
+        return await self._db.run(self._check_and_add, keys)
+
+    async def contains(self, key: str) -> bool:
+        return await self._db.run(self._contains, key)
+
+    async def discard(self, *keys: str):
+        await self._db.run(self._conn.executemany, "DELETE FROM seen WHERE key = ?", [(k,) for k in keys])
+
+    async def close(self):
+        await self._db.close()
+
+    def _check_and_add(self, keys) -> bool:
+        # Wall-clock time, since expiries are compared across processes
+        now = time.time()
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            placeholders = ",".join("?" * len(keys))
+            seen = self._conn.execute(
+                f"SELECT 1 FROM seen WHERE key IN ({placeholders}) AND expires > ? LIMIT 1", (*keys, now)
+            ).fetchone()
+            if not seen:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO seen (key, expires) VALUES (?, ?)", [(k, now + self.ttl) for k in keys]
+                )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        if seen:
+            return True
+        self._inserts += 1
+        if self._inserts % 500 == 0:
+            self._conn.execute("DELETE FROM seen WHERE expires <= ?", (now,))
+        return False
+
+    def _contains(self, key: str) -> bool:
+        row = self._conn.execute("SELECT 1 FROM seen WHERE key = ? AND expires > ?", (key, time.time())).fetchone()
+        return row is not None
+
+
+def create_dedup_store() -> DedupStore:
+    """Build the backend selected by SLACK_DEDUP_BACKEND ("memory" or "sqlite")"""
+    backend = os.getenv("SLACK_DEDUP_BACKEND", "memory")
+    if backend == "sqlite":
+        return SQLiteDedupStore()
+    if backend != "memory":
+        logger.warning(f"Unknown SLACK_DEDUP_BACKEND '{backend}', using memory")
+    return MemoryDedupStore()
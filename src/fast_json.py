@@ -0,0 +1,8 @@
+# JSON parsing straight from request bytes, with orjson when it is installed. Both raise a ValueError subclass.
+try:
+    from orjson import loads
+except ImportError:
+    # json.loads accepts bytes too, detecting their encoding itself
+    from json import loads
+
+__all__ = ["loads"]
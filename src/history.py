@@ -0,0 +1,142 @@
+import os
+from logging import getLogger
+from typing import List, Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types
+
+logger = getLogger(__name__)
+
+# Rough size estimate, good enough to keep prompts within a budget without a tokenizer round trip
+CHARS_PER_TOKEN = 4
+OMITTED_TOOL_OUTPUT = {"result": "[older tool output omitted]"}
+
+
+def content_chars(content: types.Content) -> int:
+    """Characters of text, tool calls and tool results in a message, divided by CHARS_PER_TOKEN to estimate tokens"""
+    size = 0
+    for part in content.parts or []:
+        if part.text:
+            size += len(part.text)
+        elif part.function_call:
+            size += len(part.function_call.name or "") + len(str(part.function_call.args or ""))
+        elif part.function_response:
+            size += len(str(part.function_response.response or ""))
+    return size
+
+
+def _is_user_turn(content: types.Content) -> bool:
+    """A turn starts with a user message, as opposed to a user-role function response"""
+    return content.role == "user" and any(part.text for part in content.parts or [])
+
+
+def _first_text(content: types.Content) -> str:
+    for part in content.parts or []:
+        if part.text:
+            return " ".join(part.text.split())
+    return ""
+
+
+class HistoryCompactor:
+    """
+    before_model_callback that keeps the prompt sent to the model within a token budget.
+
+    Tool outputs older than the last few turns are replaced by a stub, keeping their function call pairing
+    intact. The oldest whole turns are then dropped until the history fits, and are optionally replaced by a
+    short extractive summary. The session itself keeps its full history.
+    """
+
+    def __init__(
+        self,
+        max_tokens: Optional[int] = None,
+        tool_output_turns: Optional[int] = None,
+        summary_tokens: Optional[int] = None,
+    ):
+        if max_tokens is None:
+            max_tokens = int(os.getenv("AGENT_HISTORY_MAX_TOKENS", "4000"))
+        if tool_output_turns is None:
+            tool_output_turns = int(os.getenv("AGENT_HISTORY_TOOL_OUTPUT_TURNS", "2"))
+        if summary_tokens is None:
+            summary_tokens = int(os.getenv("AGENT_HISTORY_SUMMARY_TOKENS", "300"))
+        self.max_tokens = max_tokens
+        self.tool_output_turns = tool_output_turns
+        self.summary_tokens = summary_tokens
+        self.compactions = 0
+        self.dropped_tokens = 0
+
+    def __call__(self, callback_context: CallbackContext, llm_request: LlmRequest) -> Optional[LlmResponse]:
+        llm_request.contents = self.compact(llm_request.contents)
+        return None
+
+    def compact(self, contents: List[types.Content]) -> List[types.Content]:
+        starts = [i for i, content in enumerate(contents) if _is_user_turn(content)]
+        if len(starts) <= 1:
+            return contents
+        turns = [contents[start:end] for start, end in zip(starts, starts[1:] + [len(contents)])]
+        preamble = contents[: starts[0]]
+        before = sum(content_chars(c) for c in contents) // CHARS_PER_TOKEN
+
+        # A negative setting keeps every tool output
+        if self.tool_output_turns >= 0:
+            cut = len(turns) - self.tool_output_turns
+            turns = [self._strip_tool_outputs(turn) if i < cut else turn for i, turn in enumerate(turns)]
+
+        # Keep the newest turns that fit the budget; the current turn is always kept
+        budget = self.max_tokens * CHARS_PER_TOKEN - sum(content_chars(c) for c in preamble)
+        kept: List[List[types.Content]] = []
+        for turn in reversed(turns):
+            size = sum(content_chars(c) for c in turn)
+            if kept and size > budget:
+                break
+            kept.insert(0, turn)
+            budget -= size
+        dropped = turns[: len(turns) - len(kept)]
+
+        result = list(preamble)
+        if dropped and self.summary_tokens > 0:
+            result.append(self._summarise(dropped))
+        for turn in kept:
+            result.extend(turn)
+
+        after = sum(content_chars(c) for c in result) // CHARS_PER_TOKEN
+        if after < before:
+            self.compactions += 1
+            self.dropped_tokens += before - after
+        return result
+
+    def _strip_tool_outputs(self, turn: List[types.Content]) -> List[types.Content]:
+        stripped = []
+        for content in turn:
+            if any(part.function_response for part in content.parts or []):
+                parts = [
+                    types.Part(
+                        function_response=types.FunctionResponse(
+                            id=part.function_response.id,
+                            name=part.function_response.name,
+                            response=OMITTED_TOOL_OUTPUT,
+                        )
+                    )
+                    if part.function_response
+                    else part
+                    for part in content.parts
+                ]
+                content = types.Content(role=content.role, parts=parts)
+            stripped.append(content)
+        return stripped
+
+    def _summarise(self, turns: List[List[types.Content]]) -> types.Content:
+        """Extractive summary of the most recent dropped turns: the start of each question and of its answer"""
+        budget = self.summary_tokens * CHARS_PER_TOKEN
+        lines: List[str] = []
+        for turn in reversed(turns):
+            answers = [c for c in turn if c.role == "model" and _first_text(c)]
+            entry = f"- User: {_first_text(turn[0])[:120]}"
+            if answers:
+                entry += f"\n  Assistant: {_first_text(answers[-1])[:120]}"
+            budget -= len(entry) + 1
+            if budget < 0:
+                break
+            lines.insert(0, entry)
+        summary = "\n".join(lines)
+        return types.Content(role="user", parts=[types.Part(text=f"Summary of the earlier conversation:\n{summary}")])
@@ -0,0 +1,132 @@
+import asyncio
+import os
+from collections import Counter, deque
+from logging import getLogger
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+from .work_queue import WorkQueue
+
+logger = getLogger(__name__)
+
+
+class ConversationMailboxes:
+    """
+    Per-conversation mailboxes in front of the work queue.
+
+    Turns of one conversation run strictly one at a time. Messages arriving while a turn is queued or running are
+    handed together to the conversation's next turn. For fairness, a conversation goes back to the end of the
+    queue after each turn, and each group (a Slack channel) may only run a limited number of turns at once, taking
+    turns round-robin between its conversations. Beyond that share, a group may still use idle workers unless a
+    waiting group is running fewer turns.
+    """
+
+    def __init__(
+        self,
+        queue: WorkQueue,
+        handler: Callable[[List[Any]], Awaitable[Any]],
+        max_per_group: Optional[int] = None,
+        max_pending: Optional[int] = None,
+    ):
+        if max_per_group is None:
+            max_per_group = int(os.getenv("SLACK_MAX_TURNS_PER_CHANNEL", str(max(1, queue.workers // 4))))
+        if max_pending is None:
+            max_pending = int(os.getenv("SLACK_MAX_PENDING_MESSAGES", "200"))
+        self.queue = queue
+        self.handler = handler
+        self.max_per_group = max_per_group
+        self.max_pending = max_pending
+        self.coalesced = 0
+        self._pending: Dict[str, List[Any]] = {}
+        self._pending_count = 0
+        self._running: Dict[str, List[Any]] = {}
+        # Keys waiting for a slot in their group, or submitted to the queue but not started yet
+        self._scheduled: Set[str] = set()
+        self._waiting: Dict[str, Deque[str]] = {}
+        self._active: Counter = Counter()
+        self._lost: List[Any] = []
+        # Any finished job frees a queue slot, including the jobs of other mailboxes sharing the queue
+        queue.add_done_callback(self._wake_all)
+
+    @property
+    def pending(self) -> int:
+        return self._pending_count
+
+    def post(self, key: str, group: str, item: Any) -> bool:
+        """Hand a message to its conversation. Returns False when it has to be shed."""
+        if self._pending_count >= self.max_pending:
+            logger.warning(f"{self._pending_count} messages pending, shedding load")
+            return False
+        self._pending.setdefault(key, []).append(item)
+        self._pending_count += 1
+        if key in self._scheduled or key in self._running:
+            # Picked up by the turn that is about to start, or by the one following the running turn
+            return True
+
+        self._scheduled.add(key)
+        self._waiting.setdefault(group, deque()).append(key)
+        self._wake(group)
+        waiting = self._waiting.get(group)
+        if waiting and key in waiting and self._has_slot(group):
+            # The group had a free slot but the queue refused the job
+            waiting.remove(key)
+            if not waiting:
+                del self._waiting[group]
+            self._scheduled.discard(key)
+            self._pending[key].pop()
+            if not self._pending[key]:
+                del self._pending[key]
+            self._pending_count -= 1
+            return False
+        return True
+
+    def unfinished(self) -> List[Any]:
+        """Messages accepted but never answered: pending ones and those of cancelled turns"""
+        return self._lost + [item for items in self._pending.values() for item in items]
+
+    async def _run(self, key: str, group: str):
+        self._scheduled.discard(key)
+        items = self._pending.pop(key, [])
+        self._pending_count -= len(items)
+        self._running[key] = items
+        if len(items) > 1:
+            self.coalesced += len(items) - 1
+        try:
+            if items:
+                await self.handler(items)
+        except asyncio.CancelledError:
+            self._lost.extend(items)
+            raise
+        finally:
+            del self._running[key]
+            self._active[group] -= 1
+            if not self._active[group]:
+                del self._active[group]
+            if key in self._pending and key not in self._scheduled:
+                # More messages arrived meanwhile: queue the follow-up turn behind the group's other conversations
+                self._scheduled.add(key)
+                self._waiting.setdefault(group, deque()).append(key)
+            # The follow-up is woken by the queue's done callback, once this turn's worker is free
+
+    def _has_slot(self, group: str) -> bool:
+        active = self._active[group]
+        if active < self.max_per_group:
+            return True
+        if self.queue.in_flight + self.queue.depth >= self.queue.workers:
+            return False
+        # Over its share, a group only takes idle workers, and leaves them to waiting groups running fewer turns
+        return all(self._active[other] >= active for other in self._waiting if other != group)
+
+    def _wake(self, group: str):
+        waiting = self._waiting.get(group)
+        while waiting and self._has_slot(group):
+            if not self.queue.submit(self._run, waiting[0], group):
+                break
+            waiting.popleft()
+            self._active[group] += 1
+        if not waiting:
+            self._waiting.pop(group, None)
+
+    def _wake_all(self):
+        # A finished job frees a queue slot, which a conversation of any group may have been waiting for
+        for group in list(self._waiting):
+            self._wake(group)
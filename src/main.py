@@ -1,22 +1,70 @@
+import asyncio
 import os
 from contextlib import asynccontextmanager
 from logging import getLogger
 
 from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 
+from .metrics import CONTENT_TYPE, registry
 from .server.error import init_error_handlers
 from .server.middleware import init_middleware
+from .slack_commands import slack_commands
+from .slack_integration import slack_integration
 from .slack_router import slack_router
+from .socket_mode import socket_mode, transport
+from .startup import Startup, loaded_agent
+from .work_queue import work_queue
 
 logger = getLogger(__name__)
+startup = Startup()
+
+registry.gauge("slack_bot_work_queue_depth", "Agent turns waiting for a worker", lambda: work_queue.depth)
+registry.gauge("slack_bot_turns_in_flight", "Agent turns being run", lambda: work_queue.in_flight)
+registry.gauge(
+    "slack_bot_pending_messages",
+    "Messages waiting for their conversation's next turn",
+    lambda: slack_integration.mailboxes.pending + slack_commands.mailboxes.pending,
+)
+# Skipped until the agent module has been loaded in the background
+registry.gauge(
+    "slack_bot_tool_cache_hit_ratio",
+    "Share of cacheable tool calls answered from the cache or by a call in flight",
+    lambda: loaded_agent().tool_cache.stats()["hit_ratio"],
+)
+registry.gauge(
+    "slack_bot_channel_cache_size",
+    "Channels whose metadata is cached",
+    lambda: slack_integration.channels.stats()["size"],
+)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info(f"Server running on port {os.getenv('PORT', 80)}")
-    yield
-    logger.info("Server shutting down")
+    # Uvicorn only binds once the lifespan has started, so the slow parts of startup run in the background.
+    # Messages received meanwhile are queued and wait for the agent to load.
+    await work_queue.start()
+    startup_task = asyncio.create_task(startup.run(slack_integration.start))
+    if transport() == "socket":
+        await socket_mode.start()
+    try:
+        yield
+    finally:
+        logger.info("Server shutting down")
+        # Stop receiving before draining what was received
+        await socket_mode.stop()
+        if not startup_task.done():
+            startup_task.cancel()
+            await asyncio.gather(startup_task, return_exceptions=True)
+        await work_queue.stop()
+        await slack_integration.shutdown()
+        await slack_commands.shutdown()
+        agent = loaded_agent()
+        if agent:
+            await agent.agent_runtime.stop()
+            await agent.session_service.close()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -25,6 +73,28 @@ init_middleware(app)
 app.include_router(slack_router)
 
 
+@app.get("/health")
+async def health():
+    """Liveness: the process is up and serving requests"""
+    return {"status": "ok"}
+
+
+@app.get("/ready")
+async def ready():
+    """Readiness: Slack accepted the token, the agent runtime is built and, in Socket Mode, the WebSocket is open"""
+    status = startup.status()
+    if transport() == "socket":
+        status["socket_mode"] = socket_mode.stats()
+        status["ready"] = status["ready"] and socket_mode.connected
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
+@app.get("/metrics")
+async def metrics():
+    """Stage latencies, Slack API and model call timings and queue depths in the Prometheus text format"""
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
+
+
 @app.post("/")
 async def root(request: Request):
     return Response(
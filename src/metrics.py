@@ -0,0 +1,291 @@
+import asyncio
+import math
+import os
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from logging import getLogger
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from opentelemetry import context as otel_context
+from opentelemetry import trace
+
+logger = getLogger(__name__)
+tracer = trace.get_tracer(__name__)
+
+# Seconds, from a dedup lookup to a slow model call
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(pairs: Sequence[Tuple[str, Any]]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} expects labels {self.labels}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    @abstractmethod
+    def samples(self) -> Iterator[Tuple[str, List[Tuple[str, Any]], float]]:
+        """Yield (name suffix, label pairs, value) for each sample"""
+
+    def render(self, const_labels: Sequence[Tuple[str, Any]] = ()) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, pairs, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels([*const_labels, *pairs])} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Counter whose name, by convention, ends in _total"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        for key, value in self._values.items():
+            yield "", list(zip(self.labels, key)), value
+
+
+class Gauge(_Metric):
+    """Gauge read from a callback when the metrics are rendered, for values other components already track"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, read: Callable[[], float]):
+        super().__init__(name, help)
+        self.read = read
+
+    def samples(self):
+        try:
+            yield "", [], self.read()
+        except Exception as e:
+            logger.debug(f"Failed to read gauge {self.name}: {e}")
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> (per-bucket counts, sum, count)
+        self._values: Dict[Tuple[str, ...], List[Any]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        entry = self._values.get(key)
+        if entry is None:
+            entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                entry[0][i] += 1
+                break
+        entry[1] += value
+        entry[2] += 1
+
+    def count(self, **labels) -> int:
+        entry = self._values.get(self._key(labels))
+        return entry[2] if entry else 0
+
+    def samples(self):
+        for key, (counts, total, count) in self._values.items():
+            pairs = list(zip(self.labels, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield "_bucket", [*pairs, ("le", _format_value(bound))], cumulative
+            yield "_bucket", [*pairs, ("le", "+Inf")], count
+            yield "_sum", pairs, total
+            yield "_count", pairs, count
+
+
+class MetricsRegistry:
+    """
+    Process-local metrics in the Prometheus text format.
+
+    Everything runs on one event loop, so updates need no locking. Under the multi-worker server each worker adds
+    its index as a `worker` label and the router merges the workers' outputs.
+    """
+
+    def __init__(self, const_labels: Optional[Dict[str, Any]] = None):
+        self.const_labels = sorted((const_labels or {}).items())
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> Any:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (), **kwargs) -> Histogram:
+        return self._register(Histogram(name, help, labels, **kwargs))
+
+    def gauge(self, name: str, help: str, read: Callable[[], float]) -> Gauge:
+        return self._register(Gauge(name, help, read))
+
+    def render(self) -> str:
+        return "\n".join(metric.render(self.const_labels) for metric in self._metrics.values()) + "\n"
+
+
+def merge_exposition(texts: Sequence[str]) -> str:
+    """Merge the outputs of several registries, keeping one HELP/TYPE header and one block per metric"""
+    # metric name -> {"HELP": line, "TYPE": line}, in the order metrics first appear
+    headers: Dict[str, Dict[str, str]] = {}
+    samples: Dict[str, List[str]] = {}
+    for text in texts:
+        name = None
+        for line in text.splitlines():
+            if line.startswith("# "):
+                _, kind, name, *_ = line.split(" ", 3)
+                headers.setdefault(name, {}).setdefault(kind, line)
+                samples.setdefault(name, [])
+            elif line and name:
+                samples[name].append(line)
+    return "\n".join("\n".join([*headers[name].values(), *samples[name]]) for name in headers) + "\n"
+
+
+class Timer:
+    """
+    Times one stage into a histogram and an OpenTelemetry span, which is ended with the outcome as an attribute.
+
+    The span is a child of `context` when given, of the current span otherwise. It is not made current, so a
+    Timer may be finished from another task; use `timed` to nest the spans of the stage's own calls under it.
+    """
+
+    def __init__(self, histogram: Histogram, span_name: str, context: Optional[otel_context.Context] = None, **labels):
+        self.histogram = histogram
+        self.labels = labels
+        self.outcome = "ok"
+        self.span = tracer.start_span(span_name, context=context, attributes={k: str(v) for k, v in labels.items()})
+        self.start = perf_counter()
+        self._finished = False
+
+    def elapsed(self) -> float:
+        return perf_counter() - self.start
+
+    def finish(self, outcome: Optional[str] = None, error: Optional[BaseException] = None) -> float:
+        if self._finished:
+            return 0.0
+        self._finished = True
+        duration = self.elapsed()
+        self.outcome = outcome or self.outcome
+        self.span.set_attribute("outcome", self.outcome)
+        if error is not None:
+            self.span.record_exception(error)
+            self.span.set_status(trace.Status(trace.StatusCode.ERROR, str(error)))
+        self.span.end()
+        self.histogram.observe(duration, outcome=self.outcome, **self.labels)
+        return duration
+
+
+@contextmanager
+def timed(
+    histogram: Histogram, span_name: str, context: Optional[otel_context.Context] = None, **labels
+) -> Iterator[Timer]:
+    """
+    Time a block as a stage, with its span current inside the block. The outcome is "error" or "cancelled" when the
+    block raises, otherwise "ok"; an outcome set by the block through `timer.outcome` takes precedence.
+    """
+    timer = Timer(histogram, span_name, context, **labels)
+    with trace.use_span(timer.span, end_on_exit=False, record_exception=False, set_status_on_exception=False):
+        try:
+            yield timer
+        except asyncio.CancelledError as e:
+            timer.finish("cancelled", e)
+            raise
+        except Exception as e:
+            timer.finish("error" if timer.outcome == "ok" else timer.outcome, e)
+            raise
+    timer.finish()
+
+
+def current_context() -> otel_context.Context:
+    """The current trace context, to parent spans of work that continues in another task"""
+    return otel_context.get_current()
+
+
+worker_index = os.getenv("SERVER_WORKER_INDEX")
+registry = MetricsRegistry({"worker": worker_index} if worker_index is not None else None)
+
+stage_seconds = registry.histogram(
+    "slack_bot_stage_seconds",
+    "Duration of the stages of handling a Slack message",
+    ["stage", "outcome"],
+)
+model_call_seconds = registry.histogram("slack_bot_model_call_seconds", "Duration of model calls", ["outcome"])
+tool_call_seconds = registry.histogram("slack_bot_tool_call_seconds", "Duration of tool calls", ["tool", "outcome"])
+time_to_first_token_seconds = registry.histogram(
+    "slack_bot_time_to_first_token_seconds",
+    "Time from the start of a turn to the first text of the answer",
+)
+slack_api_seconds = registry.histogram(
+    "slack_bot_slack_api_seconds",
+    "Duration of Slack Web API calls, each retry counted separately",
+    ["method", "outcome"],
+)
+response_cache_total = registry.counter(
+    "slack_bot_response_cache_total",
+    "Response cache lookups (hit, miss) and answers offered to it (stored, uncacheable)",
+    ["outcome"],
+)
+channel_cache_total = registry.counter(
+    "slack_bot_channel_cache_total",
+    "Channel metadata lookups, by whether they were a hit, a miss or joined a fetch in flight",
+    ["outcome"],
+)
+session_evictions_total = registry.counter(
+    "slack_bot_session_evictions_total", "Sessions evicted from memory, to be hydrated from SQLite when next used"
+)
+session_hydration_seconds = registry.histogram(
+    "slack_bot_session_hydration_seconds", "Time to load a session that is not in memory from SQLite"
+)
+tool_cache_total = registry.counter(
+    "slack_bot_tool_cache_total",
+    "Tool calls through the tool cache, by whether they were a hit, a miss, joined a call in flight or bypassed it",
+    ["tool", "outcome"],
+)
+tool_cache_saved_seconds_total = registry.counter(
+    "slack_bot_tool_cache_saved_seconds_total",
+    "Seconds the original calls took for tool results answered from the cache",
+    ["tool"],
+)
+events_total = registry.counter(
+    "slack_bot_events_total", "Slack events received, by what was done with them", ["outcome"]
+)
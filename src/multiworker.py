@@ -0,0 +1,248 @@
+import asyncio
+import bisect
+import hashlib
+import multiprocessing
+import os
+import tempfile
+from contextlib import asynccontextmanager
+from logging import getLogger
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qsl
+
+import aiohttp
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from .fast_json import loads
+from .metrics import CONTENT_TYPE, merge_exposition
+from .slack_commands import command_session_id
+from .slack_security import slack_security
+from .thread_cache import conversation_id
+
+logger = getLogger(__name__)
+
+# Hop-by-hop headers are not forwarded; the body is forwarded whole, so its length is set again
+HOP_HEADERS = {"connection", "keep-alive", "transfer-encoding", "content-length", "host", "upgrade"}
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent hash ring: changing the number of nodes only moves the keys of the nodes added or removed"""
+
+    def __init__(self, nodes: int, replicas: int = 100):
+        self.nodes = nodes
+        points = sorted((_hash(f"{node}:{i}"), node) for node in range(nodes) for i in range(replicas))
+        self._hashes = [h for h, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def node_for(self, key: str) -> int:
+        i = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._nodes[i]
+
+
+def conversation_key(body: bytes) -> str:
+    """
+    Routing key of a Slack payload: the conversation of a message, its thread or DM, so that every turn of a
+    conversation, every retry or duplicate delivery of a message, and the thread's cached history share a worker.
+    Slash commands and interactive payloads are form encoded and keyed by the user and channel they come from.
+    """
+    try:
+        payload = loads(body)
+        event = payload.get("event") or {}
+        return conversation_id(event) if event else str(payload.get("type"))
+    except (ValueError, AttributeError):
+        pass
+    try:
+        form = dict(parse_qsl(body.decode()))
+        if "payload" in form:
+            payload = loads(form["payload"])
+            return command_session_id((payload.get("channel") or {}).get("id"), (payload.get("user") or {}).get("id"))
+        return command_session_id(form.get("channel_id"), form.get("user_id")) if "user_id" in form else ""
+    except (ValueError, AttributeError):
+        return ""
+
+
+async def read_limited_body(request: Request, limit: int) -> Optional[bytes]:
+    """The request body, or None when it is larger than the limit, checked before and while reading it"""
+    content_length = request.headers.get("Content-Length")
+    if content_length and content_length.isdigit() and int(content_length) > limit:
+        return None
+    # Chunked bodies have no Content-Length, so the limit is also enforced while reading
+    chunks = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > limit:
+            return None
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def _run_worker(app: str, uds: str):
+    uvicorn.run(app, uds=uds, log_level=os.getenv("SERVER_WORKER_LOG_LEVEL", "info"))
+
+
+class WorkerPool:
+    """
+    Worker processes running the full app on Unix sockets, behind a router that forwards each request to the
+    worker owning its conversation.
+
+    Each worker keeps its own work queue, mailboxes, dedup store and session cache. This is correct because a
+    conversation, and every delivery of a message, always lands on the same worker; sessions are persisted to the
+    shared SQLite file, so a conversation that moves when the worker count changes is rehydrated from disk.
+    """
+
+    def __init__(self, app: str, workers: int):
+        self.app = app
+        self.workers = workers
+        self.ring = HashRing(workers)
+        self.restart_delay = float(os.getenv("SERVER_WORKER_RESTART_DELAY", "1"))
+        self._dir = tempfile.mkdtemp(prefix="slack-workers-")
+        self.sockets = [os.path.join(self._dir, f"worker-{i}.sock") for i in range(workers)]
+        self._context = multiprocessing.get_context("spawn")
+        self._processes: List[Optional[multiprocessing.Process]] = [None] * workers
+        self._sessions: List[Optional[aiohttp.ClientSession]] = [None] * workers
+        self._monitor_task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    async def start(self):
+        for i in range(self.workers):
+            self._spawn(i)
+            self._sessions[i] = aiohttp.ClientSession(
+                connector=aiohttp.UnixConnector(path=self.sockets[i], limit=100, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=30),
+            )
+        self._monitor_task = asyncio.create_task(self._monitor())
+        logger.info(f"Started {self.workers} workers running {self.app}")
+
+    async def stop(self, timeout: float = 30):
+        self._stopping = True
+        if self._monitor_task:
+            self._monitor_task.cancel()
+            await asyncio.gather(self._monitor_task, return_exceptions=True)
+        # SIGTERM lets each worker run its lifespan shutdown and drain its queue
+        for process in self._processes:
+            if process and process.is_alive():
+                process.terminate()
+        for process in self._processes:
+            if process:
+                await asyncio.to_thread(process.join, timeout)
+                if process.is_alive():
+                    logger.error(f"Worker {process.name} did not stop in {timeout}s, killing it")
+                    process.kill()
+        for session in self._sessions:
+            if session:
+                await session.close()
+
+    async def forward(self, worker: int, request: Request, body: bytes) -> Response:
+        headers = {k: v for k, v in request.headers.items() if k.lower() not in HOP_HEADERS}
+        url = f"http://worker{request.url.path}"
+        if request.url.query:
+            url += f"?{request.url.query}"
+        async with self._sessions[worker].request(request.method, url, headers=headers, data=body) as response:
+            content = await response.read()
+            headers = {k: v for k, v in response.headers.items() if k.lower() not in HOP_HEADERS}
+            return Response(content, status_code=response.status, headers=headers)
+
+    async def ready(self) -> Dict[str, Any]:
+        async def check(i: int) -> bool:
+            try:
+                async with self._sessions[i].get("http://worker/ready") as response:
+                    return response.status == 200
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                return False
+
+        workers = await asyncio.gather(*(check(i) for i in range(self.workers)))
+        return {"ready": all(workers), "workers": list(workers)}
+
+    async def metrics(self) -> str:
+        """The metrics of every worker that answers, each labelled with its worker index"""
+
+        async def fetch(i: int) -> str:
+            try:
+                async with self._sessions[i].get("http://worker/metrics") as response:
+                    return await response.text() if response.status == 200 else ""
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                return ""
+
+        return merge_exposition(await asyncio.gather(*(fetch(i) for i in range(self.workers))))
+
+    def _spawn(self, i: int):
+        if os.path.exists(self.sockets[i]):
+            os.unlink(self.sockets[i])
+        process = self._context.Process(
+            target=_run_worker, args=(self.app, self.sockets[i]), name=f"worker-{i}", daemon=False
+        )
+        # The child imports src.metrics, which reads the index, while unpickling the target, before the target runs;
+        # it is set in the environment the child starts with instead
+        os.environ["SERVER_WORKER_INDEX"] = str(i)
+        try:
+            process.start()
+        finally:
+            del os.environ["SERVER_WORKER_INDEX"]
+        self._processes[i] = process
+
+    async def _monitor(self):
+        while not self._stopping:
+            await asyncio.sleep(self.restart_delay)
+            for i, process in enumerate(self._processes):
+                if process and not process.is_alive() and not self._stopping:
+                    logger.error(f"Worker {i} exited with code {process.exitcode}, restarting it")
+                    self._spawn(i)
+
+
+def create_router(app: str, workers: int) -> Starlette:
+    """ASGI app that starts the worker pool and routes Slack requests by conversation"""
+    pool = WorkerPool(app, workers)
+
+    async def health(request: Request) -> Response:
+        return JSONResponse({"status": "ok"})
+
+    async def ready(request: Request) -> Response:
+        status = await pool.ready()
+        return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+    async def metrics(request: Request) -> Response:
+        return Response(await pool.metrics(), media_type=CONTENT_TYPE)
+
+    async def route(request: Request) -> Response:
+        slack = request.url.path.startswith("/slack/")
+        if slack:
+            # The workers reject oversized Slack requests too, but the router would buffer the whole body first
+            body = await read_limited_body(request, slack_security.max_body_bytes)
+            if body is None:
+                return JSONResponse({"detail": "Request too large"}, status_code=413)
+        else:
+            body = await request.body()
+        key = conversation_key(body) if slack else request.url.path
+        try:
+            return await pool.forward(pool.ring.node_for(key), request, body)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            # Slack retries deliveries that were not acked, by which time the worker may be back
+            logger.error(f"Failed to forward {request.url.path} to a worker: {e}")
+            return JSONResponse({"error": "worker unavailable"}, status_code=503)
+
+    @asynccontextmanager
+    async def lifespan(router: Starlette):
+        await pool.start()
+        try:
+            yield
+        finally:
+            await pool.stop()
+
+    methods = ["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "HEAD"]
+    return Starlette(
+        routes=[
+            Route("/health", health),
+            Route("/ready", ready),
+            Route("/metrics", metrics),
+            Route("/{path:path}", route, methods=methods),
+        ],
+        lifespan=lifespan,
+    )
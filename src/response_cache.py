@@ -0,0 +1,107 @@
+import hashlib
+import os
+import re
+import time
+from collections import OrderedDict
+from logging import getLogger
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+
+logger = getLogger(__name__)
+
+_MENTION = re.compile(r"<@([A-Z0-9]+)(\|[^>]*)?>")
+_EDGE_PUNCTUATION = " \t\n.,;:!?¿¡'\"`*_~"
+
+
+def normalise_question(text: str, bot_user_id: Optional[str] = None) -> str:
+    """
+    Make questions that only differ in case, spacing, surrounding punctuation or a mention of the bot produce the
+    same key. Mentions of anyone else are kept, since they change what is asked.
+    """
+    if bot_user_id:
+        text = _MENTION.sub(lambda m: " " if m.group(1) == bot_user_id else m.group(0), text)
+    return " ".join(text.split()).casefold().strip(_EDGE_PUNCTUATION)
+
+
+def config_fingerprint(*parts: str) -> str:
+    """Short hash of the agent configuration, so that changing the model, prompt or tools invalidates answers"""
+    return hashlib.blake2b("\0".join(parts).encode(), digest_size=8).hexdigest()
+
+
+def _parse_channels(spec: str) -> Set[str]:
+    return {channel.strip() for channel in spec.split(",") if channel.strip()}
+
+
+class ResponseCache:
+    """
+    Opt-in TTL/LRU cache of the agent's answers to the first message of a conversation, keyed by the normalised
+    question and the agent configuration.
+
+    An answer never outlives the cached results of the tools it was built from: its TTL is the smallest of the
+    cache's TTL and the TTLs of those tools, and answers that used a tool whose results are not cached are not
+    stored. A TTL of 0, the default, disables the cache.
+    """
+
+    def __init__(
+        self,
+        max_size: Optional[int] = None,
+        ttl: Optional[float] = None,
+        opt_out_channels: Optional[Iterable[str]] = None,
+    ):
+        if max_size is None:
+            max_size = int(os.getenv("AGENT_RESPONSE_CACHE_SIZE", "500"))
+        if ttl is None:
+            ttl = float(os.getenv("AGENT_RESPONSE_CACHE_TTL", "0"))
+        if opt_out_channels is None:
+            opt_out_channels = _parse_channels(os.getenv("AGENT_RESPONSE_CACHE_OPT_OUT_CHANNELS", ""))
+        self.max_size = max_size
+        self.ttl = ttl
+        self.opt_out_channels = set(opt_out_channels)
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.uncacheable = 0
+        # key -> (expiry, answer)
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stored": self.stored,
+            "uncacheable": self.uncacheable,
+            "size": len(self._entries),
+        }
+
+    def enabled_for(self, channel: Optional[str]) -> bool:
+        return self.ttl > 0 and self.max_size > 0 and channel not in self.opt_out_channels
+
+    def key(self, question: str, config: str) -> Optional[str]:
+        """Cache key of a normalised question, None when there is nothing left to key on"""
+        return f"{config}:{question}" if question else None
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        if entry:
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key: str, answer: str, tools: Iterable[str], tool_ttl: Callable[[str], float]) -> bool:
+        """Store an answer built with the given tools, returning whether it was cacheable"""
+        ttl = min([self.ttl, *(tool_ttl(tool) for tool in set(tools))])
+        if ttl <= 0 or not answer:
+            self.uncacheable += 1
+            return False
+        self._entries[key] = (time.monotonic() + ttl, answer)
+        self._entries.move_to_end(key)
+        self.stored += 1
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return True
+
+    def clear(self):
+        self._entries.clear()
@@ -1,63 +1,102 @@
 import logging
 import os
-from time import time
+from time import perf_counter
+from typing import List, Tuple
 
 from asgi_correlation_id import CorrelationIdMiddleware
-from fastapi import FastAPI, Request, Response
+from fastapi import FastAPI
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 logger = logging.getLogger(__name__)
 
+REQUEST_ID_HEADERS = (b"x-request-id", b"x-blaxel-request-id")
+
+
+def cors_headers(preflight: bool = False) -> List[Tuple[bytes, bytes]]:
+    """CORS headers added to every response, encoded once"""
+    app_url = "https://app.blaxel.ai" if os.getenv("BL_ENV") == "prod" else "https://app.blaxel.dev"
+    headers = [
+        (b"access-control-allow-origin", app_url.encode()),
+        (b"access-control-allow-methods", b"GET, POST, PUT, DELETE, PATCH, OPTIONS, HEAD"),
+        (
+            b"access-control-allow-headers",
+            b"Content-Type, Authorization, X-Requested-With, Accept, Origin, X-Request-Id, X-Blaxel-Request-Id",
+        ),
+        (b"access-control-allow-credentials", b"true"),
+        (b"access-control-max-age", b"86400"),  # 24 hours
+        (b"access-control-expose-headers", b"X-Request-Id, X-Blaxel-Request-Id"),
+    ]
+    if preflight:
+        headers.append((b"content-length", b"0"))
+    return headers
+
+
+class RequestMiddleware:
+    """
+    Pure ASGI middleware answering CORS preflights, adding CORS headers and logging request timings.
+
+    It replaces two @app.middleware("http") layers, which each ran the rest of the stack in a separate task and
+    wrapped the response stream. Headers are encoded once at startup, and the access log passes its fields as
+    logging arguments, so nothing is formatted unless the record is emitted.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.headers = cors_headers()
+        self.preflight = {"type": "http.response.start", "status": 200, "headers": cors_headers(preflight=True)}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] == "OPTIONS":
+            await send(self.preflight)
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        start = perf_counter()
+        status = 500
+        request_id = None
+
+        async def send_wrapper(message: Message):
+            nonlocal status, request_id
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = message.get("headers", ())
+                for name, value in headers:
+                    if name.lower() in REQUEST_ID_HEADERS:
+                        request_id = value.decode("latin-1")
+                        break
+                # A new list, since the response may be reused and owns the one it sent
+                message["headers"] = [*headers, *self.headers]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            level = logging.ERROR if status >= 400 else logging.INFO
+            if logger.isEnabledFor(level):
+                duration_ms = (perf_counter() - start) * 1000
+                logger.log(
+                    level,
+                    "%s %s %d %.2fms rid=%s",
+                    scope["method"],
+                    scope["path"],
+                    status,
+                    duration_ms,
+                    request_id,
+                    extra={
+                        "http_method": scope["method"],
+                        "http_path": scope["path"],
+                        "http_status": status,
+                        "duration_ms": duration_ms,
+                        "request_id": request_id,
+                    },
+                )
+
 
 def init_middleware(app: FastAPI):
     app.add_middleware(CorrelationIdMiddleware)
-
-    @app.middleware("http")
-    async def log_requests(request: Request, call_next):
-        start_time = time()
-
-        response: Response = await call_next(request)
-
-        process_time = (time() - start_time) * 1000
-        formatted_process_time = "{0:.2f}".format(process_time)
-        rid_header = response.headers.get("X-Request-Id")
-        request_id = rid_header or response.headers.get("X-Blaxel-Request-Id")
-        message = (
-            f"{request.method} {request.url.path} {response.status_code} {formatted_process_time}ms rid={request_id}"
-        )
-        if response.status_code >= 400:
-            logger.error(message)
-        else:
-            logger.info(message)
-
-        return response
-
-    @app.middleware("http")
-    async def add_cors_headers(request: Request, call_next):
-        app_url = "https://app.blaxel.ai" if os.getenv("BL_ENV") == "prod" else "https://app.blaxel.dev"
-
-        # Handle preflight OPTIONS requests
-        if request.method == "OPTIONS":
-            response = Response()
-            response.headers["Access-Control-Allow-Origin"] = app_url
-            response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, PATCH, OPTIONS, HEAD"
-            response.headers["Access-Control-Allow-Headers"] = (
-                "Content-Type, Authorization, X-Requested-With, Accept, Origin, X-Request-Id, X-Blaxel-Request-Id"
-            )
-            response.headers["Access-Control-Allow-Credentials"] = "true"
-            response.headers["Access-Control-Max-Age"] = "86400"  # 24 hours
-            response.headers["Access-Control-Expose-Headers"] = "X-Request-Id, X-Blaxel-Request-Id"
-            return response
-
-        response = await call_next(request)
-
-        # Add CORS headers to all responses
-        response.headers["Access-Control-Allow-Origin"] = app_url
-        response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, PATCH, OPTIONS, HEAD"
-        response.headers["Access-Control-Allow-Headers"] = (
-            "Content-Type, Authorization, X-Requested-With, Accept, Origin, X-Request-Id, X-Blaxel-Request-Id"
-        )
-        response.headers["Access-Control-Allow-Credentials"] = "true"
-        response.headers["Access-Control-Max-Age"] = "86400"  # 24 hours
-        response.headers["Access-Control-Expose-Headers"] = "X-Request-Id, X-Blaxel-Request-Id"
-
-        return response
+    # Added last so it is outermost, like the decorator layers it replaces
+    app.add_middleware(RequestMiddleware)
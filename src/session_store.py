@@ -0,0 +1,243 @@
+import json
+import os
+import tempfile
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from logging import getLogger
+from typing import Any, Dict, Optional, Tuple
+
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, Session
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+
+from .metrics import session_evictions_total, session_hydration_seconds
+from .sqlite_connection import SQLiteConnection
+
+logger = getLogger(__name__)
+
+SessionKey = Tuple[str, str, str]
+
+
+class BoundedSessionService(BaseSessionService):
+    """
+    ADK session service with a bounded in-memory working set backed by SQLite.
+
+    Every non-partial event is appended to SQLite as one zlib-compressed JSON row, so sessions survive restarts
+    and can be hydrated by any worker process on the host. In memory, sessions are kept in LRU order and evicted
+    when the memory budget is exceeded or they have been idle for too long; evicting costs nothing since the
+    session is already on disk. Workers should own disjoint sets of sessions (see the multi-worker mode), since
+    a session cached in one process does not see events appended by another.
+
+    "app:" and "user:" prefixed state is stored with the session like any other key.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_bytes: Optional[int] = None, idle_ttl: Optional[float] = None):
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv("AGENT_SESSION_MEMORY_MB", "64")) * 1024 * 1024)
+        if idle_ttl is None:
+            idle_ttl = float(os.getenv("AGENT_SESSION_IDLE_TTL", "1800"))
+        self.path = (
+            path or os.getenv("AGENT_SESSION_DB") or os.path.join(tempfile.gettempdir(), "slack-sessions.sqlite3")
+        )
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self.evictions = 0
+        self.hydrations = 0
+        self.hydration_seconds = 0.0
+        # key -> (session, estimated bytes, last access)
+        self._sessions: "OrderedDict[SessionKey, Tuple[Session, int, float]]" = OrderedDict()
+        self._bytes = 0
+        self._db = SQLiteConnection(self.path)
+        self._conn = self._db.conn
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions (app_name TEXT, user_id TEXT, id TEXT, state TEXT, updated REAL, "
+            "PRIMARY KEY (app_name, user_id, id))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS events (app_name TEXT, user_id TEXT, session_id TEXT, "
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, data BLOB)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS events_session ON events (app_name, user_id, session_id, seq)")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self._sessions),
+            "bytes": self._bytes,
+            "evictions": self.evictions,
+            "hydrations": self.hydrations,
+            "hydration_seconds": self.hydration_seconds,
+        }
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        session = Session(
+            id=session_id.strip() if session_id and session_id.strip() else str(uuid.uuid4()),
+            app_name=app_name,
+            user_id=user_id,
+            state=state or {},
+            last_update_time=time.time(),
+        )
+        await self._db.run(self._create_session, session)
+        self._remember(session, len(json.dumps(session.state)))
+        return session
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        key = (app_name, user_id, session_id)
+        entry = self._sessions.get(key)
+        if entry:
+            session, size, _ = entry
+            self._sessions[key] = (session, size, time.monotonic())
+            self._sessions.move_to_end(key)
+        else:
+            start = time.perf_counter()
+            loaded = await self._db.run(self._read_session, key)
+            if not loaded:
+                return None
+            session, size = loaded
+            elapsed = time.perf_counter() - start
+            self.hydrations += 1
+            self.hydration_seconds += elapsed
+            session_hydration_seconds.observe(elapsed)
+            self._remember(session, size)
+        self._evict()
+
+        if not config:
+            return session
+        # Filtered views are copies, so the cached session keeps its full history
+        events = session.events
+        if config.after_timestamp:
+            events = [e for e in events if e.timestamp >= config.after_timestamp]
+        if config.num_recent_events:
+            events = events[-config.num_recent_events :]
+        return session.model_copy(update={"events": list(events)})
+
+    async def list_sessions(self, *, app_name: str, user_id: str) -> ListSessionsResponse:
+        rows = await self._db.run(
+            lambda: self._conn.execute(
+                "SELECT id, updated FROM sessions WHERE app_name = ? AND user_id = ?", (app_name, user_id)
+            ).fetchall()
+        )
+        return ListSessionsResponse(
+            sessions=[Session(id=id, app_name=app_name, user_id=user_id, last_update_time=u) for id, u in rows]
+        )
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        key = (app_name, user_id, session_id)
+        entry = self._sessions.pop(key, None)
+        if entry:
+            self._bytes -= entry[1]
+        await self._db.run(self._delete_session, key)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+        await super().append_event(session=session, event=event)
+        session.last_update_time = event.timestamp
+        data = event.model_dump_json(exclude_none=True, by_alias=True).encode()
+        state_changed = bool(event.actions and event.actions.state_delta)
+        await self._db.run(self._write_event, session, zlib.compress(data), state_changed)
+
+        key = (session.app_name, session.user_id, session.id)
+        entry = self._sessions.get(key)
+        if entry and entry[0] is session:
+            self._remember(session, entry[1] + len(data))
+            self._evict()
+        elif entry:
+            # A filtered copy was appended to; the next get_session rehydrates the full history from disk
+            del self._sessions[key]
+            self._bytes -= entry[1]
+        return event
+
+    async def close(self):
+        await self._db.close()
+
+    def _remember(self, session: Session, size: int):
+        key = (session.app_name, session.user_id, session.id)
+        previous = self._sessions.pop(key, None)
+        if previous:
+            self._bytes -= previous[1]
+        self._sessions[key] = (session, size, time.monotonic())
+        self._bytes += size
+
+    def _evict(self):
+        """Drop least recently used sessions over the memory budget or idle for longer than the TTL"""
+        idle_before = time.monotonic() - self.idle_ttl
+        while self._sessions:
+            key, (_, size, last_access) = next(iter(self._sessions.items()))
+            # Always keep the most recently used session, however large
+            if (len(self._sessions) > 1 and self._bytes > self.max_bytes) or last_access < idle_before:
+                del self._sessions[key]
+                self._bytes -= size
+                self.evictions += 1
+                session_evictions_total.inc()
+            else:
+                break
+
+    def _create_session(self, session: Session):
+        # Creating over an existing id starts from an empty history, like the in-memory service
+        self._delete_session((session.app_name, session.user_id, session.id))
+        self._write_session(session)
+
+    def _write_session(self, session: Session):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO sessions (app_name, user_id, id, state, updated) VALUES (?, ?, ?, ?, ?)",
+            (session.app_name, session.user_id, session.id, json.dumps(session.state), session.last_update_time),
+        )
+
+    def _write_event(self, session: Session, data: bytes, state_changed: bool):
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.execute(
+                "INSERT INTO events (app_name, user_id, session_id, data) VALUES (?, ?, ?, ?)",
+                (session.app_name, session.user_id, session.id, data),
+            )
+            if state_changed:
+                self._write_session(session)
+            else:
+                self._conn.execute(
+                    "UPDATE sessions SET updated = ? WHERE app_name = ? AND user_id = ? AND id = ?",
+                    (session.last_update_time, session.app_name, session.user_id, session.id),
+                )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def _read_session(self, key: SessionKey) -> Optional[Tuple[Session, int]]:
+        row = self._conn.execute(
+            "SELECT state, updated FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?", key
+        ).fetchone()
+        if not row:
+            return None
+        rows = self._conn.execute(
+            "SELECT data FROM events WHERE app_name = ? AND user_id = ? AND session_id = ? ORDER BY seq", key
+        ).fetchall()
+        raw = [zlib.decompress(data) for (data,) in rows]
+        session = Session(
+            id=key[2],
+            app_name=key[0],
+            user_id=key[1],
+            state=json.loads(row[0]),
+            events=[Event.model_validate_json(data) for data in raw],
+            last_update_time=row[1],
+        )
+        return session, len(row[0]) + sum(len(data) for data in raw)
+
+    def _delete_session(self, key: SessionKey):
+        self._conn.execute("DELETE FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?", key)
+        self._conn.execute("DELETE FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?", key)
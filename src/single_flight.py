@@ -0,0 +1,34 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time: callers arriving while it runs share its result.
+
+    The call runs in its own task, shielded from its callers, so one caller being cancelled does not fail the
+    others, and work done by the call itself (such as filling a cache) completes regardless.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Whether a call for the key is running, i.e. whether `run` would join it rather than start one"""
+        return key in self._inflight
+
+    async def run(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.ensure_future(call())
+            task.add_done_callback(lambda done: self._done(key, done))
+        return await asyncio.shield(task)
+
+    def _done(self, key: Hashable, task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Every caller may have been cancelled, so retrieve the exception to keep it out of the loop's error log
+        if not task.cancelled():
+            task.exception()
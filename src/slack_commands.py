@@ -0,0 +1,193 @@
+import asyncio
+import os
+from dataclasses import dataclass
+from logging import getLogger
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+from slack_sdk.webhook.async_client import AsyncWebhookClient
+
+from .background import BackgroundTasks
+from .mailbox import ConversationMailboxes
+from .metrics import Timer, current_context, events_total, slack_api_seconds, stage_seconds, timed
+from .startup import load_agent
+from .work_queue import work_queue
+
+logger = getLogger(__name__)
+
+
+def command_session_id(channel: Optional[str], user: Optional[str]) -> str:
+    """Session of a user's slash commands and actions in a channel, kept apart from their channel threads and DMs"""
+    return f"slack_command_{channel}_{user}"
+
+
+@dataclass
+class CommandRequest:
+    """A question asked with a slash command or an interactive action, answered through its response_url"""
+
+    text: str
+    user: Optional[str]
+    channel: Optional[str]
+    response_url: str
+    # Trace context of the HTTP request, parent of the spans of the turn that answers it
+    context: Any = None
+
+
+class SlackCommands:
+    """
+    Slash commands and interactive actions (message shortcuts and buttons) answered through `response_url`.
+
+    Requests are acked right away, well within Slack's 3-second budget, and the agent runs on the work queue.
+    Answers are posted to the request's response_url, which needs neither a channel lookup nor chat.postMessage
+    and can be ephemeral. Failed deliveries are retried with exponential backoff, honouring Retry-After on 429s.
+    """
+
+    def __init__(
+        self,
+        response_type: Optional[str] = None,
+        max_retries: Optional[int] = None,
+        backoff: Optional[float] = None,
+        timeout: Optional[float] = None,
+    ):
+        if response_type is None:
+            response_type = os.getenv("SLACK_COMMAND_RESPONSE_TYPE", "ephemeral")
+        if max_retries is None:
+            max_retries = int(os.getenv("SLACK_RESPONSE_URL_RETRIES", "3"))
+        if backoff is None:
+            backoff = float(os.getenv("SLACK_RESPONSE_URL_BACKOFF", "1.0"))
+        if timeout is None:
+            timeout = float(os.getenv("SLACK_RESPONSE_URL_TIMEOUT", "10"))
+        self.response_type = response_type
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        # Requests of one user in one channel run in order, with the ones sent meanwhile merged into the next turn
+        self.mailboxes = ConversationMailboxes(work_queue, self._process_requests)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.background = BackgroundTasks()
+
+    def handle_command(self, form: Dict[str, str]) -> Dict[str, Any]:
+        """Ack a slash command, queueing its question; the returned body is shown to the user right away"""
+        text = (form.get("text") or "").strip()
+        if not text:
+            events_total.inc(outcome="ignored")
+            return {
+                "response_type": "ephemeral",
+                "text": f"Ask me anything, e.g. `{form.get('command')} weather in Paris`",
+            }
+        request = CommandRequest(text, form.get("user_id"), form.get("channel_id"), form.get("response_url", ""))
+        if not self._post(request):
+            return {"response_type": "ephemeral", "text": "I'm handling a lot of requests right now. Please try again."}
+        # With in_channel, echoing the ack makes the command itself visible to the channel
+        return {"response_type": self.response_type, "text": "Working on it..."}
+
+    def handle_interaction(self, payload: Dict[str, Any]):
+        """Queue the question of a message shortcut or of a button whose value is a question; others are only acked"""
+        kind = payload.get("type")
+        if kind == "message_action":
+            text = (payload.get("message") or {}).get("text", "")
+        elif kind == "block_actions":
+            text = next((a.get("value") for a in payload.get("actions", []) if a.get("value")), "")
+        else:
+            text = ""
+        text = text.strip()
+        if not text or not payload.get("response_url"):
+            logger.debug(f"Ignoring interaction payload of type {kind}")
+            events_total.inc(outcome="ignored")
+            return
+        request = CommandRequest(
+            text,
+            (payload.get("user") or {}).get("id"),
+            (payload.get("channel") or {}).get("id"),
+            payload["response_url"],
+        )
+        if not self._post(request):
+            self.background.run(
+                self.respond(request.response_url, "I'm handling a lot of requests right now. Please try again.")
+            )
+
+    def _post(self, request: CommandRequest) -> bool:
+        request.context = current_context()
+        if self.mailboxes.post(command_session_id(request.channel, request.user), request.channel, request):
+            events_total.inc(outcome="accepted")
+            return True
+        events_total.inc(outcome="shed")
+        return False
+
+    async def _process_requests(self, requests: List[CommandRequest]):
+        """Answer every request sent since the previous turn in a single agent turn, through the latest response_url"""
+        request = requests[-1]
+        text = "\n".join(r.text for r in requests)
+        session_id = command_session_id(request.channel, request.user)
+        with timed(stage_seconds, "slack.command", context=request.context, stage="command") as timer:
+            try:
+                agent = await load_agent()
+                parts = []
+                async for update in agent.agent_events(input=text, user_id=request.user or "", session_id=session_id):
+                    if update.kind == "final":
+                        parts.append(update.text)
+                answer = "".join(parts).strip()
+                timer.outcome = "ok" if answer else "empty"
+                answer = answer or "Sorry, I don't have an answer for that."
+            except Exception as e:
+                logger.error(f"❌ Error processing Slack command for {session_id}: {e}")
+                timer.outcome = "error"
+                answer = "Sorry, I encountered an error processing your request. Please try again."
+            if not await self.respond(request.response_url, answer, context=request.context):
+                timer.outcome = "undelivered"
+
+    async def respond(self, response_url: str, text: str, context: Any = None) -> bool:
+        """Post a message to a response_url, retrying with backoff; returns whether Slack accepted it"""
+        if not response_url:
+            return False
+        client = AsyncWebhookClient(response_url, timeout=int(self.timeout), session=await self._get_session())
+        for attempt in range(self.max_retries + 1):
+            timer = Timer(slack_api_seconds, "slack.response_url", context=context, method="response_url")
+            delay = self.backoff * 2**attempt
+            try:
+                response = await client.send(text=text, response_type=self.response_type, replace_original=False)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                timer.finish("error", e)
+                logger.warning(f"Failed to post to response_url (attempt {attempt + 1}): {e}")
+            except BaseException as e:
+                timer.finish("cancelled" if isinstance(e, asyncio.CancelledError) else "error", e)
+                raise
+            else:
+                if response.status_code == 200:
+                    timer.finish()
+                    return True
+                rate_limited = response.status_code == 429
+                timer.finish("rate_limited" if rate_limited else "slack_error")
+                # An expired or used-up response_url (404) or a rejected message will not succeed on a retry
+                if not rate_limited and response.status_code < 500:
+                    logger.error(f"response_url rejected the answer: {response.status_code} {response.body}")
+                    return False
+                if rate_limited:
+                    delay = float(response.headers.get("Retry-After", delay))
+                logger.warning(f"response_url answered {response.status_code}, retrying in {delay}s")
+            if attempt < self.max_retries:
+                await asyncio.sleep(delay)
+        logger.error(f"Giving up on response_url after {self.max_retries + 1} attempts")
+        return False
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        # Created on first use, inside the event loop, and shared by every delivery
+        if self._session is None:
+            self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(keepalive_timeout=60))
+        return self._session
+
+    async def shutdown(self, timeout: float = 5):
+        """Apologise for requests lost when the work queue was stopped, then close the connection pool"""
+        for request in self.mailboxes.unfinished():
+            logger.warning(f"Command dropped on shutdown: channel={request.channel}, user={request.user}")
+            self.background.run(
+                self.respond(request.response_url, "Sorry, I was restarted before I could answer. Please ask again.")
+            )
+        await self.background.drain(timeout)
+        if self._session:
+            await self._session.close()
+            self._session = None
+
+
+# Global instance
+slack_commands = SlackCommands()
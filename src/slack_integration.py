@@ -1,12 +1,29 @@
-import asyncio
 import os
+import time
 from logging import getLogger
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
 
-from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
-
-from .agent import agent
+from slack_sdk.web.async_client import AsyncWebClient
+
+from .background import BackgroundTasks
+from .channel_cache import ChannelCache
+from .dedup import create_dedup_store
+from .mailbox import ConversationMailboxes
+from .metrics import (
+    current_context,
+    events_total,
+    response_cache_total,
+    stage_seconds,
+    time_to_first_token_seconds,
+    timed,
+)
+from .response_cache import normalise_question
+from .slack_outbound import PRIORITY_HIGH, PRIORITY_NORMAL, SlackOutbound
+from .slack_streaming import StreamingReply
+from .startup import load_agent, loaded_agent
+from .thread_cache import ThreadCache, conversation_id, thread_root
+from .work_queue import work_queue
 
 logger = getLogger(__name__)
 
@@ -18,27 +35,54 @@ class SlackIntegration:
         if not self.bot_token:
             logger.warning("SLACK_BOT_TOKEN not found in environment variables")
             self.client = None
-            self.bot_user_id = None
         else:
-            self.client = WebClient(token=self.bot_token)
-            logger.info("Slack WebClient initialized")
-            # Get bot user ID to avoid responding to own messages
-            try:
-                auth_response = self.client.auth_test()
-                self.bot_user_id = auth_response["user_id"]
-                logger.info(f"Bot user ID: {self.bot_user_id}")
-            except Exception as e:
-                logger.error(f"Failed to get bot user ID: {e}")
-                self.bot_user_id = None
+            self.client = AsyncWebClient(token=self.bot_token)
+            logger.info("Slack AsyncWebClient initialized")
+        self.bot_user_id = None
+        self.bot_id = None
+        self.outbound = SlackOutbound(self.client)
+        self.channels = ChannelCache(self._fetch_channel_info)
+        self.threads = ThreadCache(self._fetch_thread)
+        # Turns of one conversation run in order, with messages sent meanwhile merged into the next turn
+        self.mailboxes = ConversationMailboxes(work_queue, self._process_turn)
 
         # Track processed messages to avoid duplicates
-        self.processed_messages = set()
+        self.dedup = create_dedup_store()
+        self.background = BackgroundTasks()
+        # Cap on concurrent "busy" replies so load shedding does not create unbounded extra work
+        self.max_busy_replies = int(os.getenv("SLACK_MAX_BUSY_REPLIES", "10"))
+        # Edit the placeholder message as the turn progresses instead of posting the answer separately
+        self.streaming = os.getenv("SLACK_STREAMING", "true").lower() == "true"
+
+    async def start(self) -> bool:
+        """Open the Slack connection pool and resolve the bot user ID, returning whether Slack accepted the token"""
+        if not self.client:
+            return False
+        await self.outbound.start()
+        # Get bot user ID to avoid responding to own messages
+        try:
+            auth_response = await self.outbound.call("auth.test")
+            self.bot_user_id = auth_response["user_id"]
+            self.bot_id = auth_response.get("bot_id")
+            logger.info(f"Bot user ID: {self.bot_user_id}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to get bot user ID: {e}")
+            self.bot_user_id = None
+            return False
 
-    async def handle_slack_event(self, event_data: Dict[str, Any]) -> Dict[str, str]:
+    async def handle_slack_event(self, event_data: Dict[str, Any], retry_num: Optional[str] = None) -> Dict[str, str]:
         """Handle incoming Slack events"""
 
+        # Slack retries events it thinks we missed; ack retries of events we already have without further work
+        if retry_num and event_data.get("event_id") and await self.dedup.contains(event_data["event_id"]):
+            logger.info(f"Skipping Slack retry #{retry_num} of {event_data['event_id']}")
+            events_total.inc(outcome="retry_skipped")
+            return {"status": "ok"}
+
         # Handle URL verification challenge
         if event_data.get("type") == "url_verification":
+            events_total.inc(outcome="url_verification")
             return {"challenge": event_data.get("challenge")}
 
         # Handle actual events
@@ -55,6 +99,15 @@ class SlackIntegration:
                 f"ts={event.get('ts')}"
             )
 
+            # Every thread message, answered or not, keeps a cached thread current
+            if (
+                event.get("type") == "message"
+                and event.get("thread_ts")
+                and event.get("subtype") not in ("message_changed", "message_deleted")
+                and not self._is_own_message(event)
+            ):
+                self.threads.observe(event)
+
             # Only respond to messages (not bot messages to avoid loops)
             if (
                 event.get("type") == "message"
@@ -63,66 +116,143 @@ class SlackIntegration:
                 and event.get("text")
                 and event.get("user") != self.bot_user_id
             ):  # Don't respond to our own messages
-                # Create unique message ID for deduplication
+                # Dedup on both the envelope's event_id and the message itself, which Slack can deliver twice
+                # under different event_ids (e.g. as a message and an app_mention)
                 message_id = f"{event.get('channel')}_{event.get('ts')}"
+                keys = [message_id] + ([event_data["event_id"]] if event_data.get("event_id") else [])
 
                 # Check if we've already processed this message
-                if message_id not in self.processed_messages:
-                    self.processed_messages.add(message_id)
-
-                    # Clean up old message IDs (keep only last 1000)
-                    if len(self.processed_messages) > 1000:
-                        # Remove oldest 100 entries
-                        old_messages = list(self.processed_messages)[:100]
-                        for old_msg in old_messages:
-                            self.processed_messages.discard(old_msg)
-
-                    await self._process_message(event)
-                else:
+                with timed(stage_seconds, "slack.dedup", stage="dedup") as timer:
+                    duplicate = await self.dedup.check_and_add(*keys)
+                    timer.outcome = "duplicate" if duplicate else "new"
+                # The turn runs after this request is acked; its spans still belong under the request's span
+                event["_trace_context"] = current_context()
+                if duplicate:
                     logger.info(f"Skipping duplicate message: {message_id}")
+                    events_total.inc(outcome="duplicate")
+                # Ack right away and let the worker pool run the agent turn. A shed message is forgotten again
+                # so that Slack's retry of it gets another chance.
+                elif not self.mailboxes.post(conversation_id(event), event.get("channel"), event):
+                    await self.dedup.discard(*keys)
+                    events_total.inc(outcome="shed")
+                    if not work_queue.running:
+                        logger.error(
+                            f"Work queue is not running - was the app started without its lifespan? "
+                            f"Dropping {message_id}"
+                        )
+                    else:
+                        self._reply_busy(event)
+                else:
+                    events_total.inc(outcome="accepted")
+                return {"status": "ok"}
 
+        events_total.inc(outcome="ignored")
         return {"status": "ok"}
 
-    async def _process_message(self, message_event: Dict[str, Any]):
-        """Process a message from Slack and respond"""
+    def _is_own_message(self, message: Dict[str, Any]) -> bool:
+        return bool(
+            (self.bot_user_id and message.get("user") == self.bot_user_id)
+            or (self.bot_id and message.get("bot_id") == self.bot_id)
+        )
+
+    async def _process_turn(self, message_events: List[Dict[str, Any]]):
+        """Answer every message sent to a conversation since its previous turn in a single agent turn"""
+        if len(message_events) > 1:
+            session_id = conversation_id(message_events[0])
+            logger.info(f"Merging {len(message_events)} messages into one turn of {session_id}")
+            # Reply under the latest message, with all of the texts as input
+            message_event = dict(message_events[-1])
+            message_event["text"] = "\n".join(e.get("text", "").strip() for e in message_events)
+        else:
+            message_event = message_events[0]
+        context = message_event.get("_trace_context")
+        with timed(stage_seconds, "slack.turn", context=context, stage="turn") as timer:
+            timer.outcome = await self._process_message(message_event, [e.get("ts") for e in message_events])
+
+    async def _process_message(self, message_event: Dict[str, Any], turn_ts: Optional[List[str]] = None) -> str:
+        """
+        Process a message from Slack and respond, returning the outcome of the turn.
+
+        Args:
+            message_event: The message, or the messages merged into one turn
+            turn_ts: ts of every message answered by this turn, defaults to the message's own
+        """
         if not self.client:
             logger.error("Slack client not initialized - missing SLACK_BOT_TOKEN")
-            return
+            return "skipped"
 
+        reply = None
+        start = time.perf_counter()
         try:
             # Extract message details
             channel = message_event.get("channel")
             user = message_event.get("user")
             text = message_event.get("text", "").strip()
-            ts = message_event.get("ts")  # timestamp, can be used as session_id and thread_ts
+            ts = message_event.get("ts")
+            # Channel messages are answered in their thread, which is the conversation's session
+            root = thread_root(message_event)
 
             # Skip empty messages
             if not text:
                 logger.info(f"Skipping empty message from user {user}")
-                return
+                return "skipped"
 
             # Check if this is a direct message
-            is_dm = await self._is_direct_message(channel)
+            is_dm = await self._is_direct_message(channel, message_event)
+
+            turn_ts = turn_ts or [ts]
+            session_id = conversation_id(message_event)
+            # Replies go to the message's thread; DMs are only threaded when the user replied in a thread
+            reply_ts = root if is_dm else root or ts
+            # Participants of a thread share its session
+            session_user = channel if root else user
+            cache_key = await self._response_cache_key(message_event, root, turn_ts, session_user)
+            if cache_key:
+                cached = loaded_agent().response_cache.get(cache_key)
+                response_cache_total.inc(outcome="hit" if cached else "miss")
+                if cached:
+                    return await self._send_cached_answer(message_event, cached, is_dm, session_user)
 
             if is_dm:
                 logger.info(f"🤖 Processing DM from user {user}: '{text}'")
-                await self._send_slack_message(channel, "Our agent is processing your message...")
             else:
                 logger.info(f"🤖 Processing message from user {user} in channel {channel}: '{text}'")
-                await self._send_slack_message(channel, "Our agent is processing your message...", thread_ts=ts)
-
-            # Generate response using your agent
+            placeholder = await self._send_slack_message(
+                channel, "Our agent is processing your message...", thread_ts=reply_ts
+            )
+            if self.streaming:
+                reply = StreamingReply(self.outbound, channel, placeholder["ts"])
+
+            # Generate response using your agent, imported in the background if startup has not finished yet
+            agent = await load_agent()
+            prompt = text
+            if root:
+                prompt = await self._thread_context(agent, message_event, root, turn_ts, session_user) + text
             response_parts = []
-            async for response_chunk in agent(input=text, user_id=user, session_id=f"slack_{channel}_{user}"):
-                response_parts.append(response_chunk)
+            tools_used = []
+            first_token = True
+            async for update in agent.agent_events(input=prompt, user_id=session_user, session_id=session_id):
+                if first_token and update.kind in ("partial", "final"):
+                    first_token = False
+                    time_to_first_token_seconds.observe(time.perf_counter() - start)
+                if update.kind == "tool":
+                    tools_used.append(update.text)
+                if update.kind == "final":
+                    response_parts.append(update.text)
+                elif reply:
+                    reply.progress(update)
 
             # Combine all response chunks
             full_response = "".join(response_parts).strip()
 
-            if full_response:
+            if full_response and reply:
+                # Replace the placeholder instead of posting a second message
+                await reply.finish(full_response)
+                logger.info(f"✅ Streamed response to {channel} in {reply.edits} edits: '{full_response[:100]}'")
+            elif full_response:
                 if is_dm:
-                    # Send response back to DM (no threading in DMs)
-                    await self._send_slack_message(channel, full_response)
+                    # Send response back to DM
+                    await self._send_slack_message(channel, full_response, thread_ts=reply_ts, priority=PRIORITY_HIGH)
                     msg = f"✅ Sent DM response to user {user}: '{full_response[:100]}"
                     if len(full_response) > 100:
                         msg += "..."
@@ -130,7 +260,7 @@ class SlackIntegration:
                     logger.info(msg)
                 else:
                     # Send response back to Slack in thread
-                    await self._send_slack_message(channel, full_response, thread_ts=ts)
+                    await self._send_slack_message(channel, full_response, thread_ts=reply_ts, priority=PRIORITY_HIGH)
                     msg = f"✅ Sent response to thread in channel {channel}: '{full_response[:100]}"
                     if len(full_response) > 100:
                         msg += "..."
@@ -138,6 +268,13 @@ class SlackIntegration:
                     logger.info(msg)
             else:
                 logger.warning(f"Agent returned empty response for message: '{text}'")
+                if reply:
+                    await reply.finish("Sorry, I don't have an answer for that.")
+                return "empty"
+            if cache_key:
+                stored = agent.response_cache.put(cache_key, full_response, tools_used, agent.tool_cache.ttl_for)
+                response_cache_total.inc(outcome="stored" if stored else "uncacheable")
+            return "ok"
 
         except Exception as e:
             logger.error(f"❌ Error processing Slack message: {e}")
@@ -145,30 +282,135 @@ class SlackIntegration:
             if self.client and message_event.get("channel"):
                 try:
                     channel = message_event["channel"]
-                    is_dm = await self._is_direct_message(channel)
+                    if reply:
+                        await reply.finish("Sorry, I encountered an error processing your message. Please try again.")
+                        return "error"
+                    is_dm = await self._is_direct_message(channel, message_event)
 
                     if is_dm:
                         await self._send_slack_message(
-                            channel, "Sorry, I encountered an error processing your message. Please try again."
+                            channel,
+                            "Sorry, I encountered an error processing your message. Please try again.",
+                            thread_ts=thread_root(message_event),
+                            priority=PRIORITY_HIGH,
                         )
                     else:
                         await self._send_slack_message(
                             channel,
                             "Sorry, I encountered an error processing your message. Please try again.",
-                            thread_ts=message_event.get("ts"),
+                            thread_ts=thread_root(message_event) or message_event.get("ts"),
+                            priority=PRIORITY_HIGH,
                         )
                 except Exception as send_error:
                     logger.error(f"Failed to send error message: {send_error}")
+            return "error"
+
+    async def _response_cache_key(
+        self, message_event: Dict[str, Any], root: Optional[str], turn_ts: List[str], session_user: str
+    ) -> Optional[str]:
+        """Response cache key of a turn that starts a conversation, None when the turn cannot be answered from it"""
+        agent = loaded_agent()
+        # Until the agent module is imported, its cache is empty
+        if not agent or len(turn_ts) > 1 or not agent.response_cache.enabled_for(message_event.get("channel")):
+            return None
+        if root:
+            # A reply in a thread is answered with the rest of the thread in mind
+            if root not in turn_ts:
+                return None
+        elif await agent.session_service.get_session(
+            app_name=agent.APP_NAME, user_id=session_user, session_id=conversation_id(message_event)
+        ):
+            return None
+        question = normalise_question(message_event.get("text", ""), self.bot_user_id)
+        return agent.response_cache.key(question, agent.CONFIG_FINGERPRINT)
+
+    async def _send_cached_answer(
+        self, message_event: Dict[str, Any], answer: str, is_dm: bool, session_user: str
+    ) -> str:
+        """Deliver an answer from the response cache and record it in the conversation's session"""
+        channel = message_event.get("channel")
+        root = thread_root(message_event)
+        thread_ts = root if is_dm else root or message_event.get("ts")
+        await self._send_slack_message(channel, answer, thread_ts=thread_ts, priority=PRIORITY_HIGH)
+        logger.info(f"✅ Answered {conversation_id(message_event)} from the response cache: '{answer[:100]}'")
+        if root:
+            self.threads.start(channel, root)
+        agent = loaded_agent()
+        await agent.record_turn(
+            message_event.get("text", "").strip(), answer, session_user, conversation_id(message_event)
+        )
+        return "cached"
+
+    async def _thread_context(
+        self, agent, message_event: Dict[str, Any], root: str, turn_ts: List[str], session_user: str
+    ) -> str:
+        """What was said in the thread since the session's last turn, by others or before the bot joined"""
+        channel = message_event.get("channel")
+        if root in turn_ts:
+            # The turn answers the thread's first message, so there is no history to fetch
+            self.threads.start(channel, root)
+
+        async def session_updated() -> Optional[float]:
+            session = await agent.session_service.get_session(
+                app_name=agent.APP_NAME, user_id=session_user, session_id=conversation_id(message_event)
+            )
+            return session.last_update_time if session else None
 
-    async def _is_direct_message(self, channel_id: str) -> bool:
+        try:
+            with timed(stage_seconds, "slack.thread_history", stage="thread_history"):
+                unseen = await self.threads.unseen(channel, root, turn_ts, session_updated)
+        except Exception as e:
+            logger.warning(f"Failed to load thread {channel}/{root}, answering without its history: {e}")
+            return ""
+        if not unseen:
+            return ""
+        lines = [f"<@{m.user}>: {m.text}" if m.user else m.text for m in unseen]
+        return "Earlier messages in this thread:\n" + "\n".join(lines) + "\n\nMessage to answer:\n"
+
+    def _reply_busy(self, message_event: Dict[str, Any]):
+        """Tell the user we are shedding load, unless too many such replies are already in flight"""
+        if len(self.background) >= self.max_busy_replies:
+            logger.warning(
+                f"Dropping busy reply for {message_event.get('channel')}_{message_event.get('ts')}: "
+                f"{len(self.background)} already in flight"
+            )
+            return
+        self.background.run(
+            self._send_apology(message_event, "I'm handling a lot of messages right now. Please try again in a moment.")
+        )
+
+    async def _send_apology(self, message_event: Dict[str, Any], text: str):
+        """Reply to a message we could not answer, using the event's channel_type to skip a conversations_info lookup"""
+        if not self.client:
+            return
+        try:
+            await self._send_slack_message(message_event.get("channel"), text, thread_ts=thread_root(message_event))
+        except Exception as e:
+            logger.error(f"Failed to send reply for unanswered message: {e}")
+
+    async def shutdown(self, timeout: float = 5):
+        """Apologise for turns lost when the work queue was stopped, then drain pending background replies"""
+        for event in self.mailboxes.unfinished():
+            logger.warning(f"Turn dropped on shutdown: channel={event.get('channel')}, ts={event.get('ts')}")
+            self.background.run(
+                self._send_apology(
+                    event, "Sorry, I was restarted before I could answer. Please send your message again."
+                )
+            )
+        await self.background.drain(timeout)
+        await self.outbound.stop(timeout)
+        await self.dedup.close()
+
+    async def _is_direct_message(self, channel_id: str, message_event: Optional[Dict[str, Any]] = None) -> bool:
         """Check if a channel is a direct message"""
+        # Message events carry the channel type, so the API is only needed when it is missing
+        if message_event and message_event.get("channel_type"):
+            return message_event["channel_type"] == "im"
         try:
-            # Run the blocking Slack API call in a thread pool
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(None, lambda: self.client.conversations_info(channel=channel_id))
+            with timed(stage_seconds, "slack.channel_lookup", stage="channel_lookup"):
+                channel_info = await self.channels.get(channel_id)
 
             # DMs have channel type 'im' (instant message)
-            channel_info = response.get("channel", {})
             return channel_info.get("is_im", False)
 
         except SlackApiError as e:
@@ -176,12 +418,34 @@ class SlackIntegration:
             # If we can't determine, assume it's not a DM to be safe
             return False
 
-    async def _send_slack_message(self, channel: str, text: str, thread_ts: str = None):
+    async def _fetch_channel_info(self, channel_id: str) -> Dict[str, Any]:
+        response = await self.outbound.call("conversations.info", channel=channel_id)
+        return response.get("channel", {})
+
+    async def _fetch_thread(
+        self, channel_id: str, thread_ts: str, oldest: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Messages of a thread, newer than `oldest` when given, following pagination cursors"""
+        messages = []
+        cursor = None
+        while True:
+            args = {"channel": channel_id, "ts": thread_ts, "limit": 200}
+            if oldest:
+                args["oldest"] = oldest
+            if cursor:
+                args["cursor"] = cursor
+            response = await self.outbound.call("conversations.replies", **args)
+            # The bot's own replies are already in the session
+            messages.extend(m for m in response.get("messages", []) if not self._is_own_message(m))
+            cursor = (response.get("response_metadata") or {}).get("next_cursor")
+            if not response.get("has_more") or not cursor:
+                return messages
+
+    async def _send_slack_message(
+        self, channel: str, text: str, thread_ts: str = None, priority: int = PRIORITY_NORMAL
+    ):
         """Send a message to a Slack channel, optionally in a thread"""
         try:
-            # Run the blocking Slack API call in a thread pool
-            loop = asyncio.get_event_loop()
-
             # Prepare message parameters
             message_params = {
                 "channel": channel,
@@ -194,7 +458,7 @@ class SlackIntegration:
             if thread_ts:
                 message_params["thread_ts"] = thread_ts
 
-            response = await loop.run_in_executor(None, lambda: self.client.chat_postMessage(**message_params))
+            response = await self.outbound.call("chat.postMessage", priority=priority, **message_params)
             return response
 
         except SlackApiError as e:
@@ -209,8 +473,7 @@ class SlackIntegration:
 
         try:
             # Open a DM channel with the user
-            loop = asyncio.get_event_loop()
-            dm_response = await loop.run_in_executor(None, lambda: self.client.conversations_open(users=user_id))
+            dm_response = await self.outbound.call("conversations.open", users=user_id)
 
             channel_id = dm_response["channel"]["id"]
 
@@ -0,0 +1,231 @@
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from dataclasses import dataclass, field
+from logging import getLogger
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+from slack_sdk.errors import SlackApiError
+from slack_sdk.web.async_client import AsyncWebClient
+
+from .metrics import Timer, current_context, slack_api_seconds
+
+logger = getLogger(__name__)
+
+# Requests per minute for the Web API methods this bot uses, see https://api.slack.com/apis/rate-limits
+# None means the method has no workspace-wide limit of its own
+METHOD_RATE_LIMITS = {
+    "auth.test": 100,  # Special, generous
+    "chat.postMessage": None,  # Special: ~1 per second per channel, enforced by the channel lanes only
+    "chat.update": 50,  # Tier 3
+    "conversations.info": 50,  # Tier 3
+    "conversations.open": 50,  # Tier 3
+    "conversations.replies": 50,  # Tier 3
+}
+DEFAULT_RATE_LIMIT = 20  # Tier 2, for anything not listed above
+
+# Methods that post into a channel and share its ~1 message per second budget
+CHANNEL_METHODS = {"chat.postMessage", "chat.update"}
+
+PRIORITY_HIGH = 0  # Final answers and error replies
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2  # Progress updates that may be coalesced or delayed
+
+
+class TokenBucket:
+    """Async token bucket that also honours a server-imposed Retry-After pause"""
+
+    def __init__(self, per_minute: Optional[float], burst: Optional[float] = None):
+        # None means no limit of its own, only Retry-After pauses apply
+        self.unlimited = per_minute is None
+        per_minute = per_minute or 60
+        self.rate = per_minute / 60
+        self.capacity = burst if burst is not None else max(1.0, per_minute / 10)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                await asyncio.sleep(self.blocked_until - now)
+                continue
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.unlimited:
+                return
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def block_for(self, seconds: float):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+@dataclass(order=True)
+class _Pending:
+    priority: int
+    seq: int
+    method: str = field(compare=False)
+    kwargs: Dict[str, Any] = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    coalesce_key: Optional[str] = field(compare=False, default=None)
+    # Trace context of the caller, since the call is sent from the channel's drain task
+    context: Any = field(compare=False, default=None)
+
+
+class _ChannelLane:
+    """Priority queue of pending posts for one channel, drained at the channel's rate"""
+
+    def __init__(self, interval: float):
+        # An interval of 0 leaves posts in order without pacing them
+        self.bucket = TokenBucket(per_minute=60 / interval if interval > 0 else None, burst=1)
+        self.heap: List[_Pending] = []
+        self.coalesced: Dict[str, _Pending] = {}
+        self.task: Optional[asyncio.Task] = None
+
+
+class SlackOutbound:
+    """
+    Rate-limit-aware scheduler for outbound Slack Web API calls.
+
+    Calls share one keep-alive aiohttp connection pool. Every call waits for its method's rate tier, posts into a
+    channel are additionally serialised per channel, and 429 responses pause the method for Retry-After seconds
+    before retrying.
+    """
+
+    def __init__(self, client: Optional[AsyncWebClient]):
+        self.client = client
+        self.pool_size = int(os.getenv("SLACK_HTTP_POOL_SIZE", "20"))
+        self.channel_interval = float(os.getenv("SLACK_CHANNEL_INTERVAL", "1.0"))
+        self.max_retries = int(os.getenv("SLACK_MAX_RETRIES", "3"))
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lanes: Dict[str, _ChannelLane] = {}
+        self._seq = itertools.count()
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def start(self):
+        """Open the shared connection pool; must run inside the event loop"""
+        if self.client and not self._session:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(connector=connector)
+            self.client.session = self._session
+
+    async def stop(self, timeout: float = 5):
+        """Send what is still queued, cancelling the calls not sent within the timeout, and close the pool"""
+        lanes = [lane.task for lane in self._lanes.values() if lane.task]
+        if lanes:
+            _, pending = await asyncio.wait(lanes, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            for lane in self._lanes.values():
+                for call in lane.heap:
+                    call.future.cancel()
+                lane.heap.clear()
+                lane.coalesced.clear()
+        if self._session:
+            await self._session.close()
+            self._session = None
+            self.client.session = None
+
+    async def call(
+        self, method: str, *, priority: int = PRIORITY_NORMAL, coalesce_key: Optional[str] = None, **kwargs
+    ) -> Any:
+        """
+        Call a Slack Web API method through the scheduler.
+
+        Args:
+            method: Web API method name, e.g. "chat.postMessage"
+            priority: Lower values are sent first within a channel
+            coalesce_key: Pending calls with the same key are merged, and only the latest arguments are sent
+            **kwargs: Arguments of the Web API method
+
+        Returns:
+            The Slack response
+        """
+        channel = kwargs.get("channel")
+        if method not in CHANNEL_METHODS or not channel:
+            return await self._send(method, kwargs)
+
+        lane = self._lanes.get(channel)
+        if lane is None:
+            lane = self._lanes[channel] = _ChannelLane(self.channel_interval)
+
+        if coalesce_key and coalesce_key in lane.coalesced:
+            pending = lane.coalesced[coalesce_key]
+            pending.kwargs = kwargs
+            if priority < pending.priority:
+                # The merged call is sent with the most urgent priority of the calls it stands for
+                pending.priority = priority
+                heapq.heapify(lane.heap)
+            return await asyncio.shield(pending.future)
+
+        pending = _Pending(
+            priority,
+            next(self._seq),
+            method,
+            kwargs,
+            asyncio.get_running_loop().create_future(),
+            coalesce_key,
+            current_context(),
+        )
+        heapq.heappush(lane.heap, pending)
+        if coalesce_key:
+            lane.coalesced[coalesce_key] = pending
+        if lane.task is None or lane.task.done():
+            lane.task = asyncio.create_task(self._drain(channel, lane))
+        return await asyncio.shield(pending.future)
+
+    async def _drain(self, channel: str, lane: _ChannelLane):
+        while lane.heap:
+            await lane.bucket.acquire()
+            pending = heapq.heappop(lane.heap)
+            if pending.coalesce_key:
+                lane.coalesced.pop(pending.coalesce_key, None)
+            try:
+                pending.future.set_result(await self._send(pending.method, pending.kwargs, pending.context))
+            except asyncio.CancelledError:
+                pending.future.cancel()
+                raise
+            except Exception as e:
+                pending.future.set_exception(e)
+        # Idle lanes are dropped so the lane map stays bounded by the number of active channels
+        if self._lanes.get(channel) is lane:
+            del self._lanes[channel]
+
+    async def _send(self, method: str, kwargs: Dict[str, Any], context: Any = None) -> Any:
+        bucket = self._buckets.get(method)
+        if bucket is None:
+            bucket = self._buckets[method] = TokenBucket(METHOD_RATE_LIMITS.get(method, DEFAULT_RATE_LIMIT))
+        lane = self._lanes.get(kwargs.get("channel")) if method in CHANNEL_METHODS else None
+        api = getattr(self.client, method.replace(".", "_"))
+        for attempt in range(self.max_retries + 1):
+            await bucket.acquire()
+            timer = Timer(slack_api_seconds, f"slack.{method}", context=context, method=method)
+            try:
+                response = await api(**kwargs)
+                timer.finish()
+                return response
+            except SlackApiError as e:
+                rate_limited = e.response.status_code == 429
+                timer.finish("rate_limited" if rate_limited else "slack_error", e)
+                if not rate_limited or attempt == self.max_retries:
+                    raise
+                retry_after = float(e.response.headers.get("Retry-After", 1))
+                logger.warning(f"Slack rate limited {method}, retrying in {retry_after}s")
+                # Posting limits are per channel, so only pause that channel's lane, and wait for it here since
+                # the method bucket awaited at the top of the loop does not pace channel posts
+                if lane:
+                    lane.bucket.block_for(retry_after)
+                    await lane.bucket.acquire()
+                else:
+                    bucket.block_for(retry_after)
+            except BaseException as e:
+                timer.finish("cancelled" if isinstance(e, asyncio.CancelledError) else "error", e)
+                raise
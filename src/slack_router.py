@@ -1,7 +1,12 @@
 from logging import getLogger
+from typing import Dict
+from urllib.parse import parse_qsl
 
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Request, Response
 
+from .fast_json import loads
+from .metrics import stage_seconds, timed
+from .slack_commands import slack_commands
 from .slack_integration import slack_integration
 from .slack_security import slack_security
 
@@ -10,30 +15,93 @@ logger = getLogger(__name__)
 slack_router = APIRouter()
 
 
+async def read_verified_body(request: Request) -> bytes:
+    """Read the raw body of a signed Slack request, rejecting oversized or stale requests before reading it"""
+    limit = slack_security.max_body_bytes
+    content_length = request.headers.get("Content-Length")
+    if content_length and content_length.isdigit() and int(content_length) > limit:
+        raise HTTPException(status_code=413, detail="Request too large")
+    timestamp = request.headers.get("X-Slack-Request-Timestamp", "")
+    if not slack_security.check_timestamp(timestamp):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+    # Chunked bodies have no Content-Length, so the limit is also enforced while reading
+    chunks = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > limit:
+            raise HTTPException(status_code=413, detail="Request too large")
+        chunks.append(chunk)
+    raw_body = chunks[0] if len(chunks) == 1 else b"".join(chunks)
+
+    # Verify the request is from Slack (recommended for production)
+    signature = request.headers.get("X-Slack-Signature", "")
+    with timed(stage_seconds, "slack.verify", stage="verify") as timer:
+        verified = slack_security.verify_slack_request(raw_body, timestamp, signature)
+        timer.outcome = "ok" if verified else "invalid"
+    if not verified:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    return raw_body
+
+
+def parse_form(raw_body: bytes) -> Dict[str, str]:
+    """Slash commands and interactive payloads are sent as application/x-www-form-urlencoded"""
+    try:
+        return dict(parse_qsl(raw_body.decode(), keep_blank_values=True))
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid form body")
+
+
 @slack_router.post("/slack/events")
 async def slack_events(request: Request):
     """Handle Slack event subscriptions"""
     try:
-        # Get raw body for signature verification
-        raw_body = await request.body()
+        raw_body = await read_verified_body(request)
+        try:
+            body = loads(raw_body)
+        except ValueError as e:
+            logger.warning(f"Invalid Slack event payload: {e}")
+            raise HTTPException(status_code=400, detail="Invalid JSON")
 
-        # Verify the request is from Slack (recommended for production)
-        timestamp = request.headers.get("X-Slack-Request-Timestamp", "")
-        signature = request.headers.get("X-Slack-Signature", "")
+        result = await slack_integration.handle_slack_event(body, retry_num=request.headers.get("X-Slack-Retry-Num"))
+        return result
 
-        if not slack_security.verify_slack_request(raw_body, timestamp, signature):
-            raise HTTPException(status_code=401, detail="Unauthorized")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error handling Slack event: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
 
-        # Parse JSON body
-        import json
 
-        body = json.loads(raw_body.decode("utf-8"))
+@slack_router.post("/slack/commands")
+async def slack_commands_endpoint(request: Request):
+    """Handle slash commands: ack right away and answer through the command's response_url"""
+    try:
+        return slack_commands.handle_command(parse_form(await read_verified_body(request)))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error handling Slack command: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
 
-        result = await slack_integration.handle_slack_event(body)
-        return result
+
+@slack_router.post("/slack/interactive")
+async def slack_interactive(request: Request):
+    """Handle interactive payloads (message shortcuts, buttons): ack with an empty body, answer through response_url"""
+    try:
+        form = parse_form(await read_verified_body(request))
+        try:
+            payload = loads(form.get("payload", ""))
+        except ValueError as e:
+            logger.warning(f"Invalid Slack interaction payload: {e}")
+            raise HTTPException(status_code=400, detail="Invalid JSON")
+
+        slack_commands.handle_interaction(payload)
+        return Response(status_code=200)
 
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error handling Slack event: {e}")
+        logger.error(f"Error handling Slack interaction: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
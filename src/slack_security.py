@@ -3,6 +3,7 @@ import hmac
 import os
 import time
 from logging import getLogger
+from typing import Optional, Union
 
 logger = getLogger(__name__)
 
@@ -10,8 +11,33 @@ logger = getLogger(__name__)
 class SlackSecurity:
     def __init__(self):
         self.signing_secret = os.getenv("SLACK_SIGNING_SECRET")
+        # Secrets still accepted while rolling over to a new one, comma separated
+        previous = os.getenv("SLACK_PREVIOUS_SIGNING_SECRETS", "")
+        secrets = [self.signing_secret] + previous.split(",") if self.signing_secret else []
+        self.max_request_age = int(os.getenv("SLACK_MAX_REQUEST_AGE", "300"))
+        self.max_body_bytes = int(os.getenv("SLACK_MAX_BODY_BYTES", str(1024 * 1024)))
+        # Keyed HMAC states, copied per request so the key schedule is computed once per secret
+        self._macs = [hmac.new(s.strip().encode(), digestmod=hashlib.sha256) for s in secrets if s.strip()]
 
-    def verify_slack_request(self, body: bytes, timestamp: str, signature: str) -> bool:
+    @property
+    def enabled(self) -> bool:
+        return bool(self._macs)
+
+    def check_timestamp(self, timestamp: Optional[str]) -> bool:
+        """Reject stale or malformed timestamps, to prevent replay attacks, before the body is read"""
+        if not self.enabled:
+            return True
+        try:
+            request_time = int(timestamp)
+        except (TypeError, ValueError):
+            logger.warning("Slack request timestamp missing or invalid")
+            return False
+        if abs(int(time.time()) - request_time) > self.max_request_age:
+            logger.warning("Slack request timestamp too old")
+            return False
+        return True
+
+    def verify_slack_request(self, body: bytes, timestamp: str, signature: Union[str, bytes]) -> bool:
         """
         Verify that a request came from Slack by validating the signature.
 
@@ -21,39 +47,35 @@ class SlackSecurity:
             signature: X-Slack-Signature header value
 
         Returns:
-            bool: True if the request is verified, False otherwise
+            bool: True if the request is verified with any of the configured secrets, False otherwise
         """
-        if not self.signing_secret:
+        if not self.enabled:
             logger.warning("SLACK_SIGNING_SECRET not configured - skipping signature verification")
             return True  # Allow requests if no secret is configured (development mode)
 
-        try:
-            # Check timestamp to prevent replay attacks (should be within 5 minutes)
-            current_time = int(time.time())
-            request_time = int(timestamp)
-
-            if abs(current_time - request_time) > 300:  # 5 minutes
-                logger.warning("Slack request timestamp too old")
-                return False
-
-            # Create the signature base string
-            sig_basestring = f"v0:{timestamp}:{body.decode('utf-8')}"
-
-            # Calculate the expected signature
-            expected_signature = (
-                "v0=" + hmac.new(self.signing_secret.encode(), sig_basestring.encode(), hashlib.sha256).hexdigest()
-            )
+        if not self.check_timestamp(timestamp):
+            return False
+        if isinstance(signature, str):
+            signature = signature.encode()
+        if not signature.startswith(b"v0="):
+            logger.warning("Slack request signature missing or malformed")
+            return False
 
-            # Compare signatures
-            if hmac.compare_digest(expected_signature, signature):
+        # The signature base string is "v0:<timestamp>:<body>"; hash it in pieces rather than building a copy
+        try:
+            provided = bytes.fromhex(signature[3:].decode("ascii"))
+        except (UnicodeDecodeError, ValueError):
+            provided = b""
+        prefix = b"v0:" + timestamp.encode() + b":"
+        # The current secret is tried first, so previous ones only cost anything during a rollover
+        for base in self._macs:
+            mac = base.copy()
+            mac.update(prefix)
+            mac.update(body)
+            if hmac.compare_digest(mac.digest(), provided):
                 return True
-            else:
-                logger.warning("Slack request signature verification failed")
-                return False
-
-        except Exception as e:
-            logger.error(f"Error verifying Slack request: {e}")
-            return False
+        logger.warning("Slack request signature verification failed")
+        return False
 
 
 # Global instance
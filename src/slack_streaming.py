@@ -0,0 +1,77 @@
+import asyncio
+import os
+import time
+from logging import getLogger
+from typing import TYPE_CHECKING, Optional
+
+from .slack_outbound import PRIORITY_HIGH, PRIORITY_LOW, SlackOutbound
+
+if TYPE_CHECKING:
+    # Importing the agent pulls in the whole ADK, which the server defers until after it binds
+    from .agent import AgentUpdate
+
+logger = getLogger(__name__)
+
+
+class StreamingReply:
+    """
+    Placeholder message that is edited in place as the agent turn progresses.
+
+    Progress edits are throttled to one per interval and only the latest text is sent, so a turn stays well within
+    chat.update's rate tier however many events the agent emits.
+    """
+
+    def __init__(self, outbound: SlackOutbound, channel: str, ts: str, interval: Optional[float] = None):
+        if interval is None:
+            interval = float(os.getenv("SLACK_STREAM_UPDATE_INTERVAL", "1.5"))
+        self.outbound = outbound
+        self.channel = channel
+        self.ts = ts
+        self.interval = interval
+        self.text = ""
+        self.status = ""
+        self.edits = 0
+        self._last_edit = 0.0
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def progress(self, update: "AgentUpdate"):
+        """Record a tool call or partial text and schedule a throttled edit"""
+        if update.kind == "tool":
+            self.status = f"_Using {update.text}..._"
+        elif update.kind == "partial":
+            self.text += update.text
+            self.status = ""
+        else:
+            return
+        if not self._flush_task or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush())
+
+    async def finish(self, text: str):
+        """Replace the placeholder with the final text"""
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+        await self._edit(text, PRIORITY_HIGH)
+
+    async def _flush(self):
+        delay = self._last_edit + self.interval - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        text = "\n".join(part for part in (self.text, self.status) if part)
+        try:
+            await self._edit(text, PRIORITY_LOW)
+        except Exception as e:
+            # Progress edits are best effort; the final edit reports real failures
+            logger.warning(f"Failed to update streaming reply: {e}")
+
+    async def _edit(self, text: str, priority: int):
+        self._last_edit = time.monotonic()
+        self.edits += 1
+        await self.outbound.call(
+            "chat.update",
+            priority=priority,
+            coalesce_key=f"{self.channel}:{self.ts}",
+            channel=self.channel,
+            ts=self.ts,
+            text=text,
+        )
@@ -0,0 +1,160 @@
+import asyncio
+import json
+import os
+import random
+from logging import getLogger
+from typing import Any, Dict, Optional
+
+import aiohttp
+from slack_sdk.web.async_client import AsyncWebClient
+
+from .fast_json import loads
+from .metrics import events_total, stage_seconds, timed
+from .slack_commands import slack_commands
+from .slack_integration import slack_integration
+
+logger = getLogger(__name__)
+
+
+def transport() -> str:
+    """How Slack reaches the bot: "http" through the public trigger, or "socket" over a Socket Mode WebSocket"""
+    return os.getenv("SLACK_TRANSPORT", "http").lower()
+
+
+class SocketModeTransport:
+    """
+    Slack Socket Mode: events, slash commands and interactions arrive over one persistent WebSocket opened with an
+    app-level token (xapp-...), so the service needs no public endpoint and events pay no per-request TLS handshake
+    or signature verification.
+
+    Every envelope is acked as soon as it is read, then fed to the same pipeline as the HTTP endpoints. The
+    connection is reopened when Slack asks for it, and after failures with exponential backoff and jitter.
+    """
+
+    def __init__(
+        self,
+        app_token: Optional[str] = None,
+        reconnect_delay: Optional[float] = None,
+        max_reconnect_delay: Optional[float] = None,
+        ping_interval: Optional[float] = None,
+    ):
+        if app_token is None:
+            app_token = os.getenv("SLACK_APP_TOKEN")
+        if reconnect_delay is None:
+            reconnect_delay = float(os.getenv("SLACK_SOCKET_RECONNECT_DELAY", "1"))
+        if max_reconnect_delay is None:
+            max_reconnect_delay = float(os.getenv("SLACK_SOCKET_MAX_RECONNECT_DELAY", "30"))
+        if ping_interval is None:
+            ping_interval = float(os.getenv("SLACK_SOCKET_PING_INTERVAL", "10"))
+        self.app_token = app_token
+        self.client = AsyncWebClient()
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.ping_interval = ping_interval
+        self.connected = False
+        self.connections = 0
+        self.envelopes = 0
+        # Connection attempts that failed since the last successful one, setting the reconnect backoff
+        self.failures = 0
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connected": self.connected,
+            "connections": self.connections,
+            "envelopes": self.envelopes,
+            "failures": self.failures,
+        }
+
+    async def start(self) -> bool:
+        """Start connecting in the background; returns False when no app token is configured"""
+        if not self.app_token:
+            logger.error("SLACK_APP_TOKEN not found in environment variables, Socket Mode is disabled")
+            return False
+        if not self._task:
+            self._session = aiohttp.ClientSession()
+            self._task = asyncio.create_task(self._run())
+        return True
+
+    async def stop(self):
+        """Close the WebSocket; envelopes Slack sends meanwhile go to another connection or are retried"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._session:
+            await self._session.close()
+            self._session = None
+        self.connected = False
+
+    async def _run(self):
+        while True:
+            try:
+                if await self._connect():
+                    # Slack rotates connections every few hours and asks for a new one beforehand
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Socket Mode connection failed: {e}")
+            finally:
+                self.connected = False
+            self.failures += 1
+            delay = min(self.max_reconnect_delay, self.reconnect_delay * 2 ** (self.failures - 1))
+            delay *= random.uniform(0.5, 1)
+            logger.info(f"Reconnecting to Socket Mode in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def _connect(self) -> bool:
+        """Hold one connection until it closes; returns True when Slack asked to reconnect"""
+        response = await self.client.apps_connections_open(app_token=self.app_token)
+        async with self._session.ws_connect(response["url"], heartbeat=self.ping_interval) as ws:
+            self.connections += 1
+            async for message in ws:
+                if message.type != aiohttp.WSMsgType.TEXT:
+                    continue
+                envelope = loads(message.data)
+                if envelope.get("type") == "hello":
+                    self.connected = True
+                    # A connection that worked and later dropped is retried from the shortest delay
+                    self.failures = 0
+                    logger.info("Socket Mode connected")
+                elif envelope.get("type") == "disconnect":
+                    logger.info(f"Socket Mode disconnect requested: {envelope.get('reason')}")
+                    return True
+                elif envelope.get("envelope_id"):
+                    await self._handle(ws, envelope)
+        return False
+
+    async def _handle(self, ws: aiohttp.ClientWebSocketResponse, envelope: Dict[str, Any]):
+        self.envelopes += 1
+        kind = envelope.get("type")
+        payload = envelope.get("payload") or {}
+        ack: Dict[str, Any] = {"envelope_id": envelope["envelope_id"]}
+        with timed(stage_seconds, "slack.envelope", stage="envelope") as timer:
+            try:
+                if kind == "slash_commands":
+                    # The ack carries what is shown to the user right away, as the HTTP response does
+                    ack["payload"] = slack_commands.handle_command(payload)
+            except Exception as e:
+                logger.error(f"Error handling Slack command: {e}")
+                timer.outcome = "error"
+            await ws.send_str(json.dumps(ack))
+            try:
+                if kind == "interactive":
+                    slack_commands.handle_interaction(payload)
+                elif kind == "events_api":
+                    retry = envelope.get("retry_attempt")
+                    await slack_integration.handle_slack_event(payload, retry_num=str(retry) if retry else None)
+                elif kind != "slash_commands":
+                    events_total.inc(outcome="ignored")
+                    timer.outcome = "ignored"
+            except Exception as e:
+                # Like a 500 on the HTTP path, one bad envelope does not take the connection down
+                logger.error(f"Error handling Socket Mode envelope of type {kind}: {e}")
+                timer.outcome = "error"
+
+
+# Global instance
+socket_mode = SocketModeTransport()
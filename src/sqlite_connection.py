@@ -0,0 +1,28 @@
+import asyncio
+import sqlite3
+from typing import Any, Callable
+
+
+class SQLiteConnection:
+    """
+    SQLite connection in WAL mode whose statements run in the default thread pool, off the event loop.
+
+    Several processes on one host may open the same file; within a process, use `run` for every access.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        # One connection is shared by the thread pool, so statements are serialised here
+        self._lock = asyncio.Lock()
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """Call fn(*args) in a worker thread once no other call is using the connection"""
+        async with self._lock:
+            return await asyncio.to_thread(fn, *args)
+
+    async def close(self):
+        async with self._lock:
+            self.conn.close()
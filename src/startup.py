@@ -0,0 +1,126 @@
+import asyncio
+import importlib
+import os
+import time
+from logging import getLogger
+from types import ModuleType
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = getLogger(__name__)
+
+# Set when this module is first imported, which is close enough to process start to measure time-to-ready
+PROCESS_START = time.monotonic()
+
+_agent_module: Optional["asyncio.Future[ModuleType]"] = None
+
+
+async def load_agent() -> ModuleType:
+    """
+    Import the agent module, and with it google.adk, litellm and blaxel, in a worker thread.
+
+    These imports take seconds, so they are kept out of the import of the app: the server binds and answers
+    liveness checks while they load. Concurrent callers share one import.
+    """
+    global _agent_module
+    if _agent_module is None:
+        _agent_module = asyncio.ensure_future(asyncio.to_thread(importlib.import_module, f"{__package__}.agent"))
+    try:
+        return await asyncio.shield(_agent_module)
+    except Exception:
+        # Let the next caller try again
+        if _agent_module.done():
+            _agent_module = None
+        raise
+
+
+def loaded_agent() -> Optional[ModuleType]:
+    """The agent module if it has been imported, without importing it"""
+    if _agent_module is not None and _agent_module.done() and not _agent_module.exception():
+        return _agent_module.result()
+    return None
+
+
+class Startup:
+    """
+    Startup phase run in the background by the lifespan: authenticating with Slack, importing the agent and
+    building its runtime (model and tools) run concurrently, each with a timeout.
+
+    The server is live as soon as it binds. It is ready once Slack accepted the token and the agent runtime is
+    built; a runtime that failed to build at startup is built again by the first message, and a failed Slack
+    authentication is retried in the background with exponential backoff.
+    """
+
+    def __init__(self, timeout: Optional[float] = None, retry_interval: Optional[float] = None):
+        if timeout is None:
+            timeout = float(os.getenv("STARTUP_TIMEOUT", "30"))
+        if retry_interval is None:
+            retry_interval = float(os.getenv("STARTUP_RETRY_INTERVAL", "1"))
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self.max_retry_interval = 60.0
+        self.steps: Dict[str, str] = {}
+        self.timings: Dict[str, float] = {}
+        self.time_to_ready: Optional[float] = None
+        self.done = asyncio.Event()
+
+    @property
+    def ready(self) -> bool:
+        agent = loaded_agent()
+        return (
+            self.done.is_set()
+            and self.steps.get("slack") == "ok"
+            and agent is not None
+            and agent.agent_runtime.runner is not None
+        )
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "steps": self.steps,
+            "timings": self.timings,
+            "time_to_ready_seconds": self.time_to_ready,
+        }
+
+    async def run(self, slack_start: Callable[[], Awaitable[bool]]):
+        start = time.monotonic()
+        await asyncio.gather(self._step("slack", slack_start), self._step("agent", self._start_agent))
+        self.done.set()
+        self._record_ready()
+        level = "ready" if self.ready else "finished with failures"
+        logger.info(
+            f"Startup {level} in {time.monotonic() - start:.2f}s "
+            f"({', '.join(f'{name} {seconds:.2f}s' for name, seconds in self.timings.items())}): {self.steps}"
+        )
+        # auth.test only runs here, so a Slack outage at boot would otherwise leave the server not ready for good
+        delay = self.retry_interval
+        while self.steps["slack"] != "ok":
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_retry_interval)
+            await self._step("slack", slack_start)
+            if self.steps["slack"] == "ok":
+                logger.info("Slack authentication succeeded on retry")
+                self._record_ready()
+
+    def _record_ready(self):
+        if self.ready and self.time_to_ready is None:
+            self.time_to_ready = time.monotonic() - PROCESS_START
+
+    async def _start_agent(self) -> bool:
+        start = time.monotonic()
+        agent = await load_agent()
+        self.timings["agent_import"] = time.monotonic() - start
+        return await agent.agent_runtime.start()
+
+    async def _step(self, name: str, fn: Callable[[], Awaitable[bool]]):
+        self.steps[name] = "pending"
+        start = time.monotonic()
+        try:
+            ok = await asyncio.wait_for(fn(), self.timeout)
+            self.steps[name] = "ok" if ok else "failed"
+        except asyncio.TimeoutError:
+            logger.error(f"Startup step '{name}' timed out after {self.timeout}s")
+            self.steps[name] = "timeout"
+        except Exception as e:
+            logger.error(f"Startup step '{name}' failed: {e}")
+            self.steps[name] = "failed"
+        self.timings[name] = time.monotonic() - start
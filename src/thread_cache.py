@@ -0,0 +1,186 @@
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from logging import getLogger
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .single_flight import SingleFlight
+
+logger = getLogger(__name__)
+
+ThreadKey = Tuple[str, str]
+
+
+def _ts_key(ts: str) -> Tuple[int, int]:
+    """Order Slack timestamps exactly; as floats, neighbouring microseconds are barely distinguishable"""
+    seconds, _, micros = ts.partition(".")
+    return int(seconds), int(micros.ljust(6, "0")[:6] or 0)
+
+
+def thread_root(event: Dict[str, Any]) -> Optional[str]:
+    """
+    The ts of the thread a message belongs to, or starts since the bot answers channel messages in a thread.
+    None for top-level direct messages, which together form the user's DM conversation.
+    """
+    if event.get("thread_ts"):
+        return event["thread_ts"]
+    if event.get("channel_type") == "im" or str(event.get("channel", "")).startswith("D"):
+        return None
+    return event.get("ts")
+
+
+def conversation_id(event: Dict[str, Any]) -> str:
+    """Session of a message: its thread, shared by every participant, or the user's DM conversation"""
+    root = thread_root(event)
+    if root:
+        return f"slack_{event.get('channel')}_{root}"
+    return f"slack_{event.get('channel')}_{event.get('user')}"
+
+
+@dataclass
+class ThreadMessage:
+    ts: str
+    user: Optional[str]
+    text: str
+
+
+@dataclass
+class _Thread:
+    messages: "OrderedDict[str, ThreadMessage]" = field(default_factory=OrderedDict)
+    # Latest message the thread's session has seen, either as a turn or as context given to a turn
+    consumed: Optional[str] = None
+    expires: float = 0.0
+
+
+class ThreadCache:
+    """
+    TTL/LRU cache of the messages of the threads the bot takes part in.
+
+    A thread is fetched with conversations.replies once, incrementally from the session's last update when the
+    session already exists, and is then kept up to date from incoming message events. Concurrent loads of the same
+    thread share one fetch.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[str, str, Optional[str]], Awaitable[List[Dict[str, Any]]]],
+        max_size: Optional[int] = None,
+        ttl: Optional[float] = None,
+        max_messages: Optional[int] = None,
+    ):
+        if max_size is None:
+            max_size = int(os.getenv("SLACK_THREAD_CACHE_SIZE", "1000"))
+        if ttl is None:
+            ttl = float(os.getenv("SLACK_THREAD_CACHE_TTL", "3600"))
+        if max_messages is None:
+            max_messages = int(os.getenv("SLACK_THREAD_MAX_MESSAGES", "50"))
+        self.fetch = fetch
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_messages = max_messages
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.fetched_messages = 0
+        self._threads: "OrderedDict[ThreadKey, _Thread]" = OrderedDict()
+        self._loads = SingleFlight()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "fetched_messages": self.fetched_messages,
+            "size": len(self._threads),
+        }
+
+    def start(self, channel: str, thread_ts: str):
+        """Track a thread that the bot starts by answering its top-level message, so it has no history to fetch"""
+        if (channel, thread_ts) not in self._threads:
+            self._put((channel, thread_ts), _Thread())
+
+    def observe(self, event: Dict[str, Any]):
+        """Record a message posted in a thread that is already cached"""
+        thread_ts = event.get("thread_ts")
+        thread = self._threads.get((event.get("channel"), thread_ts)) if thread_ts else None
+        if thread and event.get("ts"):
+            self._add(thread, event)
+
+    async def unseen(
+        self,
+        channel: str,
+        thread_ts: str,
+        turn_ts: Iterable[str],
+        since: Callable[[], Awaitable[Optional[float]]],
+    ) -> List[ThreadMessage]:
+        """
+        Messages of the thread that its session has not seen, posted before the messages of this turn, which are
+        marked as seen.
+
+        Args:
+            channel: Channel of the thread
+            thread_ts: ts of the thread's parent message
+            turn_ts: ts of the messages answered by this turn
+            since: Returns when the thread's session was last updated, or None when it does not exist yet; only
+                called when the thread is not cached
+        """
+        turn_ts = set(turn_ts)
+        thread = await self._get(channel, thread_ts, since)
+        last = max(turn_ts, key=_ts_key)
+        consumed = _ts_key(thread.consumed) if thread.consumed else (0, 0)
+        unseen = sorted(
+            (
+                message
+                for ts, message in thread.messages.items()
+                if consumed < _ts_key(ts) < _ts_key(last) and ts not in turn_ts
+            ),
+            key=lambda message: _ts_key(message.ts),
+        )
+        if not thread.consumed or _ts_key(last) > consumed:
+            thread.consumed = last
+        return unseen
+
+    async def _get(self, channel: str, thread_ts: str, since: Callable[[], Awaitable[Optional[float]]]) -> _Thread:
+        key = (channel, thread_ts)
+        thread = self._threads.get(key)
+        if thread and thread.expires > time.monotonic():
+            # Events keep cached threads current, so the TTL only evicts threads that went quiet
+            thread.expires = time.monotonic() + self.ttl
+            self._threads.move_to_end(key)
+            self.hits += 1
+            return thread
+
+        if key in self._loads:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+        return await self._loads.run(key, lambda: self._load(channel, thread_ts, since))
+
+    async def _load(self, channel: str, thread_ts: str, since: Callable[[], Awaitable[Optional[float]]]) -> _Thread:
+        updated = await since()
+        # An existing session has seen the thread up to its last update, so only later replies are fetched
+        oldest = f"{updated:.6f}" if updated else None
+        messages = await self.fetch(channel, thread_ts, oldest)
+        self.fetched_messages += len(messages)
+        thread = _Thread(consumed=oldest)
+        for message in sorted(messages, key=lambda m: _ts_key(m["ts"])):
+            if not oldest or _ts_key(message["ts"]) > _ts_key(oldest):
+                self._add(thread, message)
+        self._put((channel, thread_ts), thread)
+        return thread
+
+    def _add(self, thread: _Thread, message: Dict[str, Any]):
+        text = (message.get("text") or "").strip()
+        if not text:
+            return
+        thread.messages[message["ts"]] = ThreadMessage(message["ts"], message.get("user"), text)
+        while len(thread.messages) > self.max_messages:
+            thread.messages.popitem(last=False)
+
+    def _put(self, key: ThreadKey, thread: _Thread):
+        thread.expires = time.monotonic() + self.ttl
+        self._threads[key] = thread
+        self._threads.move_to_end(key)
+        while len(self._threads) > self.max_size:
+            self._threads.popitem(last=False)
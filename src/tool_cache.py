@@ -0,0 +1,162 @@
+import json
+import os
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from logging import getLogger
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from google.adk.tools import BaseTool, FunctionTool
+from google.adk.tools.tool_context import ToolContext
+from google.genai import types
+
+from .metrics import tool_cache_saved_seconds_total, tool_cache_total
+from .single_flight import SingleFlight
+
+logger = getLogger(__name__)
+
+# Set for the duration of an agent turn that must not be answered from cached tool results
+bypass_tool_cache: ContextVar[bool] = ContextVar("bypass_tool_cache", default=False)
+
+
+def _normalise(value: Any) -> Any:
+    """Make arguments that only differ in case, spacing or key order produce the same cache key"""
+    if isinstance(value, str):
+        return " ".join(value.split()).casefold()
+    if isinstance(value, dict):
+        return {str(k): _normalise(v) for k, v in value.items() if v is not None}
+    if isinstance(value, (list, tuple)):
+        return [_normalise(v) for v in value]
+    return value
+
+
+def is_error(result: Any) -> bool:
+    """Whether a tool result reports a failure, as MCP tools do rather than raising"""
+    if isinstance(result, dict):
+        return bool(result.get("isError") or result.get("error"))
+    return bool(getattr(result, "isError", False))
+
+
+def _parse_ttls(spec: str) -> Dict[str, float]:
+    """Parse "name=seconds,name=seconds" """
+    ttls = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        name, _, ttl = item.partition("=")
+        try:
+            ttls[name.strip()] = float(ttl)
+        except ValueError:
+            logger.warning(f"Ignoring invalid tool cache TTL '{item}'")
+    return ttls
+
+
+class ToolCache:
+    """
+    TTL/LRU cache of tool results keyed by tool name and normalised arguments.
+
+    Concurrent identical calls share one execution, errors are never cached and a TTL of 0 disables caching for
+    a tool. Results are shared across users and conversations, so only tools whose output does not depend on who
+    asks should be given a TTL.
+    """
+
+    def __init__(
+        self,
+        max_size: Optional[int] = None,
+        default_ttl: Optional[float] = None,
+        ttls: Optional[Dict[str, float]] = None,
+    ):
+        if max_size is None:
+            max_size = int(os.getenv("AGENT_TOOL_CACHE_SIZE", "500"))
+        if default_ttl is None:
+            default_ttl = float(os.getenv("AGENT_TOOL_CACHE_TTL", "300"))
+        if ttls is None:
+            ttls = _parse_ttls(os.getenv("AGENT_TOOL_CACHE_TTLS", "weather=3600"))
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        self.ttls = ttls
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.bypassed = 0
+        self.saved_seconds = 0.0
+        # key -> (expiry, result, seconds the original call took)
+        self._entries: "OrderedDict[str, Tuple[float, Any, float]]" = OrderedDict()
+        self._calls = SingleFlight()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "bypassed": self.bypassed,
+            "hit_ratio": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            "saved_seconds": self.saved_seconds,
+            "size": len(self._entries),
+        }
+
+    def ttl_for(self, name: str) -> float:
+        return self.ttls.get(name, self.default_ttl)
+
+    def wrap(self, tools: List[Any]) -> List[BaseTool]:
+        """Wrap ADK tools and plain functions so their calls go through the cache"""
+        wrapped = []
+        for tool in tools:
+            if not isinstance(tool, BaseTool):
+                tool = FunctionTool(tool)
+            wrapped.append(CachedTool(tool, self) if self.ttl_for(tool.name) > 0 else tool)
+        return wrapped
+
+    def clear(self):
+        self._entries.clear()
+
+    async def call(self, name: str, args: Dict[str, Any], run: Callable[[], Awaitable[Any]]) -> Any:
+        ttl = self.ttl_for(name)
+        if ttl <= 0 or bypass_tool_cache.get():
+            self.bypassed += 1
+            tool_cache_total.inc(tool=name, outcome="bypassed")
+            return await run()
+
+        key = f"{name}:{json.dumps(_normalise(args), sort_keys=True, default=str)}"
+        entry = self._entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.saved_seconds += entry[2]
+            tool_cache_total.inc(tool=name, outcome="hit")
+            tool_cache_saved_seconds_total.inc(entry[2], tool=name)
+            return entry[1]
+
+        if key in self._calls:
+            self.coalesced += 1
+            tool_cache_total.inc(tool=name, outcome="coalesced")
+        else:
+            self.misses += 1
+            tool_cache_total.inc(tool=name, outcome="miss")
+        return await self._calls.run(key, lambda: self._load(key, ttl, run))
+
+    async def _load(self, key: str, ttl: float, run: Callable[[], Awaitable[Any]]) -> Any:
+        start = time.perf_counter()
+        result = await run()
+        if not is_error(result):
+            self._entries[key] = (time.monotonic() + ttl, result, time.perf_counter() - start)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return result
+
+
+class CachedTool(BaseTool):
+    """ADK tool that answers from a ToolCache before running the wrapped tool"""
+
+    def __init__(self, tool: BaseTool, cache: ToolCache):
+        super().__init__(name=tool.name, description=tool.description, is_long_running=tool.is_long_running)
+        self.tool = tool
+        self.cache = cache
+
+    def _get_declaration(self) -> Optional[types.FunctionDeclaration]:
+        return self.tool._get_declaration()
+
+    async def run_async(self, *, args: Dict[str, Any], tool_context: ToolContext) -> Any:
+        return await self.cache.call(self.name, args, lambda: self.tool.run_async(args=args, tool_context=tool_context))
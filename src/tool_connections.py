@@ -0,0 +1,91 @@
+import asyncio
+from logging import getLogger
+from typing import List
+
+from blaxel.core.tools import PersistentMcpClient, convert_mcp_tool_to_blaxel_tool
+from blaxel.core.tools.types import Tool
+
+logger = getLogger(__name__)
+
+
+class ToolConnections:
+    """
+    MCP clients behind one version of the agent's tool list.
+
+    Turns hold a lease on the connections they started with. When the tools are reconnected the previous
+    connections are retired: turns still using them finish undisturbed, and the clients are closed once the last
+    of those turns ends.
+    """
+
+    def __init__(self, clients: List[PersistentMcpClient]):
+        self.clients = clients
+        self.turns = 0
+        self.retired = False
+        self.closed = False
+
+    def tools(self) -> List[Tool]:
+        return [convert_mcp_tool_to_blaxel_tool(client, tool) for client in self.clients for tool in client.get_tools()]
+
+    def acquire(self):
+        self.turns += 1
+
+    async def release(self):
+        self.turns -= 1
+        if self.retired and not self.turns:
+            await self.close()
+
+    async def retire(self):
+        """Close the clients as soon as no turn uses them"""
+        self.retired = True
+        if not self.turns:
+            await self.close()
+
+    async def ping(self) -> List[str]:
+        """Ping every open session, returning the names of the clients whose session is dead"""
+        dead = []
+        for client in self.clients:
+            # Sessions closed when idle (or after every call on Blaxel cloud) are reopened by the next call
+            if not client.session:
+                continue
+            try:
+                await asyncio.wait_for(client.session.send_ping(), timeout=5)
+            except Exception as e:
+                logger.warning(f"Tool session '{client.name}' failed health check: {e}")
+                dead.append(client.name)
+        return dead
+
+    async def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        for client in self.clients:
+            await _close_client(client)
+
+
+async def _close_client(client: PersistentMcpClient):
+    # PersistentMcpClient has no public close: its session and transport are held by its two exit stacks
+    if not client.session:
+        return
+    client.session = None
+    for stack in (client.session_exit_stack, client.client_exit_stack):
+        try:
+            await stack.aclose()
+        except Exception as e:
+            logger.debug(f"Error closing tool session '{client.name}': {e}")
+
+
+async def connect_tools(names: List[str], timeout: int) -> ToolConnections:
+    """
+    Open a new MCP client per tool server and list its tools.
+
+    The clients are owned by the returned connections rather than shared through blaxel's module-level cache, so
+    reconnecting never closes a client that a running turn still uses.
+    """
+    clients = [PersistentMcpClient(name, timeout=timeout) for name in names]
+    connections = ToolConnections(clients)
+    try:
+        await asyncio.gather(*(client.list_tools() for client in clients))
+    except BaseException:
+        await connections.close()
+        raise
+    return connections
@@ -0,0 +1,123 @@
+import asyncio
+import os
+from logging import getLogger
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = getLogger(__name__)
+
+Job = Tuple[Callable[..., Awaitable[Any]], tuple, Dict[str, Any]]
+
+
+class WorkQueue:
+    """Bounded in-process job queue drained by a fixed pool of asyncio workers"""
+
+    def __init__(self, workers: Optional[int] = None, max_size: Optional[int] = None):
+        if workers is None:
+            workers = int(os.getenv("SLACK_WORKERS", "8"))
+        if max_size is None:
+            max_size = int(os.getenv("SLACK_QUEUE_SIZE", "100"))
+        self.workers = workers
+        self.max_size = max_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        # Job currently being run by each worker, used to report work lost on shutdown
+        self._current: Dict[int, Job] = {}
+        self._done_callbacks: List[Callable[[], None]] = []
+        self._accepting = False
+
+    @property
+    def depth(self) -> int:
+        """Number of jobs waiting for a worker"""
+        return self._queue.qsize() if self._queue else 0
+
+    @property
+    def in_flight(self) -> int:
+        """Number of jobs currently being run by a worker"""
+        return len(self._current)
+
+    @property
+    def running(self) -> bool:
+        return self._accepting
+
+    def add_done_callback(self, callback: Callable[[], None]):
+        """Call `callback` each time a worker finishes a job, once its slot is free"""
+        self._done_callbacks.append(callback)
+
+    async def start(self):
+        """Start the worker pool"""
+        if self._accepting:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._current = {}
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        self._accepting = True
+        logger.info(f"Work queue started: workers={self.workers}, max_size={self.max_size}")
+
+    def submit(self, job: Callable[..., Awaitable[Any]], *args, **kwargs) -> bool:
+        """Enqueue a job without waiting. Returns False when the queue is full or not running."""
+        if not self._accepting:
+            return False
+        try:
+            self._queue.put_nowait((job, args, kwargs))
+            return True
+        except asyncio.QueueFull:
+            logger.warning(f"Work queue full ({self.max_size} pending jobs), shedding load")
+            return False
+
+    async def stop(self, timeout: Optional[float] = None) -> List[Job]:
+        """
+        Stop accepting jobs, let workers drain pending ones, then cancel them.
+
+        Returns:
+            List[Job]: Jobs that were still queued or running when the drain timed out
+        """
+        if not self._accepting:
+            return []
+        self._accepting = False
+        if timeout is None:
+            timeout = float(os.getenv("SLACK_DRAIN_TIMEOUT", "25"))
+
+        dropped: List[Job] = []
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            dropped.extend(self._current.values())
+            while not self._queue.empty():
+                dropped.append(self._queue.get_nowait())
+                self._queue.task_done()
+            logger.warning(
+                f"Work queue drain timed out after {timeout}s: "
+                f"{self.in_flight} in flight and {len(dropped) - self.in_flight} queued jobs dropped"
+            )
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._current = {}
+        logger.info("Work queue stopped")
+        return dropped
+
+    async def _worker(self, index: int):
+        while True:
+            item = await self._queue.get()
+            job, args, kwargs = item
+            self._current[index] = item
+            try:
+                await job(*args, **kwargs)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Worker {index} job failed: {e}", exc_info=e)
+            finally:
+                self._current.pop(index, None)
+                self._queue.task_done()
+                for callback in self._done_callbacks:
+                    try:
+                        callback()
+                    except Exception as e:
+                        logger.error(f"Work queue done callback failed: {e}", exc_info=e)
+
+
+# Global instance
+work_queue = WorkQueue()
@@ -0,0 +1,15 @@
+from collections import namedtuple
+
+# Stands in for src.agent.AgentUpdate, whose module imports the whole ADK
+AgentUpdate = namedtuple("AgentUpdate", ["kind", "text"])
+
+
+class FakeOutbound:
+    """SlackOutbound stand-in recording every call"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def call(self, method, **kwargs):
+        self.calls.append((method, kwargs))
+        return {"ok": True, "ts": "2.0"}
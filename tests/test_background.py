@@ -0,0 +1,17 @@
+import asyncio
+
+from src.background import BackgroundTasks
+
+
+def test_drain_waits_for_quick_tasks_and_cancels_slow_ones():
+    async def scenario():
+        background = BackgroundTasks()
+        quick = background.run(asyncio.sleep(0.01, "done"))
+        slow = background.run(asyncio.sleep(10))
+        assert len(background) == 2
+        await background.drain(timeout=0.05)
+        assert quick.result() == "done"
+        assert slow.cancelled()
+        assert len(background) == 0
+
+    asyncio.run(scenario())
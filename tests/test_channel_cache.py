@@ -0,0 +1,71 @@
+import asyncio
+
+from src.channel_cache import ChannelCache
+from src.metrics import channel_cache_total
+
+
+def test_concurrent_lookups_share_one_fetch():
+    async def scenario():
+        fetched = []
+
+        async def fetch(channel_id):
+            fetched.append(channel_id)
+            await asyncio.sleep(0.01)
+            return {"id": channel_id, "is_im": channel_id.startswith("D")}
+
+        cache = ChannelCache(fetch, max_size=10, ttl=60)
+        coalesced = channel_cache_total.value(outcome="coalesced")
+        results = await asyncio.gather(*(cache.get("D1") for _ in range(5)))
+        assert all(info["is_im"] for info in results)
+        assert fetched == ["D1"]
+        await cache.get("D1")
+        assert cache.stats() == {"hits": 1, "misses": 1, "coalesced": 4, "size": 1}
+        assert channel_cache_total.value(outcome="coalesced") == coalesced + 4
+
+    asyncio.run(scenario())
+
+
+def test_evicts_least_recently_used_and_expired_entries():
+    async def scenario():
+        fetched = []
+
+        async def fetch(channel_id):
+            fetched.append(channel_id)
+            return {"id": channel_id}
+
+        cache = ChannelCache(fetch, max_size=2, ttl=60)
+        await cache.get("C1")
+        await cache.get("C2")
+        await cache.get("C1")
+        await cache.get("C3")  # evicts C2, the least recently used
+        await cache.get("C1")
+        await cache.get("C2")
+        assert fetched == ["C1", "C2", "C3", "C2"]
+
+        cache.ttl = 0
+        await cache.get("C4")
+        await cache.get("C4")
+        assert fetched[-2:] == ["C4", "C4"]
+
+    asyncio.run(scenario())
+
+
+def test_failed_fetch_is_not_cached():
+    async def scenario():
+        calls = 0
+
+        async def fetch(channel_id):
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                raise RuntimeError("boom")
+            return {"id": channel_id}
+
+        cache = ChannelCache(fetch, max_size=10, ttl=60)
+        try:
+            await cache.get("C1")
+        except RuntimeError:
+            pass
+        assert await cache.get("C1") == {"id": "C1"}
+
+    asyncio.run(scenario())
@@ -0,0 +1,51 @@
+import asyncio
+
+from src.dedup import MemoryDedupStore, SQLiteDedupStore
+
+
+def test_memory_store_evicts_oldest_first():
+    async def scenario():
+        store = MemoryDedupStore(ttl=60, max_size=3)
+        for key in ("a", "b", "c", "d"):
+            assert not await store.check_and_add(key)
+        assert not await store.contains("a")
+        assert await store.check_and_add("b")
+        assert await store.check_and_add("d")
+
+    asyncio.run(scenario())
+
+
+def test_memory_store_expires_entries():
+    async def scenario():
+        store = MemoryDedupStore(ttl=0.01, max_size=10)
+        assert not await store.check_and_add("a")
+        await asyncio.sleep(0.02)
+        assert not await store.check_and_add("a")
+
+    asyncio.run(scenario())
+
+
+def test_any_known_key_marks_a_duplicate():
+    async def scenario():
+        store = MemoryDedupStore(ttl=60, max_size=10)
+        assert not await store.check_and_add("C1_1.0", "Ev1")
+        assert await store.check_and_add("C1_1.0", "Ev2")
+        await store.discard("C1_1.0", "Ev1")
+        assert not await store.check_and_add("C1_1.0", "Ev1")
+
+    asyncio.run(scenario())
+
+
+def test_sqlite_store_is_shared_between_instances(tmp_path):
+    async def scenario():
+        path = str(tmp_path / "dedup.sqlite3")
+        first, second = SQLiteDedupStore(path, ttl=60), SQLiteDedupStore(path, ttl=60)
+        assert not await first.check_and_add("C1_1.0", "Ev1")
+        assert await second.check_and_add("Ev1")
+        assert await second.contains("C1_1.0")
+        await second.discard("C1_1.0", "Ev1")
+        assert not await first.check_and_add("Ev1")
+        await first.close()
+        await second.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,62 @@
+from google.genai import types
+
+from src.history import OMITTED_TOOL_OUTPUT, HistoryCompactor
+
+
+def user(text):
+    return types.Content(role="user", parts=[types.Part(text=text)])
+
+
+def model(text):
+    return types.Content(role="model", parts=[types.Part(text=text)])
+
+
+def tool_turn(question, output):
+    return [
+        user(question),
+        types.Content(role="model", parts=[types.Part(function_call=types.FunctionCall(id="1", name="search"))]),
+        types.Content(
+            role="user",
+            parts=[types.Part(function_response=types.FunctionResponse(id="1", name="search", response=output))],
+        ),
+        model("answer"),
+    ]
+
+
+def test_short_history_is_untouched():
+    contents = [user("hi"), model("hello"), user("how are you")]
+    assert HistoryCompactor(max_tokens=1000).compact(contents) == contents
+
+
+def test_drops_oldest_turns_over_budget_and_summarises_them():
+    contents = []
+    for i in range(10):
+        contents += [user(f"question {i} " + "x" * 400), model(f"answer {i} " + "y" * 400)]
+    contents.append(user("current question"))
+
+    compactor = HistoryCompactor(max_tokens=500, summary_tokens=100)
+    compacted = compactor.compact(contents)
+
+    summary = compacted[0].parts[0].text
+    assert summary.startswith("Summary of the earlier conversation:\n- User: question 7")
+    assert "answer 7" in summary and "question 6" not in summary
+    assert compacted[1].parts[0].text.startswith("question 8")
+    assert compacted[-1].parts[0].text == "current question"
+    assert compactor.compactions == 1
+
+
+def test_current_turn_is_kept_even_over_budget():
+    contents = [user("old"), model("reply"), user("z" * 10000)]
+    compacted = HistoryCompactor(max_tokens=10, summary_tokens=0).compact(contents)
+    assert compacted == [contents[-1]]
+
+
+def test_old_tool_outputs_are_stubbed_but_keep_their_call_pairing():
+    contents = tool_turn("first", {"result": "big" * 1000}) + tool_turn("second", {"result": "recent"})
+    contents.append(user("third"))
+
+    compacted = HistoryCompactor(max_tokens=100000, tool_output_turns=2).compact(contents)
+
+    assert compacted[2].parts[0].function_response.response == OMITTED_TOOL_OUTPUT
+    assert compacted[2].parts[0].function_response.id == "1"
+    assert compacted[6].parts[0].function_response.response == {"result": "recent"}
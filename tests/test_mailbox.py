@@ -0,0 +1,137 @@
+import asyncio
+
+from src.mailbox import ConversationMailboxes
+from src.work_queue import WorkQueue
+
+
+class Recorder:
+    def __init__(self, delay: float = 0.02):
+        self.delay = delay
+        self.turns = []
+        self.active = 0
+        self.max_active = 0
+
+    async def __call__(self, items):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        self.turns.append(items)
+        await asyncio.sleep(self.delay)
+        self.active -= 1
+
+
+def test_messages_sent_during_a_turn_are_merged_into_the_next_one():
+    async def scenario():
+        queue = WorkQueue(workers=4, max_size=10)
+        recorder = Recorder()
+        mailboxes = ConversationMailboxes(queue, recorder, max_per_group=4)
+        await queue.start()
+        assert mailboxes.post("s1", "C1", "a")
+        await asyncio.sleep(0.005)  # first turn is running
+        for item in ("b", "c", "d"):
+            assert mailboxes.post("s1", "C1", item)
+        await asyncio.sleep(0.1)
+        await queue.stop()
+        assert recorder.turns == [["a"], ["b", "c", "d"]]
+        assert recorder.max_active == 1
+        assert mailboxes.coalesced == 2
+
+    asyncio.run(scenario())
+
+
+def test_independent_conversations_run_in_parallel():
+    async def scenario():
+        queue = WorkQueue(workers=4, max_size=10)
+        recorder = Recorder()
+        mailboxes = ConversationMailboxes(queue, recorder, max_per_group=4)
+        await queue.start()
+        for i in range(4):
+            mailboxes.post(f"s{i}", "C1", i)
+        await asyncio.sleep(0.01)
+        assert recorder.max_active == 4
+        await queue.stop()
+
+    asyncio.run(scenario())
+
+
+def test_busy_channel_does_not_starve_other_channels():
+    async def scenario():
+        queue = WorkQueue(workers=2, max_size=50)
+        recorder = Recorder()
+        mailboxes = ConversationMailboxes(queue, recorder, max_per_group=1)
+        await queue.start()
+        for i in range(5):
+            mailboxes.post(f"busy{i}", "C1", f"busy{i}")
+        mailboxes.post("quiet", "C2", "quiet")
+        await asyncio.sleep(0.03)
+        # The busy channel took both idle workers, but the quiet channel's turn runs before its other turns
+        assert recorder.turns[2] == ["quiet"]
+        await asyncio.sleep(0.2)
+        await queue.stop()
+        assert len(recorder.turns) == 6
+
+    asyncio.run(scenario())
+
+
+def test_channels_share_idle_workers_beyond_their_share():
+    async def scenario():
+        queue = WorkQueue(workers=4, max_size=50)
+        recorder = Recorder(delay=0.05)
+        mailboxes = ConversationMailboxes(queue, recorder, max_per_group=1)
+        await queue.start()
+        for i in range(3):
+            mailboxes.post(f"a{i}", "C1", f"a{i}")
+        await asyncio.sleep(0.01)
+        # Alone, a channel uses idle workers beyond its share
+        assert recorder.active == 3
+
+        for i in range(3, 8):
+            mailboxes.post(f"a{i}", "C1", f"a{i}")
+        for i in range(4):
+            mailboxes.post(f"b{i}", "C2", f"b{i}")
+        await asyncio.sleep(0.065)
+        # Both channels are over their share with turns waiting, and still no worker sits idle
+        assert recorder.active == 4
+        assert sum(turn[0].startswith("b") for turn in recorder.turns[3:8]) >= 2
+        await asyncio.sleep(0.3)
+        await queue.stop()
+        assert len(recorder.turns) == 12
+
+    asyncio.run(scenario())
+
+
+def test_sheds_when_queue_refuses_and_reports_unfinished_messages():
+    async def scenario():
+        queue = WorkQueue(workers=1, max_size=1)
+        recorder = Recorder(delay=10)
+        mailboxes = ConversationMailboxes(queue, recorder, max_per_group=5)
+        await queue.start()
+        assert mailboxes.post("s1", "C1", "a")
+        await asyncio.sleep(0)
+        assert mailboxes.post("s2", "C1", "b")  # queued
+        assert not mailboxes.post("s3", "C1", "c")  # queue full
+        assert mailboxes.post("s1", "C1", "d")  # merged into s1's next turn
+        await queue.stop(timeout=0.01)
+        assert sorted(mailboxes.unfinished()) == ["a", "b", "d"]
+
+    asyncio.run(scenario())
+
+
+def test_follow_up_refused_by_a_shared_queue_runs_when_another_mailbox_frees_it():
+    async def scenario():
+        queue = WorkQueue(workers=1, max_size=1)
+        events, commands = Recorder(), Recorder()
+        event_mailboxes = ConversationMailboxes(queue, events, max_per_group=1)
+        command_mailboxes = ConversationMailboxes(queue, commands, max_per_group=1)
+        await queue.start()
+        assert event_mailboxes.post("s1", "C1", "a")
+        await asyncio.sleep(0.005)  # first turn is running
+        assert command_mailboxes.post("s2", "C2", "command")  # fills the queue
+        assert event_mailboxes.post("s1", "C1", "b")
+        # The follow-up of "a" is refused by the full queue, and only the command's turn frees it
+        await asyncio.sleep(0.15)
+        await queue.stop()
+        assert events.turns == [["a"], ["b"]]
+        assert commands.turns == [["command"]]
+        assert not event_mailboxes.unfinished()
+
+    asyncio.run(scenario())
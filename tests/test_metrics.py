@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from src.metrics import MetricsRegistry, merge_exposition, timed
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("stage_seconds", "Stage duration", ["stage"], buckets=[0.1, 1])
+    histogram.observe(0.05, stage="dedup")
+    histogram.observe(0.5, stage="dedup")
+    histogram.observe(5, stage="dedup")
+    lines = registry.render().splitlines()
+    assert lines[:2] == ["# HELP stage_seconds Stage duration", "# TYPE stage_seconds histogram"]
+    assert 'stage_seconds_bucket{stage="dedup",le="0.1"} 1' in lines
+    assert 'stage_seconds_bucket{stage="dedup",le="1"} 2' in lines
+    assert 'stage_seconds_bucket{stage="dedup",le="+Inf"} 3' in lines
+    assert 'stage_seconds_sum{stage="dedup"} 5.55' in lines
+    assert 'stage_seconds_count{stage="dedup"} 3' in lines
+
+
+def test_labels_must_match_and_are_escaped():
+    registry = MetricsRegistry({"worker": 1})
+    counter = registry.counter("events_total", "Events", ["outcome"])
+    counter.inc(outcome='say "hi"')
+    with pytest.raises(ValueError):
+        counter.inc(kind="x")
+    assert 'events_total{worker="1",outcome="say \\"hi\\""} 1' in registry.render()
+
+
+def test_timed_records_outcomes():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("stage_seconds", "Stage duration", ["stage", "outcome"])
+
+    with timed(histogram, "verify", stage="verify") as timer:
+        timer.outcome = "invalid"
+    with pytest.raises(RuntimeError):
+        with timed(histogram, "verify", stage="verify"):
+            raise RuntimeError("boom")
+
+    async def cancelled():
+        with timed(histogram, "turn", stage="turn"):
+            await asyncio.sleep(1)
+
+    async def scenario():
+        task = asyncio.create_task(cancelled())
+        await asyncio.sleep(0)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(scenario())
+    assert histogram.count(stage="verify", outcome="invalid") == 1
+    assert histogram.count(stage="verify", outcome="error") == 1
+    assert histogram.count(stage="turn", outcome="cancelled") == 1
+
+
+def test_merge_keeps_one_header_per_metric():
+    texts = []
+    for worker in range(2):
+        registry = MetricsRegistry({"worker": worker})
+        registry.counter("events_total", "Events", ["outcome"]).inc(outcome="accepted")
+        registry.gauge("queue_depth", "Depth", lambda: 3)
+        texts.append(registry.render())
+    assert merge_exposition(texts).splitlines() == [
+        "# HELP events_total Events",
+        "# TYPE events_total counter",
+        'events_total{worker="0",outcome="accepted"} 1',
+        'events_total{worker="1",outcome="accepted"} 1',
+        "# HELP queue_depth Depth",
+        "# TYPE queue_depth gauge",
+        'queue_depth{worker="0"} 3',
+        'queue_depth{worker="1"} 3',
+    ]
@@ -0,0 +1,49 @@
+import logging
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.server.middleware import init_middleware
+
+
+def build_client() -> TestClient:
+    app = FastAPI()
+    init_middleware(app)
+
+    @app.post("/slack/events")
+    async def slack_events():
+        return {"ok": True}
+
+    return TestClient(app)
+
+
+def test_adds_cors_and_request_id_headers(caplog):
+    client = build_client()
+    with caplog.at_level(logging.INFO, logger="src.server.middleware"):
+        response = client.post("/slack/events", json={})
+    assert response.status_code == 200
+    assert response.headers["access-control-allow-origin"] == "https://app.blaxel.dev"
+    assert response.headers["access-control-allow-credentials"] == "true"
+    (record,) = caplog.records
+    assert record.http_path == "/slack/events"
+    assert record.http_status == 200
+    assert record.request_id == response.headers["x-request-id"]
+
+
+def test_answers_preflight_without_calling_the_app(caplog):
+    client = build_client()
+    with caplog.at_level(logging.INFO, logger="src.server.middleware"):
+        response = client.options("/slack/events")
+    assert response.status_code == 200
+    assert response.content == b""
+    assert "GET, POST" in response.headers["access-control-allow-methods"]
+    assert not caplog.records
+
+
+def test_logs_errors_at_error_level(caplog):
+    client = build_client()
+    with caplog.at_level(logging.INFO, logger="src.server.middleware"):
+        response = client.post("/missing")
+    assert response.status_code == 404
+    assert response.headers["access-control-allow-origin"] == "https://app.blaxel.dev"
+    assert caplog.records[0].levelno == logging.ERROR
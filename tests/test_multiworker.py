@@ -0,0 +1,89 @@
+import json
+import time
+from collections import Counter
+from urllib.parse import quote
+
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from src.metrics import events_total, registry
+from src.multiworker import HashRing, conversation_key, create_router
+from src.slack_security import slack_security
+
+
+def test_ring_spreads_keys_over_all_nodes():
+    ring = HashRing(4)
+    counts = Counter(ring.node_for(f"C{i}:U{i}") for i in range(4000))
+    assert set(counts) == {0, 1, 2, 3}
+    assert min(counts.values()) > 500
+
+
+def test_adding_a_node_only_moves_keys_to_it():
+    before, after = HashRing(4), HashRing(5)
+    for i in range(2000):
+        key = f"C{i}:U{i}"
+        if before.node_for(key) != after.node_for(key):
+            assert after.node_for(key) == 4
+
+
+def test_deliveries_of_one_conversation_share_a_key():
+    def body(event_id: str, text: str, **fields) -> bytes:
+        event = {"type": "message", "channel": "C1", "user": "U1", "text": text, **fields}
+        return json.dumps({"type": "event_callback", "event_id": event_id, "event": event}).encode()
+
+    root = conversation_key(body("Ev1", "hi", ts="1.000100"))
+    assert (
+        root == conversation_key(body("Ev2", "again", user="U2", ts="2.0", thread_ts="1.000100")) == "slack_C1_1.000100"
+    )
+    assert conversation_key(body("Ev3", "new topic", ts="3.0")) != root
+
+
+def test_payloads_without_event_or_json_still_get_a_key():
+    assert conversation_key(b'{"type": "url_verification", "challenge": "x"}') == "url_verification"
+    assert conversation_key(b"token=x&command=%2Fask") == ""
+
+
+def test_commands_and_interactions_of_a_user_share_a_key():
+    command = b"command=%2Fask&text=hi&user_id=U1&channel_id=C1&response_url=x"
+    interaction = "payload=" + quote(
+        json.dumps({"type": "message_action", "user": {"id": "U1"}, "channel": {"id": "C1"}})
+    )
+    assert conversation_key(command) == conversation_key(interaction.encode()) == "slack_command_C1_U1"
+
+
+def test_router_rejects_oversized_slack_bodies_without_buffering_them(monkeypatch):
+    monkeypatch.setattr(slack_security, "max_body_bytes", 10)
+    # Without entering the client the lifespan does not run, so no worker is started and nothing can be forwarded
+    client = TestClient(create_router("src.main:app", 1))
+    assert client.post("/slack/events", content=b"x" * 11).status_code == 413
+
+    def chunks():
+        for _ in range(3):
+            yield b"x" * 5
+
+    assert client.post("/slack/events", content=chunks()).status_code == 413
+
+
+def worker_metrics(request):
+    events_total.inc(outcome="accepted")
+    return PlainTextResponse(registry.render())
+
+
+# Minimal worker app for the router tests, serving this process's metrics registry
+worker_app = Starlette(
+    routes=[Route("/ready", lambda request: PlainTextResponse("ok")), Route("/metrics", worker_metrics)]
+)
+
+
+def test_router_metrics_have_one_series_per_worker():
+    with TestClient(create_router("tests.test_multiworker:worker_app", 2)) as client:
+        deadline = time.monotonic() + 60
+        while not client.get("/ready").json()["ready"]:
+            assert time.monotonic() < deadline
+            time.sleep(0.2)
+        samples = [line for line in client.get("/metrics").text.splitlines() if line and not line.startswith("#")]
+    assert samples
+    assert len(samples) == len(set(samples))
+    assert any('worker="0"' in line for line in samples) and any('worker="1"' in line for line in samples)
@@ -0,0 +1,40 @@
+import time
+
+from src.response_cache import ResponseCache, config_fingerprint, normalise_question
+
+
+def test_questions_differing_in_form_share_a_key():
+    cache = ResponseCache(max_size=10, ttl=60, opt_out_channels=[])
+    config = config_fingerprint("model", "prompt")
+    first = cache.key(normalise_question("<@B1> What's the weather in  London?", "B1"), config)
+    second = cache.key(normalise_question("what's the WEATHER in london", "B1"), config)
+    assert first == second
+    assert cache.key(normalise_question("ask <@U2> about London", "B1"), config) != cache.key(
+        normalise_question("ask about London", "B1"), config
+    )
+    assert cache.key(normalise_question("what's the weather in london", "B1"), config_fingerprint("other")) != first
+    assert cache.key(normalise_question("<@B1> ?", "B1"), config) is None
+
+
+def test_answers_expire_with_the_tools_they_used():
+    ttls = {"weather": 0.05, "search": 0}
+    cache = ResponseCache(max_size=10, ttl=60, opt_out_channels=[])
+    assert cache.put("plain", "hello", [], ttls.get)
+    assert cache.put("weather", "sunny", ["weather"], ttls.get)
+    assert not cache.put("search", "news", ["weather", "search"], ttls.get)
+    assert cache.get("search") is None
+    assert cache.get("weather") == "sunny"
+    time.sleep(0.06)
+    assert cache.get("weather") is None
+    assert cache.get("plain") == "hello"
+    assert cache.stats() == {"hits": 2, "misses": 2, "stored": 2, "uncacheable": 1, "size": 1}
+
+
+def test_disabled_by_default_opt_out_and_lru():
+    assert not ResponseCache(max_size=10, ttl=0, opt_out_channels=[]).enabled_for("C1")
+    cache = ResponseCache(max_size=2, ttl=60, opt_out_channels=["C2"])
+    assert cache.enabled_for("C1") and not cache.enabled_for("C2")
+    for key in ("a", "b", "c"):
+        cache.put(key, key, [], lambda tool: 60)
+    assert cache.get("a") is None
+    assert cache.get("c") == "c"
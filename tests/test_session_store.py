@@ -0,0 +1,67 @@
+import asyncio
+
+from google.adk.events import Event, EventActions
+from google.genai import types
+
+from src.metrics import session_evictions_total, session_hydration_seconds
+from src.session_store import BoundedSessionService
+
+APP = "app"
+
+
+def user_event(text: str, **kwargs) -> Event:
+    return Event(author="user", content=types.Content(role="user", parts=[types.Part(text=text)]), **kwargs)
+
+
+def test_sessions_survive_a_restart(tmp_path):
+    async def scenario():
+        path = str(tmp_path / "sessions.sqlite3")
+        service = BoundedSessionService(path)
+        session = await service.create_session(app_name=APP, user_id="U1", session_id="s1")
+        await service.append_event(session, user_event("hello"))
+        await service.append_event(session, user_event("again", actions=EventActions(state_delta={"topic": "x"})))
+        await service.close()
+
+        restarted = BoundedSessionService(path)
+        session = await restarted.get_session(app_name=APP, user_id="U1", session_id="s1")
+        assert [e.content.parts[0].text for e in session.events] == ["hello", "again"]
+        assert session.state == {"topic": "x"}
+        assert restarted.stats()["hydrations"] == 1
+        await restarted.close()
+
+    asyncio.run(scenario())
+
+
+def test_evicts_least_recently_used_over_budget(tmp_path):
+    async def scenario():
+        service = BoundedSessionService(str(tmp_path / "sessions.sqlite3"), max_bytes=2500, idle_ttl=3600)
+        evictions, hydrations = session_evictions_total.value(), session_hydration_seconds.count()
+        for session_id in ("s1", "s2", "s3"):
+            session = await service.create_session(app_name=APP, user_id="U1", session_id=session_id)
+            await service.append_event(session, user_event("x" * 800))
+        assert service.stats()["sessions"] == 2
+        assert service.stats()["evictions"] == 1
+        assert session_evictions_total.value() == evictions + 1
+
+        # The evicted session is hydrated from disk on its next use
+        session = await service.get_session(app_name=APP, user_id="U1", session_id="s1")
+        assert len(session.events) == 1
+        assert service.stats()["hydrations"] == 1
+        assert session_hydration_seconds.count() == hydrations + 1
+        await service.close()
+
+    asyncio.run(scenario())
+
+
+def test_partial_events_are_not_stored(tmp_path):
+    async def scenario():
+        service = BoundedSessionService(str(tmp_path / "sessions.sqlite3"))
+        session = await service.create_session(app_name=APP, user_id="U1", session_id="s1")
+        await service.append_event(session, user_event("partial", partial=True))
+        assert session.events == []
+        assert (await service.list_sessions(app_name=APP, user_id="U1")).sessions[0].id == "s1"
+        await service.delete_session(app_name=APP, user_id="U1", session_id="s1")
+        assert await service.get_session(app_name=APP, user_id="U1", session_id="s1") is None
+        await service.close()
+
+    asyncio.run(scenario())
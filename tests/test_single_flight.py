@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from src.single_flight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    async def scenario():
+        flights = SingleFlight()
+        calls = []
+
+        async def call():
+            calls.append(1)
+            number = len(calls)
+            await asyncio.sleep(0.01)
+            return number
+
+        results = await asyncio.gather(*(flights.run("k", call) for _ in range(3)), flights.run("other", call))
+        assert results == [1, 1, 1, 2]
+        assert "k" not in flights
+        # Once finished, the next caller starts a new call
+        assert await flights.run("k", call) == 3
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_call():
+    async def scenario():
+        flights = SingleFlight()
+        finished = []
+
+        async def call():
+            await asyncio.sleep(0.01)
+            finished.append(1)
+            return "done"
+
+        first = asyncio.create_task(flights.run("k", call))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(flights.run("k", call))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await second == "done"
+        assert finished == [1]
+
+    asyncio.run(scenario())
+
+
+def test_errors_reach_every_caller():
+    async def scenario():
+        flights = SingleFlight()
+
+        async def call():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("boom")
+
+        results = await asyncio.gather(flights.run("k", call), flights.run("k", call), return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert "k" not in flights
+        with pytest.raises(RuntimeError):
+            await flights.run("k", call)
+
+    asyncio.run(scenario())
@@ -0,0 +1,109 @@
+import asyncio
+import json
+
+from aiohttp import web
+
+from src.mailbox import ConversationMailboxes
+from src.slack_commands import SlackCommands
+from src.work_queue import WorkQueue
+
+
+async def serve(statuses):
+    """Local response_url answering with the given statuses in turn, recording the bodies it receives"""
+    received = []
+
+    async def handle(request):
+        received.append(await request.json())
+        status = statuses.pop(0) if statuses else 200
+        return web.Response(status=status, text="ok", headers={"Retry-After": "0"} if status == 429 else {})
+
+    app = web.Application()
+    app.router.add_post("/response", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/response"
+    return runner, url, received
+
+
+def test_response_url_delivery_retries_server_errors_and_rate_limits():
+    async def scenario():
+        runner, url, received = await serve([500, 429, 200])
+        commands = SlackCommands(response_type="ephemeral", max_retries=3, backoff=0.01, timeout=5)
+        try:
+            assert await commands.respond(url, "sunny")
+            assert len(received) == 3
+            assert received[-1] == {"text": "sunny", "response_type": "ephemeral", "replace_original": False}
+        finally:
+            await commands.shutdown()
+            await runner.cleanup()
+
+    asyncio.run(scenario())
+
+
+def test_response_url_delivery_gives_up_on_client_errors():
+    async def scenario():
+        runner, url, received = await serve([404, 200])
+        commands = SlackCommands(max_retries=3, backoff=0.01, timeout=5)
+        try:
+            assert not await commands.respond(url, "sunny")
+            assert len(received) == 1
+        finally:
+            await commands.shutdown()
+            await runner.cleanup()
+
+    asyncio.run(scenario())
+
+
+def test_commands_and_interactions_are_acked_and_queued():
+    async def scenario():
+        queue = WorkQueue(workers=1, max_size=10)
+        handled = []
+
+        async def handler(requests):
+            handled.append([(r.text, r.user, r.channel, r.response_url) for r in requests])
+
+        commands = SlackCommands(response_type="in_channel")
+        commands.mailboxes = ConversationMailboxes(queue, handler)
+        form = {
+            "command": "/ask",
+            "text": "weather in Paris",
+            "user_id": "U1",
+            "channel_id": "C1",
+            "response_url": "u1",
+        }
+        # Not started yet, so the command is shed with an ephemeral apology
+        assert commands.handle_command(form)["response_type"] == "ephemeral"
+        await queue.start()
+        assert commands.handle_command(form) == {"response_type": "in_channel", "text": "Working on it..."}
+        assert "/ask" in commands.handle_command({**form, "text": " "})["text"]
+        commands.handle_interaction(
+            {
+                "type": "message_action",
+                "user": {"id": "U2"},
+                "channel": {"id": "C1"},
+                "message": {"text": "what is a mailbox?"},
+                "response_url": "u2",
+            }
+        )
+        commands.handle_interaction({"type": "shortcut", "user": {"id": "U2"}})
+        # Both ask in C1, where turns run one at a time
+        while len(handled) < 2:
+            await asyncio.sleep(0.01)
+        await queue.stop(timeout=1)
+        assert sorted(handled) == [
+            [("weather in Paris", "U1", "C1", "u1")],
+            [("what is a mailbox?", "U2", "C1", "u2")],
+        ]
+
+    asyncio.run(scenario())
+
+
+def test_interaction_payload_round_trips_as_json():
+    payload = {"type": "block_actions", "actions": [{"value": ""}, {"value": "  ask this  "}], "response_url": "u"}
+    seen = []
+    commands = SlackCommands()
+    commands._post = lambda request: seen.append(request.text) or True
+    commands.handle_interaction(json.loads(json.dumps(payload)))
+    assert seen == ["ask this"]
@@ -0,0 +1,64 @@
+import asyncio
+from types import SimpleNamespace
+
+from conftest import AgentUpdate, FakeOutbound
+
+import src.slack_integration as slack_integration_module
+from src.slack_integration import SlackIntegration
+
+
+def test_tool_status_is_streamed_into_the_placeholder(monkeypatch):
+    async def agent_events(input, user_id, session_id):
+        yield AgentUpdate("tool", "weather")
+        await asyncio.sleep(0.01)
+        yield AgentUpdate("final", "It is sunny")
+
+    async def load_agent():
+        return SimpleNamespace(agent_events=agent_events)
+
+    monkeypatch.setenv("SLACK_BOT_TOKEN", "xoxb-test")
+    monkeypatch.setenv("SLACK_STREAM_UPDATE_INTERVAL", "0")
+    monkeypatch.setattr(slack_integration_module, "load_agent", load_agent)
+    monkeypatch.setattr(slack_integration_module, "loaded_agent", lambda: None)
+
+    async def scenario():
+        integration = SlackIntegration()
+        integration.outbound = FakeOutbound()
+        message = {"channel": "D1", "channel_type": "im", "user": "U1", "text": "weather in Paris?", "ts": "1.0"}
+        assert await integration._process_message(message) == "ok"
+        edits = [kwargs["text"] for method, kwargs in integration.outbound.calls if method == "chat.update"]
+        assert edits == ["_Using weather..._", "It is sunny"]
+
+    asyncio.run(scenario())
+
+
+def test_dm_thread_replies_are_answered_in_the_thread(monkeypatch):
+    async def agent_events(input, user_id, session_id):
+        yield AgentUpdate("final", "It is sunny")
+
+    async def load_agent():
+        return SimpleNamespace(agent_events=agent_events)
+
+    monkeypatch.setenv("SLACK_BOT_TOKEN", "xoxb-test")
+    monkeypatch.setenv("SLACK_STREAMING", "false")
+    monkeypatch.setattr(slack_integration_module, "load_agent", load_agent)
+    monkeypatch.setattr(slack_integration_module, "loaded_agent", lambda: None)
+
+    async def scenario():
+        integration = SlackIntegration()
+        integration.outbound = FakeOutbound()
+        message = {
+            "channel": "D1",
+            "channel_type": "im",
+            "user": "U1",
+            "text": "and tomorrow?",
+            "ts": "3.0",
+            "thread_ts": "1.0",
+        }
+        assert await integration._process_message(message) == "ok"
+        posts = [kwargs for method, kwargs in integration.outbound.calls if method == "chat.postMessage"]
+        # Both the placeholder and the answer go to the thread whose session answered
+        assert [post.get("thread_ts") for post in posts] == ["1.0", "1.0"]
+        assert posts[-1]["text"] == "It is sunny"
+
+    asyncio.run(scenario())
@@ -0,0 +1,131 @@
+import asyncio
+import time
+
+from slack_sdk.errors import SlackApiError
+from slack_sdk.web.async_slack_response import AsyncSlackResponse
+
+from src.slack_outbound import PRIORITY_HIGH, PRIORITY_LOW, SlackOutbound
+
+
+class RecordingClient:
+    """Minimal AsyncWebClient stand-in that records calls and can answer with 429s"""
+
+    def __init__(self, rate_limited: int = 0, retry_after: str = "0"):
+        self.calls = []
+        self.rate_limited = rate_limited
+        self.retry_after = retry_after
+
+    async def chat_postMessage(self, **kwargs):
+        if self.rate_limited:
+            self.rate_limited -= 1
+            response = AsyncSlackResponse(
+                client=self,
+                http_verb="POST",
+                api_url="chat.postMessage",
+                req_args={},
+                data={"ok": False, "error": "ratelimited"},
+                headers={"Retry-After": self.retry_after},
+                status_code=429,
+            )
+            raise SlackApiError("ratelimited", response)
+        self.calls.append(("chat.postMessage", kwargs))
+        return {"ok": True, "ts": str(len(self.calls))}
+
+    async def chat_update(self, **kwargs):
+        self.calls.append(("chat.update", kwargs))
+        return {"ok": True, "ts": kwargs["ts"]}
+
+
+def make_outbound(client) -> SlackOutbound:
+    outbound = SlackOutbound(client)
+    outbound.channel_interval = 0.01
+    return outbound
+
+
+def test_retries_after_rate_limit():
+    async def scenario():
+        client = RecordingClient(rate_limited=2, retry_after="0.2")
+        started = time.monotonic()
+        response = await make_outbound(client).call("chat.postMessage", channel="C1", text="hi")
+        assert response["ok"]
+        assert len(client.calls) == 1
+        # Each 429 pauses the channel for Retry-After before the post is retried
+        assert time.monotonic() - started >= 0.4
+
+    asyncio.run(scenario())
+
+
+def test_coalesces_pending_updates_and_sends_high_priority_first():
+    async def scenario():
+        client = RecordingClient()
+        outbound = make_outbound(client)
+        first = asyncio.create_task(outbound.call("chat.postMessage", channel="C1", text="first"))
+        await asyncio.sleep(0)
+        updates = [
+            asyncio.create_task(
+                outbound.call(
+                    "chat.update", channel="C1", ts="1", text=f"partial {i}", priority=PRIORITY_LOW, coalesce_key="C1:1"
+                )
+            )
+            for i in range(3)
+        ]
+        final = asyncio.create_task(
+            outbound.call("chat.postMessage", channel="C1", text="final", priority=PRIORITY_HIGH)
+        )
+        await asyncio.gather(first, final, *updates)
+        assert [kwargs["text"] for _, kwargs in client.calls] == ["first", "final", "partial 2"]
+
+    asyncio.run(scenario())
+
+
+def test_zero_channel_interval_disables_pacing():
+    async def scenario():
+        client = RecordingClient()
+        outbound = SlackOutbound(client)
+        outbound.channel_interval = 0
+        await asyncio.gather(*(outbound.call("chat.postMessage", channel="C1", text=str(i)) for i in range(5)))
+        assert [kwargs["text"] for _, kwargs in client.calls] == ["0", "1", "2", "3", "4"]
+
+    asyncio.run(scenario())
+
+
+def test_coalesced_update_takes_the_most_urgent_priority():
+    async def scenario():
+        client = RecordingClient()
+        outbound = make_outbound(client)
+        outbound.channel_interval = 0.2
+        first = asyncio.create_task(outbound.call("chat.postMessage", channel="C1", text="first"))
+        progress = asyncio.create_task(
+            outbound.call(
+                "chat.update", channel="C1", ts="1", text="partial", priority=PRIORITY_LOW, coalesce_key="C1:1"
+            )
+        )
+        other = asyncio.create_task(outbound.call("chat.postMessage", channel="C1", text="other"))
+        await asyncio.sleep(0)
+        # The final answer replaces the queued progress update and must not wait behind normal posts
+        final = asyncio.create_task(
+            outbound.call(
+                "chat.update", channel="C1", ts="1", text="answer", priority=PRIORITY_HIGH, coalesce_key="C1:1"
+            )
+        )
+        await asyncio.gather(first, progress, other, final)
+        assert [kwargs["text"] for _, kwargs in client.calls] == ["first", "answer", "other"]
+
+    asyncio.run(scenario())
+
+
+def test_stop_cancels_calls_not_sent_in_time():
+    async def scenario():
+        client = RecordingClient()
+        outbound = make_outbound(client)
+        outbound.channel_interval = 10
+        calls = [asyncio.create_task(outbound.call("chat.postMessage", channel="C1", text=str(i))) for i in range(3)]
+        await asyncio.sleep(0.01)
+        started = time.monotonic()
+        await outbound.stop(timeout=0.05)
+        assert time.monotonic() - started < 1
+        results = await asyncio.gather(*calls, return_exceptions=True)
+        assert results[0]["ok"]
+        assert all(isinstance(result, asyncio.CancelledError) for result in results[1:])
+
+    asyncio.run(scenario())
@@ -0,0 +1,44 @@
+import hashlib
+import hmac
+import time
+
+from src.slack_security import SlackSecurity
+
+
+def sign(secret: str, timestamp: str, body: bytes) -> str:
+    return "v0=" + hmac.new(secret.encode(), b"v0:" + timestamp.encode() + b":" + body, hashlib.sha256).hexdigest()
+
+
+def build(monkeypatch, secret="new-secret", previous="") -> SlackSecurity:
+    monkeypatch.setenv("SLACK_SIGNING_SECRET", secret)
+    monkeypatch.setenv("SLACK_PREVIOUS_SIGNING_SECRETS", previous)
+    return SlackSecurity()
+
+
+def test_accepts_current_and_previous_secrets(monkeypatch):
+    security = build(monkeypatch, previous="old-secret, older-secret")
+    timestamp = str(int(time.time()))
+    body = '{"text": "héllo"}'.encode()
+    assert security.verify_slack_request(body, timestamp, sign("new-secret", timestamp, body))
+    assert security.verify_slack_request(body, timestamp, sign("older-secret", timestamp, body))
+    assert not security.verify_slack_request(body, timestamp, sign("unknown", timestamp, body))
+    assert not security.verify_slack_request(body + b" ", timestamp, sign("new-secret", timestamp, body))
+
+
+def test_rejects_stale_and_malformed_requests(monkeypatch):
+    security = build(monkeypatch)
+    stale = str(int(time.time()) - 301)
+    body = b"{}"
+    assert not security.check_timestamp(stale)
+    assert not security.check_timestamp("")
+    assert not security.verify_slack_request(body, stale, sign("new-secret", stale, body))
+    now = str(int(time.time()))
+    assert not security.verify_slack_request(body, now, "v1=abc")
+    assert not security.verify_slack_request(body, now, "v0=not-hex")
+
+
+def test_skips_verification_without_a_secret(monkeypatch):
+    monkeypatch.delenv("SLACK_SIGNING_SECRET", raising=False)
+    security = SlackSecurity()
+    assert security.check_timestamp(None)
+    assert security.verify_slack_request(b"{}", "", "")
@@ -0,0 +1,63 @@
+import asyncio
+
+from conftest import AgentUpdate, FakeOutbound
+
+from src.slack_outbound import PRIORITY_HIGH, PRIORITY_LOW
+from src.slack_streaming import StreamingReply
+
+
+def edits(outbound: FakeOutbound):
+    return [(method, kwargs["priority"], kwargs["text"]) for method, kwargs in outbound.calls]
+
+
+def test_throttles_edits_and_coalesces_partial_text():
+    async def scenario():
+        outbound = FakeOutbound()
+        reply = StreamingReply(outbound, "C1", "1.0", interval=0.05)
+        for word in ("Hello", " there", ", world"):
+            reply.progress(AgentUpdate("partial", word))
+        await asyncio.sleep(0)
+        # The first edit goes out at once with everything received so far
+        assert edits(outbound) == [("chat.update", PRIORITY_LOW, "Hello there, world")]
+
+        reply.progress(AgentUpdate("partial", "!"))
+        reply.progress(AgentUpdate("partial", "!"))
+        await asyncio.sleep(0.01)
+        assert len(edits(outbound)) == 1
+        await asyncio.sleep(0.06)
+        assert edits(outbound)[1] == ("chat.update", PRIORITY_LOW, "Hello there, world!!")
+        assert reply.edits == 2
+
+    asyncio.run(scenario())
+
+
+def test_renders_tool_status_until_more_text_arrives():
+    async def scenario():
+        outbound = FakeOutbound()
+        reply = StreamingReply(outbound, "C1", "1.0", interval=0)
+        reply.progress(AgentUpdate("partial", "Let me check."))
+        reply.progress(AgentUpdate("tool", "search_docs"))
+        await asyncio.sleep(0)
+        assert edits(outbound)[-1][2] == "Let me check.\n_Using search_docs..._"
+
+        reply.progress(AgentUpdate("partial", " Found it."))
+        await asyncio.sleep(0)
+        assert edits(outbound)[-1][2] == "Let me check. Found it."
+
+    asyncio.run(scenario())
+
+
+def test_finish_cancels_pending_progress_and_sends_final_text():
+    async def scenario():
+        outbound = FakeOutbound()
+        reply = StreamingReply(outbound, "C1", "1.0", interval=10)
+        reply.progress(AgentUpdate("partial", "draft"))
+        await asyncio.sleep(0)
+        reply.progress(AgentUpdate("partial", " more"))
+        await reply.finish("Final answer")
+        assert edits(outbound) == [
+            ("chat.update", PRIORITY_LOW, "draft"),
+            ("chat.update", PRIORITY_HIGH, "Final answer"),
+        ]
+
+    asyncio.run(scenario())
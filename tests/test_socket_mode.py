@@ -0,0 +1,134 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from aiohttp import WSMsgType, web
+
+from src import socket_mode as socket_mode_module
+from src.socket_mode import SocketModeTransport
+
+
+class FakeSocketSlack:
+    """Local stand-in for apps.connections.open and the Socket Mode WebSocket, sending scripted envelopes"""
+
+    def __init__(self, scripts, failures: int = 0):
+        self.scripts = scripts
+        self.failures = failures
+        self.opened = 0
+        self.acks = []
+        self.done = asyncio.Event()
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_post("/api/apps.connections.open", self._open)
+        app.router.add_get("/socket", self._socket)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{self.port}/api/"
+
+    async def _open(self, request):
+        self.opened += 1
+        if self.opened <= self.failures:
+            return web.json_response({"ok": False, "error": "internal_error"})
+        return web.json_response({"ok": True, "url": f"ws://127.0.0.1:{self.port}/socket"})
+
+    async def _socket(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        await ws.send_json({"type": "hello"})
+        script = self.scripts.pop(0) if self.scripts else []
+        for envelope in script:
+            await ws.send_json(envelope)
+            if envelope.get("envelope_id"):
+                message = await ws.receive()
+                assert message.type == WSMsgType.TEXT
+                self.acks.append(json.loads(message.data))
+        if not self.scripts:
+            self.done.set()
+            # Keep the last connection open until the client goes away
+            async for _ in ws:
+                pass
+        return ws
+
+
+def test_envelopes_are_acked_and_dispatched_then_reconnects_on_request(monkeypatch):
+    async def scenario():
+        events, interactions = [], []
+
+        async def handle_slack_event(payload, retry_num=None):
+            events.append((payload["event_id"], retry_num))
+
+        monkeypatch.setattr(
+            socket_mode_module, "slack_integration", SimpleNamespace(handle_slack_event=handle_slack_event)
+        )
+        monkeypatch.setattr(
+            socket_mode_module,
+            "slack_commands",
+            SimpleNamespace(
+                handle_command=lambda form: {"text": f"Working on {form['text']}"},
+                handle_interaction=interactions.append,
+            ),
+        )
+        slack = FakeSocketSlack(
+            [
+                [
+                    {"envelope_id": "1", "type": "events_api", "payload": {"event_id": "Ev1"}, "retry_attempt": 0},
+                    {"envelope_id": "2", "type": "events_api", "payload": {"event_id": "Ev1"}, "retry_attempt": 1},
+                    {"envelope_id": "3", "type": "slash_commands", "payload": {"text": "weather"}},
+                    {"envelope_id": "4", "type": "interactive", "payload": {"type": "shortcut"}},
+                    {"type": "disconnect", "reason": "refresh_requested"},
+                ],
+                [],
+            ]
+        )
+        base_url = await slack.start()
+        transport = SocketModeTransport(app_token="xapp-test", reconnect_delay=0.01, ping_interval=5)
+        transport.client.base_url = base_url
+        try:
+            await transport.start()
+            await asyncio.wait_for(slack.done.wait(), 5)
+            while not transport.connected:
+                await asyncio.sleep(0.01)
+        finally:
+            await transport.stop()
+            await slack.runner.cleanup()
+        assert slack.acks == [
+            {"envelope_id": "1"},
+            {"envelope_id": "2"},
+            {"envelope_id": "3", "payload": {"text": "Working on weather"}},
+            {"envelope_id": "4"},
+        ]
+        assert events == [("Ev1", None), ("Ev1", "1")]
+        assert interactions == [{"type": "shortcut"}]
+        assert slack.opened == 2 and transport.stats()["envelopes"] == 4
+
+    asyncio.run(scenario())
+
+
+def test_failed_connections_are_retried_with_backoff():
+    async def scenario():
+        slack = FakeSocketSlack([[]], failures=2)
+        base_url = await slack.start()
+        transport = SocketModeTransport(app_token="xapp-test", reconnect_delay=0.01, max_reconnect_delay=0.05)
+        transport.client.base_url = base_url
+        try:
+            await transport.start()
+            await asyncio.wait_for(slack.done.wait(), 5)
+            while not transport.connected:
+                await asyncio.sleep(0.01)
+            assert slack.opened == 3
+            # The backoff starts over once a connection is established, however it ends
+            assert transport.stats()["failures"] == 0
+        finally:
+            await transport.stop()
+            await slack.runner.cleanup()
+        assert not transport.connected
+
+    asyncio.run(scenario())
+
+
+def test_needs_an_app_token():
+    assert not asyncio.run(SocketModeTransport(app_token="").start())
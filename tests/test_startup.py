@@ -0,0 +1,84 @@
+import asyncio
+from types import SimpleNamespace
+
+from src import startup as startup_module
+from src.startup import Startup
+
+
+def test_steps_run_concurrently_with_timeouts(monkeypatch):
+    async def scenario():
+        runtime = SimpleNamespace(runner=None)
+        monkeypatch.setattr(startup_module, "loaded_agent", lambda: SimpleNamespace(agent_runtime=runtime))
+
+        async def slack_start():
+            await asyncio.sleep(0.05)
+            return True
+
+        async def start_agent():
+            await asyncio.sleep(0.05)
+            runtime.runner = object()
+            return True
+
+        startup = Startup(timeout=1)
+        monkeypatch.setattr(startup, "_start_agent", start_agent)
+        task = asyncio.create_task(startup.run(slack_start))
+        await asyncio.sleep(0.01)
+        assert not startup.ready
+        assert startup.status()["steps"] == {"slack": "pending", "agent": "pending"}
+        await task
+        assert startup.ready
+        assert startup.timings["slack"] < 0.09 and startup.timings["agent"] < 0.09
+        assert startup.status()["time_to_ready_seconds"] is not None
+
+    asyncio.run(scenario())
+
+
+def test_failed_or_slow_steps_leave_the_server_not_ready(monkeypatch):
+    async def scenario():
+        monkeypatch.setattr(startup_module, "loaded_agent", lambda: None)
+
+        async def slack_start():
+            return False
+
+        async def start_agent():
+            await asyncio.sleep(1)
+            return True
+
+        startup = Startup(timeout=0.05, retry_interval=10)
+        monkeypatch.setattr(startup, "_start_agent", start_agent)
+        task = asyncio.create_task(startup.run(slack_start))
+        await startup.done.wait()
+        assert not startup.ready
+        assert startup.steps == {"slack": "failed", "agent": "timeout"}
+        task.cancel()
+
+    asyncio.run(scenario())
+
+
+def test_failed_slack_authentication_is_retried_until_it_succeeds(monkeypatch):
+    async def scenario():
+        runtime = SimpleNamespace(runner=object())
+        monkeypatch.setattr(startup_module, "loaded_agent", lambda: SimpleNamespace(agent_runtime=runtime))
+        attempts = []
+
+        async def slack_start():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise ConnectionError("Slack unreachable")
+            return True
+
+        async def start_agent():
+            return True
+
+        startup = Startup(timeout=1, retry_interval=0.01)
+        monkeypatch.setattr(startup, "_start_agent", start_agent)
+        task = asyncio.create_task(startup.run(slack_start))
+        await startup.done.wait()
+        assert not startup.ready
+        await asyncio.wait_for(task, timeout=1)
+        assert len(attempts) == 3
+        assert startup.ready
+        assert startup.steps["slack"] == "ok"
+        assert startup.status()["time_to_ready_seconds"] is not None
+
+    asyncio.run(scenario())
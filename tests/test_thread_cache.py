@@ -0,0 +1,92 @@
+import asyncio
+
+from src.thread_cache import ThreadCache, conversation_id, thread_root
+
+
+class FakeThreads:
+    """conversations.replies stand-in returning a fixed thread, honouring `oldest`"""
+
+    def __init__(self, messages):
+        self.messages = messages
+        self.calls = []
+
+    async def fetch(self, channel, thread_ts, oldest=None):
+        self.calls.append((channel, thread_ts, oldest))
+        await asyncio.sleep(0)
+        return [m for m in self.messages if not oldest or float(m["ts"]) > float(oldest)]
+
+
+def message(ts: str, text: str, user: str = "U1", **fields):
+    return {"type": "message", "channel": "C1", "ts": ts, "user": user, "text": text, **fields}
+
+
+async def no_session():
+    return None
+
+
+def test_threads_and_dms_get_their_own_conversation():
+    assert thread_root(message("1.0", "hi")) == "1.0"
+    assert thread_root(message("2.0", "reply", thread_ts="1.0")) == "1.0"
+    assert conversation_id(message("2.0", "reply", user="U2", thread_ts="1.0")) == "slack_C1_1.0"
+    dm = {"channel": "D1", "channel_type": "im", "ts": "3.0", "user": "U1"}
+    assert thread_root(dm) is None
+    assert conversation_id(dm) == "slack_D1_U1"
+
+
+def test_fetches_a_thread_once_then_follows_events():
+    async def scenario():
+        slack = FakeThreads([message("1.0", "question"), message("1.5", "context", user="U2")])
+        cache = ThreadCache(slack.fetch, max_size=10, ttl=60, max_messages=10)
+        mention = message("2.0", "<@B> help", thread_ts="1.0")
+        cache.observe(mention)  # not cached yet, the fetch brings it in
+        slack.messages.append(mention)
+
+        unseen = await cache.unseen("C1", "1.0", ["2.0"], no_session)
+        assert [m.text for m in unseen] == ["question", "context"]
+
+        cache.observe(message("3.0", "more detail", user="U2", thread_ts="1.0"))
+        cache.observe(message("4.0", "<@B> and now?", thread_ts="1.0"))
+        unseen = await cache.unseen("C1", "1.0", ["4.0"], no_session)
+        assert [m.text for m in unseen] == ["more detail"]
+        assert len(slack.calls) == 1
+        assert cache.stats()["hits"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_loads_share_one_incremental_fetch():
+    async def scenario():
+        slack = FakeThreads([message("1.0", "old"), message("5.0", "new", user="U2")])
+        cache = ThreadCache(slack.fetch, max_size=10, ttl=60, max_messages=10)
+
+        async def session_updated():
+            return 4.0
+
+        results = await asyncio.gather(
+            cache.unseen("C1", "1.0", ["6.0"], session_updated), cache.unseen("C1", "1.0", ["6.0"], session_updated)
+        )
+        assert slack.calls == [("C1", "1.0", "4.000000")]
+        assert [m.text for m in results[0]] == ["new"]
+        assert cache.stats()["coalesced"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_started_threads_skip_the_fetch_and_lru_evicts():
+    async def scenario():
+        slack = FakeThreads([])
+        cache = ThreadCache(slack.fetch, max_size=1, ttl=60, max_messages=2)
+        cache.start("C1", "1.0")
+        assert await cache.unseen("C1", "1.0", ["1.0"], no_session) == []
+        for i in range(3):
+            cache.observe(message(f"2.{i}", f"reply {i}", thread_ts="1.0"))
+        unseen = await cache.unseen("C1", "1.0", ["3.0"], no_session)
+        assert [m.text for m in unseen] == ["reply 1", "reply 2"]
+        assert slack.calls == []
+
+        cache.start("C1", "9.0")
+        assert cache.stats()["size"] == 1
+        await cache.unseen("C1", "1.0", ["4.0"], no_session)
+        assert slack.calls == [("C1", "1.0", None)]
+
+    asyncio.run(scenario())
@@ -0,0 +1,115 @@
+import asyncio
+
+from src.metrics import tool_cache_saved_seconds_total, tool_cache_total
+from src.tool_cache import CachedTool, ToolCache, bypass_tool_cache
+
+
+def weather(city: str) -> str:
+    """Get the weather in a given city"""
+    return f"The weather in {city} is sunny"
+
+
+def test_normalised_arguments_share_a_cache_entry():
+    async def scenario():
+        cache = ToolCache(max_size=10, default_ttl=60, ttls={})
+        calls = []
+
+        async def run():
+            calls.append(1)
+            return "sunny"
+
+        hits = tool_cache_total.value(tool="weather", outcome="hit")
+        assert await cache.call("weather", {"city": "New  York"}, run) == "sunny"
+        assert await cache.call("weather", {"city": " new york"}, run) == "sunny"
+        assert len(calls) == 1
+        assert cache.stats()["hits"] == 1
+        assert tool_cache_total.value(tool="weather", outcome="hit") == hits + 1
+        assert tool_cache_saved_seconds_total.value(tool="weather") > 0
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_identical_calls_run_once():
+    async def scenario():
+        cache = ToolCache(max_size=10, default_ttl=60, ttls={})
+        calls = []
+
+        async def run():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"results": ["a"]}
+
+        results = await asyncio.gather(*(cache.call("search", {"q": "slack"}, run) for _ in range(5)))
+        assert all(result == {"results": ["a"]} for result in results)
+        assert len(calls) == 1
+        assert cache.stats()["coalesced"] == 4
+
+    asyncio.run(scenario())
+
+
+def test_errors_zero_ttl_and_bypass_are_not_cached():
+    async def scenario():
+        cache = ToolCache(max_size=10, default_ttl=60, ttls={"live": 0})
+        calls = []
+
+        async def failing():
+            calls.append("error")
+            return {"isError": True}
+
+        async def run():
+            calls.append("ok")
+            return "ok"
+
+        await cache.call("search", {"q": "x"}, failing)
+        await cache.call("search", {"q": "x"}, failing)
+        await cache.call("live", {}, run)
+        await cache.call("live", {}, run)
+        await cache.call("search", {"q": "y"}, run)
+        bypass_tool_cache.set(True)
+        await cache.call("search", {"q": "y"}, run)
+        assert calls == ["error", "error", "ok", "ok", "ok", "ok"]
+        assert cache.stats()["bypassed"] == 3
+
+    asyncio.run(scenario())
+
+
+def test_evicts_least_recently_used_and_expired_results():
+    async def scenario():
+        cache = ToolCache(max_size=2, default_ttl=60, ttls={})
+        calls = []
+
+        def runner(value):
+            async def run():
+                calls.append(value)
+                return value
+
+            return run
+
+        await cache.call("t", {"a": 1}, runner(1))
+        await cache.call("t", {"a": 2}, runner(2))
+        await cache.call("t", {"a": 1}, runner(1))
+        await cache.call("t", {"a": 3}, runner(3))  # evicts a=2
+        await cache.call("t", {"a": 2}, runner(2))
+        assert calls == [1, 2, 3, 2]
+
+        cache.ttls["short"] = 0.01
+        await cache.call("short", {}, runner("s"))
+        await asyncio.sleep(0.02)
+        await cache.call("short", {}, runner("s"))
+        assert calls[-2:] == ["s", "s"]
+
+    asyncio.run(scenario())
+
+
+def test_wrapped_function_tool_is_cached():
+    async def scenario():
+        cache = ToolCache(max_size=10, default_ttl=0, ttls={"weather": 60})
+        (tool,) = cache.wrap([weather])
+        assert isinstance(tool, CachedTool)
+        assert tool._get_declaration().name == "weather"
+        first = await tool.run_async(args={"city": "Paris"}, tool_context=None)
+        second = await tool.run_async(args={"city": "paris"}, tool_context=None)
+        assert first == second == "The weather in Paris is sunny"
+        assert cache.stats()["hits"] == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,66 @@
+import asyncio
+from contextlib import AsyncExitStack
+from types import SimpleNamespace
+
+from src.tool_connections import ToolConnections
+
+
+class FakeClient:
+    """PersistentMcpClient stand-in with an open session whose exit stack records the close"""
+
+    def __init__(self, name, alive=True):
+        self.name = name
+        self.alive = alive
+        self.closed = False
+        self.session = SimpleNamespace(send_ping=self.ping)
+        self.session_exit_stack = AsyncExitStack()
+        self.session_exit_stack.callback(self.close)
+        self.client_exit_stack = AsyncExitStack()
+
+    async def ping(self):
+        if not self.alive:
+            raise ConnectionError("session gone")
+
+    def close(self):
+        self.closed = True
+
+
+def test_retired_connections_close_after_their_last_turn():
+    async def scenario():
+        client = FakeClient("search")
+        connections = ToolConnections([client])
+        connections.acquire()
+        connections.acquire()
+        await connections.retire()
+        # Turns still running keep using the sessions they started with
+        assert not client.closed
+        await connections.release()
+        assert not client.closed
+        await connections.release()
+        assert client.closed
+        assert client.session is None
+
+    asyncio.run(scenario())
+
+
+def test_idle_connections_close_when_retired():
+    async def scenario():
+        client = FakeClient("search")
+        connections = ToolConnections([client])
+        connections.acquire()
+        await connections.release()
+        assert not client.closed
+        await connections.retire()
+        assert client.closed
+
+    asyncio.run(scenario())
+
+
+def test_ping_reports_dead_sessions_only():
+    async def scenario():
+        idle = FakeClient("idle")
+        idle.session = None
+        connections = ToolConnections([FakeClient("search"), FakeClient("fetch", alive=False), idle])
+        assert await connections.ping() == ["fetch"]
+
+    asyncio.run(scenario())
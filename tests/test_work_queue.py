@@ -0,0 +1,87 @@
+import asyncio
+
+from src.work_queue import WorkQueue
+
+
+def test_submit_rejected_before_start_and_after_stop():
+    async def scenario():
+        queue = WorkQueue(workers=1, max_size=1)
+        assert not queue.submit(asyncio.sleep, 0)
+        await queue.start()
+        await queue.stop()
+        assert not queue.submit(asyncio.sleep, 0)
+
+    asyncio.run(scenario())
+
+
+def test_submit_sheds_when_full():
+    async def scenario():
+        release = asyncio.Event()
+        queue = WorkQueue(workers=1, max_size=1)
+        await queue.start()
+        assert queue.submit(release.wait)
+        await asyncio.sleep(0)  # let the worker pick up the first job
+        assert queue.submit(release.wait)
+        assert not queue.submit(release.wait)
+        release.set()
+        assert await queue.stop() == []
+
+    asyncio.run(scenario())
+
+
+def test_stop_drains_pending_jobs():
+    async def scenario():
+        done = []
+
+        async def job(i):
+            await asyncio.sleep(0.01)
+            done.append(i)
+
+        queue = WorkQueue(workers=2, max_size=10)
+        await queue.start()
+        for i in range(5):
+            assert queue.submit(job, i)
+        assert await queue.stop(timeout=5) == []
+        assert sorted(done) == [0, 1, 2, 3, 4]
+
+    asyncio.run(scenario())
+
+
+def test_stop_reports_dropped_jobs_on_timeout():
+    async def scenario():
+        queue = WorkQueue(workers=1, max_size=5)
+        await queue.start()
+        queue.submit(asyncio.sleep, 10)
+        queue.submit(asyncio.sleep, 20)
+        await asyncio.sleep(0)
+        assert queue.in_flight == 1
+        dropped = await queue.stop(timeout=0.05)
+        assert [args for _, args, _ in dropped] == [(10,), (20,)]
+
+    asyncio.run(scenario())
+
+
+def test_failing_job_does_not_kill_worker():
+    async def scenario():
+        done = []
+
+        async def fail():
+            raise RuntimeError("boom")
+
+        async def succeed():
+            done.append(True)
+
+        queue = WorkQueue(workers=1, max_size=5)
+        await queue.start()
+        queue.submit(fail)
+        queue.submit(succeed)
+        await queue.stop(timeout=5)
+        assert done == [True]
+
+    asyncio.run(scenario())
+
+
+def test_explicit_zero_is_not_replaced_by_env_default(monkeypatch):
+    monkeypatch.setenv("SLACK_QUEUE_SIZE", "7")
+    assert WorkQueue(workers=1, max_size=0).max_size == 0
+    assert WorkQueue(workers=1).max_size == 7